@@ -0,0 +1,259 @@
+import itertools
+import multiprocessing as mp
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# ===============================================
+# Prozess-Pool für die Analyse (detect_Buildings + calculate_2D_Volume)
+# ===============================================
+#
+# Frames werden nicht gepickelt: jeder Ring-Slot ist ein SharedMemory-Block
+# mit Eingängen (Tiefe, Farbe) und Ausgängen (drei Masken, Lärmkarte).
+# Über die Queues gehen nur Slot-Nummer, Sequenznummer und Parameter.
+# Aufeinanderfolgende Frames gehen an verschiedene Worker, die Ergebnisse
+# werden anhand der Sequenznummer wieder in Reihenfolge gebracht.
+
+# Laufende Nummer je Pool. Die Ergebnisse zeigen in die Slots ihres Pools,
+# deshalb bekommen sie eine eigene device_id: der Stage-Cache (stageGraph)
+# darf die Masken eines Pools nie einem anderen Stream mit gleicher seq geben.
+_pool_ids = itertools.count()
+
+
+def _slot_layout(depth_shape, color_shape):
+    """Byte-Offsets der Arrays innerhalb eines Slots: {name: (offset, shape, dtype)}"""
+    fields = [
+        ("depth", depth_shape, np.uint16),
+        ("color", color_shape, np.uint8),
+        ("building_mask", depth_shape, np.uint8),
+        ("road_mask", depth_shape, np.uint8),
+        ("park_mask", depth_shape, np.uint8),
+        ("noise_map", depth_shape, np.uint8),
+    ]
+    layout = {}
+    offset = 0
+    for name, shape, dtype in fields:
+        layout[name] = (offset, tuple(shape), np.dtype(dtype).str)
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        offset += (size + 63) // 64 * 64  # 64-Byte-Ausrichtung
+    return layout, offset
+
+
+def _slot_arrays(buffer, layout):
+    return {
+        name: np.ndarray(shape, dtype=np.dtype(dtype), buffer=buffer, offset=offset)
+        for name, (offset, shape, dtype) in layout.items()
+    }
+
+
+def _analysis_worker(shm_names, layout, task_queue, result_queue):
+    """Worker-Prozess: hängt sich einmal an alle Slots und arbeitet Aufträge ab"""
+    from DataCalculation import calculate2DVolume, detectBuildings
+
+    blocks = [shared_memory.SharedMemory(name=name) for name in shm_names]
+    slots = [_slot_arrays(block.buf, layout) for block in blocks]
+    classifier = None
+    height_model = None
+    try:
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+            (slot_index, seq, depth_scale, baseline_distance, with_volume, integer_depth,
+             scale, noise_iterations, classifier_version, new_classifier,
+             height_model_changed, new_height_model) = task
+            # Farbtabelle kommt nur mit, wenn sie sich geändert hat
+            if new_classifier is not None:
+                classifier = new_classifier
+            # Höhenmodell ebenso, die Strahl-Tabellen bleiben im Worker erhalten
+            if height_model_changed:
+                height_model = new_height_model
+            arrays = slots[slot_index]
+            try:
+                # Ergebnisse direkt in den Slot schreiben
+                building_mask, road_mask, park_mask = detectBuildings.detect_Buildings(
+                    arrays["depth"], arrays["color"], depth_scale, baseline_distance,
+                    integer_depth=integer_depth, classifier=classifier if classifier_version is not None else None,
+                    height_model=height_model, scale=scale,
+                    out=(arrays["building_mask"], arrays["road_mask"], arrays["park_mask"]))
+                if with_volume:
+                    calculate2DVolume.calculate_2D_Volume(
+                        arrays["depth"], building_mask, road_mask, park_mask,
+                        iterations=noise_iterations, out=arrays["noise_map"])
+                result_queue.put((slot_index, seq, None))
+            except Exception as e:
+                result_queue.put((slot_index, seq, str(e)))
+    finally:
+        del slots
+        for block in blocks:
+            block.close()
+
+
+class AnalysisPool:
+    """
+    Optionales Multiprozess-Backend für die Analyse-Stufe.
+
+    submit() kopiert ein Frame in einen freien SharedMemory-Slot und gibt
+    es an den nächsten Worker. next_result() liefert die Ergebnisse streng
+    in Sequenz-Reihenfolge als Dictionary mit schreibgeschützten Views auf
+    den Slot; release() gibt den Slot danach wieder frei. Die device_id der
+    Ergebnisse enthält die des Pools (siehe _pool_ids).
+    """
+
+    def __init__(self, num_workers, depth_shape, color_shape, slots_per_worker=2):
+        self.num_workers = num_workers
+        self.depth_shape = tuple(depth_shape)
+        self.color_shape = tuple(color_shape)
+        self.layout, slot_size = _slot_layout(self.depth_shape, self.color_shape)
+        self.device_id = f"analysis:{next(_pool_ids)}"
+
+        num_slots = num_workers * slots_per_worker
+        self._blocks = [shared_memory.SharedMemory(create=True, size=slot_size)
+                        for _ in range(num_slots)]
+        self._slots = [_slot_arrays(block.buf, self.layout) for block in self._blocks]
+        self._free_slots = queue.Queue()
+        for i in range(num_slots):
+            self._free_slots.put(i)
+
+        context = mp.get_context("spawn")
+        self._result_queue = context.Queue()
+        self._task_queues = []
+        self._workers = []
+        shm_names = [block.name for block in self._blocks]
+        for _ in range(num_workers):
+            task_queue = context.Queue()
+            worker = context.Process(target=_analysis_worker,
+                                     args=(shm_names, self.layout, task_queue, self._result_queue),
+                                     daemon=True)
+            worker.start()
+            self._task_queues.append(task_queue)
+            self._workers.append(worker)
+
+        self._classifier_versions = [None] * num_workers
+        self._height_models = [None] * num_workers
+        self._next_submit_seq = 0
+        self._next_result_seq = 0
+        self._in_flight = {}   # seq -> (slot_index, frame_info)
+        self._finished = {}    # seq -> Fehlertext oder None
+        self._lock = threading.Lock()
+
+    def matches(self, frame_data):
+        """Passt das Frame zu den Slot-Größen dieses Pools?"""
+        return (frame_data["depth"].shape == self.depth_shape and
+                frame_data["color"].shape == self.color_shape)
+
+    @property
+    def pending(self):
+        with self._lock:
+            return len(self._in_flight)
+
+    def submit(self, frame_data, depth_scale, baseline_distance, with_volume=False, timeout=None,
+               integer_depth=False, classifier=None, height_model=None, scale=None,
+               noise_iterations=None):
+        """
+        Kopiert das Frame in einen freien Slot und verteilt es reihum.
+        Blockiert, bis ein Slot frei ist. Rückgabe: Sequenznummer im Pool.
+        scale und noise_iterations gehen mit jedem Auftrag mit (die Worker
+        sehen die Modulvariablen des Hauptprozesses nicht), None = Standard.
+        classifier (colorClassifier.ColorClassifier) wird nur an Worker
+        geschickt, die seine aktuelle Version noch nicht haben, height_model
+        (tableGeometry.HeightModel) nur, wenn es ein anderes Objekt ist.
+        """
+        slot_index = self._free_slots.get(timeout=timeout)
+        arrays = self._slots[slot_index]
+        np.copyto(arrays["depth"], frame_data["depth"], casting="unsafe")
+        np.copyto(arrays["color"], frame_data["color"])
+
+        with self._lock:
+            seq = self._next_submit_seq
+            self._next_submit_seq += 1
+            self._in_flight[seq] = (slot_index, {
+                "seq": frame_data.get("seq", seq),
+                "timestamp": frame_data.get("timestamp", time.monotonic()),
+                "device_id": frame_data.get("device_id"),
+                "with_volume": with_volume,
+            })
+        worker_index = seq % self.num_workers
+        classifier_version = None if classifier is None else classifier.version
+        new_classifier = None
+        if classifier_version is not None and self._classifier_versions[worker_index] != classifier_version:
+            new_classifier = classifier
+            self._classifier_versions[worker_index] = classifier_version
+        height_model_changed = self._height_models[worker_index] is not height_model
+        self._height_models[worker_index] = height_model
+        self._task_queues[worker_index].put(
+            (slot_index, seq, depth_scale, baseline_distance, with_volume, integer_depth,
+             scale, noise_iterations, classifier_version, new_classifier, height_model_changed,
+             height_model if height_model_changed else None))
+        return seq
+
+    def next_result(self, timeout=None):
+        """
+        Liefert das nächste Ergebnis in Sequenz-Reihenfolge, oder None bei
+        Timeout bzw. wenn nichts mehr aussteht. Spätere Frames, die schon
+        fertig sind, werden zwischengespeichert.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                seq = self._next_result_seq
+                if seq not in self._in_flight:
+                    return None
+                if seq in self._finished:
+                    error = self._finished.pop(seq)
+                    slot_index, frame_info = self._in_flight.pop(seq)
+                    self._next_result_seq += 1
+                    break
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                _, done_seq, error = self._result_queue.get(timeout=remaining)
+            except queue.Empty:
+                return None
+            with self._lock:
+                self._finished[done_seq] = error
+
+        if error is not None:
+            print(f"Fehler im Analyse-Worker (Frame {frame_info['seq']}): {error}")
+            self._free_slots.put(slot_index)
+            return self.next_result(timeout)
+
+        arrays = self._slots[slot_index]
+        views = {}
+        for name, array in arrays.items():
+            view = array.view()
+            view.flags.writeable = False
+            views[name] = view
+        return {
+            "color": views["color"],
+            "depth": views["depth"],
+            "seq": frame_info["seq"],
+            "timestamp": frame_info["timestamp"],
+            "device_id": f"{frame_info['device_id']}@{self.device_id}",
+            "slot": slot_index,
+            "analysis": {
+                "building_mask": views["building_mask"],
+                "road_mask": views["road_mask"],
+                "park_mask": views["park_mask"],
+                "noise_map": views["noise_map"] if frame_info["with_volume"] else None,
+            },
+        }
+
+    def release(self, result):
+        """Gibt den Slot eines mit next_result() erhaltenen Ergebnisses frei"""
+        self._free_slots.put(result["slot"])
+
+    def close(self):
+        for task_queue in self._task_queues:
+            task_queue.put(None)
+        for worker in self._workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+        self._slots = []
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
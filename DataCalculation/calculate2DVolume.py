@@ -1,40 +1,65 @@
 import numpy as np
 import cv2
+from DataCalculation.frameWorkspace import acquire_workspace
 
-def calculate_2D_Volume(depth_image, building_mask, road_mask, park_mask):
+# Anzahl Ausbreitungsschritte (wird vom Qualitätsregler reduziert, wenn es eng wird)
+noise_iterations = 20
+
+def calculate_2D_Volume(depth_image, building_mask, road_mask, park_mask, iterations=None, out=None):
     """
     Simuliere eine Lärmverteilung unter Berücksichtigung von Straßen, Parks und Gebäuden.
     Gebäude blockieren oder reduzieren die Ausbreitung von Lärm.
     Gibt eine 8-Bit Grauwert-Karte zurück (0 = kein Lärm, 255 = maximale Lautstärke).
+    iterations: Ausbreitungsschritte (Standard: noise_iterations)
+    out: optionales uint8-Zielarray für die Lärmkarte
     """
+    if iterations is None:
+        iterations = noise_iterations
+
+    with acquire_workspace(road_mask.shape) as workspace:
+        noise = _diffuse_noise(workspace, building_mask, road_mask, park_mask, iterations)
+
+        # Normiere und konvertiere zu 8-Bit Bild
+        noise_norm = cv2.normalize(noise, workspace.get("noise_norm", np.float32),
+                                   alpha=0, beta=255, norm_type=cv2.NORM_MINMAX)
+        if out is None:
+            return noise_norm.astype(np.uint8)
+        np.copyto(out, noise_norm, casting='unsafe')
+        return out
+
+def _diffuse_noise(workspace, building_mask, road_mask, park_mask, iterations):
+    """Lärmausbreitung in den Puffern des Arbeitsbereichs (Ergebnis: float32)"""
     # Konvertiere Masken zu Gleitkommazahlen (0.0 bis 1.0)
-    road_src = road_mask.astype(np.float32) / 255.0
-    park_src = park_mask.astype(np.float32) / 255.0
-    building_src = building_mask.astype(np.float32) / 255.0
+    road_src = np.divide(road_mask, np.float32(255.0), out=workspace.get("noise_road", np.float32),
+                         dtype=np.float32)
+    park_src = np.divide(park_mask, np.float32(255.0), out=workspace.get("noise_park", np.float32),
+                         dtype=np.float32)
+    # Gebäude (> 50 %) blockieren: building_mask / 255 > 0.5
+    blocked = np.greater(building_mask, 127, out=workspace.get("noise_blocked", np.bool_))
 
     # Definiere Lärmquellenintensitäten
     road_intensity = 1.0
     park_intensity = 0.6
 
-    # Initialisiere Lärmquellekarte
-    noise_sources = np.zeros_like(road_src, dtype=np.float32)
-    noise_sources += road_intensity * road_src
-    noise_sources += park_intensity * park_src
+    # Initialisiere Lärmquellekarte (im Puffer der Straßenmaske)
+    noise_sources = np.multiply(road_src, np.float32(road_intensity), out=road_src)
+    np.multiply(park_src, np.float32(park_intensity), out=park_src)
+    np.add(noise_sources, park_src, out=noise_sources)
 
     # Wende mehrfache Weichzeichnungen an, aber verhindere, dass Lärm durch Gebäude "wandert"
-    # Dafür nutzen wir eine Diffusion mit Dämpfung durch Gebäude
-    noise = noise_sources.copy()
-    for i in range(20):  # mehrere Iterationen zur Simulation von Ausbreitung
-        blurred = cv2.GaussianBlur(noise, (91, 91), sigmaX=0)
+    # Dafür nutzen wir eine Diffusion mit Dämpfung durch Gebäude.
+    # Zwei Puffer im Wechsel: noise (aktueller Stand) und blurred (nächster Stand)
+    noise = workspace.get("noise_a", np.float32)
+    blurred = workspace.get("noise_b", np.float32)
+    np.copyto(noise, noise_sources)
+    for i in range(iterations):  # mehrere Iterationen zur Simulation von Ausbreitung
+        cv2.GaussianBlur(noise, (91, 91), sigmaX=0, dst=blurred)
         
         # Verhindere Übertragung durch Gebäude – dort wird nicht erhöht
-        noise = np.where(building_src > 0.5, noise, blurred)
+        np.copyto(blurred, noise, where=blocked)
+        noise, blurred = blurred, noise
 
         # Optional: Original-Lärmquellen beibehalten (damit sie nicht "ausgewaschen" werden)
-        noise = np.maximum(noise, noise_sources)
-
-    # Normiere und konvertiere zu 8-Bit Bild
-    noise_norm = cv2.normalize(noise, None, alpha=0, beta=255, norm_type=cv2.NORM_MINMAX)
-    noise_map = noise_norm.astype(np.uint8)
+        np.maximum(noise, noise_sources, out=noise)
 
-    return noise_map
+    return noise
@@ -0,0 +1,175 @@
+import threading
+
+import cv2
+import numpy as np
+
+# ===============================================
+# Abtrag/Auftrag (Cut/Fill) gegenüber einer Referenzoberfläche
+# ===============================================
+#
+# Pro Frame wird die Höhendifferenz zur gespeicherten Referenz berechnet
+# und in Abtrag (Sand weg) und Auftrag (Sand dazu) getrennt. Aus beiden
+# Volumen-Karten werden Summentabellen (Integralbilder) gebildet. Danach
+# kostet jede Rechteck-Abfrage vier Tabellenzugriffe - unabhängig von
+# der Größe des Rechtecks.
+
+CM3_PER_M3 = 1e6
+
+
+class CutFillSnapshot:
+    """
+    Summentabellen eines Frames. Koordinaten der Abfragen sind normiert
+    (0..1), damit sie nicht von der Kameraauflösung abhängen.
+    """
+
+    def __init__(self, seq, difference, cut_table, fill_table):
+        self.seq = seq
+        self.difference = difference  # Meter, + = Auftrag, - = Abtrag
+        self.cut_table = cut_table
+        self.fill_table = fill_table
+        self.shape = difference.shape
+
+    def _rect_sum(self, table, x0, y0, x1, y1):
+        height, width = self.shape
+        c0 = int(round(np.clip(min(x0, x1), 0, 1) * width))
+        c1 = int(round(np.clip(max(x0, x1), 0, 1) * width))
+        r0 = int(round(np.clip(min(y0, y1), 0, 1) * height))
+        r1 = int(round(np.clip(max(y0, y1), 0, 1) * height))
+        return table[r1, c1] - table[r0, c1] - table[r1, c0] + table[r0, c0]
+
+    def volume(self, x0=0.0, y0=0.0, x1=1.0, y1=1.0):
+        """Abtrag und Auftrag in cm³ für ein Rechteck"""
+        cut = self._rect_sum(self.cut_table, x0, y0, x1, y1) * CM3_PER_M3
+        fill = self._rect_sum(self.fill_table, x0, y0, x1, y1) * CM3_PER_M3
+        return {"cut_cm3": round(float(cut), 1), "fill_cm3": round(float(fill), 1),
+                "net_cm3": round(float(fill - cut), 1)}
+
+    def region_volume(self, rects):
+        """Abtrag und Auftrag für eine Region aus (nicht überlappenden) Rechtecken"""
+        cut = fill = 0.0
+        for rect in rects:
+            volume = self.volume(*rect)
+            cut += volume["cut_cm3"]
+            fill += volume["fill_cm3"]
+        return {"cut_cm3": round(cut, 1), "fill_cm3": round(fill, 1), "net_cm3": round(fill - cut, 1)}
+
+
+class CutFillAnalysis:
+    """
+    Hält die Referenzoberfläche und die Summentabellen des letzten Frames.
+
+    Parameter:
+    - reference_frames: über wie viele Frames die Referenz gemittelt wird
+    - dead_band: Höhenunterschiede darunter (Meter) gelten als Rauschen
+    """
+
+    def __init__(self, reference_frames=10, dead_band=0.002):
+        self.reference_frames = reference_frames
+        self.dead_band = dead_band
+        self.regions = {}  # Name -> Liste von Rechtecken (x0, y0, x1, y1)
+
+        self._lock = threading.Lock()
+        self._reference = None
+        self._reference_sum = None
+        self._reference_count = None
+        self._capturing = 0
+        self._snapshot = None
+
+    def capture_reference(self):
+        """Die nächsten reference_frames Frames werden zur neuen Referenz gemittelt"""
+        with self._lock:
+            self._capturing = self.reference_frames
+            self._reference_sum = None
+            self._reference_count = None
+
+    def set_region(self, name, rects):
+        with self._lock:
+            if rects:
+                self.regions[name] = [tuple(rect) for rect in rects]
+            else:
+                self.regions.pop(name, None)
+
+    def set_reference(self, reference):
+        """Referenz direkt setzen (Höhe = -Tiefe in Metern, float32, NaN = ungültig)"""
+        with self._lock:
+            self._reference = reference
+            self._capturing = 0
+            self._reference_sum = self._reference_count = None
+
+    @property
+    def has_reference(self):
+        return self._reference is not None
+
+    @property
+    def reference(self):
+        """Referenzoberfläche (Höhe = -Tiefe in Metern, float32) oder None"""
+        return self._reference
+
+    def _accumulate_reference(self, height, valid):
+        if self._reference_sum is None or self._reference_sum.shape != height.shape:
+            self._reference_sum = np.zeros(height.shape, dtype=np.float64)
+            self._reference_count = np.zeros(height.shape, dtype=np.float64)
+        cv2.accumulate(height, self._reference_sum, mask=valid)
+        cv2.accumulate(valid, self._reference_count, mask=valid)
+        self._capturing -= 1
+        if self._capturing <= 0:
+            # Pixel, die in keinem Frame gültig waren, bleiben NaN (werden ignoriert)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                reference = self._reference_sum / (self._reference_count / 255.0)
+            reference[self._reference_count == 0] = np.nan
+            self._reference = reference.astype(np.float32)
+            self._reference_sum = self._reference_count = None
+
+    def update(self, depth_image, depth_scale, pixel_size, seq=None):
+        """
+        Rechnet Differenz und Summentabellen für ein Tiefenbild.
+        Rückgabe: CutFillSnapshot oder None, solange keine Referenz existiert.
+        """
+        height = depth_image.astype(np.float32)
+        height *= np.float32(-depth_scale)   # Höhe = -Tiefe (Meter)
+        valid = cv2.compare(depth_image, 0, cv2.CMP_GT)
+
+        with self._lock:
+            if self._reference is None and self._capturing <= 0:
+                self._capturing = self.reference_frames
+            if self._capturing > 0:
+                self._accumulate_reference(height, valid)
+            reference = self._reference
+        if reference is None or reference.shape != height.shape:
+            return None
+
+        difference = height - reference
+        invalid = (valid == 0) | np.isnan(difference) | (np.abs(difference) < self.dead_band)
+        difference[invalid] = 0
+
+        pixel_area = np.float32(pixel_size * pixel_size)
+        fill = np.maximum(difference, 0) * pixel_area
+        cut = np.maximum(-difference, 0) * pixel_area
+        snapshot = CutFillSnapshot(seq, difference,
+                                   cv2.integral(cut, sdepth=cv2.CV_64F),
+                                   cv2.integral(fill, sdepth=cv2.CV_64F))
+        with self._lock:
+            self._snapshot = snapshot
+        return snapshot
+
+    def report(self, rect=None):
+        """Gesamtvolumen, benannte Regionen und optional ein Rechteck als Dictionary"""
+        with self._lock:
+            snapshot = self._snapshot
+            regions = dict(self.regions)
+            capturing = self._capturing
+        result = {
+            "has_reference": self.has_reference,
+            "capturing_reference": capturing > 0,
+            "seq": None,
+            "table": None,
+            "regions": {},
+        }
+        if snapshot is None:
+            return result
+        result["seq"] = snapshot.seq
+        result["table"] = snapshot.volume()
+        result["regions"] = {name: snapshot.region_volume(rects) for name, rects in regions.items()}
+        if rect is not None:
+            result["rect"] = snapshot.volume(*rect)
+        return result
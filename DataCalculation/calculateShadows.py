@@ -0,0 +1,186 @@
+import threading
+
+import cv2
+import numpy as np
+
+# ===============================================
+# Sonnenschatten und Sichtbarkeit (Sweep-Verfahren)
+# ===============================================
+#
+# Schatten: Das Höhenfeld wird so gedreht, dass die Sonne links steht.
+# Dann liegt Pixel i im Schatten, wenn ein Pixel j links davon mit
+#     h_j + j * s * tan(e)  >  h_i + i * s * tan(e)
+# existiert (s = Pixelgröße, e = Sonnenhöhe). Mit g = h + x * s * tan(e)
+# ist das ein laufendes Maximum entlang jeder Zeile - ein einziger
+# O(N)-Durchlauf (np.maximum.accumulate) statt Ray-Marching pro Pixel.
+#
+# Sichtbarkeit: Das Höhenfeld wird um den Beobachter in Polarkoordinaten
+# umgelegt (cv2.warpPolar). Entlang jedes Strahls ist ein Punkt sichtbar,
+# wenn sein Steigungswinkel mindestens so groß ist wie das Maximum aller
+# Punkte davor - wieder ein laufendes Maximum, danach zurück ins Bild.
+
+NO_HEIGHT = -1e6
+
+
+def height_field_from_depth(depth_image, depth_scale, height_model=None):
+    """
+    Höhenfeld in Metern (oben = größer) aus einem Tiefenbild. Löcher werden
+    auf die niedrigste gemessene Höhe gesetzt, damit sie keine Schatten werfen.
+    height_model (tableGeometry.HeightModel): Höhe über der Tischebene statt
+    Abstand zum tiefsten Punkt entlang der optischen Achse
+    """
+    if height_model is not None:
+        valid = depth_image > 0
+        height_field = height_model.height(depth_image, depth_scale, valid.view(np.uint8))
+        if np.any(valid):
+            height_field[~valid] = height_field[valid].min()
+        return height_field
+    depth = depth_image.astype(np.float32) * depth_scale
+    valid = depth > 0
+    height_field = np.zeros_like(depth)
+    if np.any(valid):
+        height_field[valid] = depth[valid].max() - depth[valid]
+    return height_field
+
+
+def _rotation_to_sun(azimuth_deg, shape):
+    """
+    Affine Matrix, die das Bild so dreht, dass die Sonne links (x = 0) steht,
+    plus Größe der gedrehten Leinwand. Azimut: 0° = oben im Bild, im
+    Uhrzeigersinn.
+    """
+    height, width = shape
+    phi = np.deg2rad(-90.0 - azimuth_deg)
+    c, s = np.cos(phi), np.sin(phi)
+    rotation = np.array([[c, -s], [s, c]])
+    corners = np.array([[0, 0], [width - 1, 0], [0, height - 1], [width - 1, height - 1]], dtype=np.float64)
+    rotated = corners @ rotation.T
+    offset = -rotated.min(axis=0)
+    size = np.ceil(rotated.max(axis=0) + offset).astype(int) + 1
+    matrix = np.hstack([rotation, offset[:, None]])
+    return matrix, (int(size[0]), int(size[1]))
+
+
+def compute_sun_shadows(height_field, azimuth_deg, elevation_deg, pixel_size, tolerance=0.002):
+    """
+    Schattenmaske (uint8, 255 = Schatten) für die Sonne bei Azimut/Elevation.
+
+    Parameter:
+    - height_field: Höhen in Metern
+    - pixel_size: Kantenlänge eines Pixels in Metern
+    - tolerance: Meter, um die ein Punkt verdeckt sein muss (gegen Rauschen)
+    """
+    if elevation_deg <= 0:
+        return np.full(height_field.shape, 255, dtype=np.uint8)  # Nacht
+
+    matrix, size = _rotation_to_sun(azimuth_deg, height_field.shape)
+    rotated = cv2.warpAffine(height_field, matrix, size, flags=cv2.INTER_NEAREST,
+                             borderMode=cv2.BORDER_CONSTANT, borderValue=NO_HEIGHT)
+
+    slope = np.float32(np.tan(np.deg2rad(elevation_deg)) * pixel_size)
+    ramp = np.arange(size[0], dtype=np.float32) * slope
+    g = rotated + ramp
+    horizon = np.maximum.accumulate(g, axis=1)
+    # Maximum der Pixel *vor* i: um eins nach rechts verschieben
+    horizon[:, 1:] = horizon[:, :-1]
+    horizon[:, 0] = NO_HEIGHT
+    shadow_rotated = ((horizon - g) > tolerance).astype(np.uint8) * 255
+
+    shadow = cv2.warpAffine(shadow_rotated, matrix, height_field.shape[::-1],
+                            flags=cv2.INTER_NEAREST | cv2.WARP_INVERSE_MAP)
+    return shadow
+
+
+def compute_viewshed(height_field, x, y, observer_height, pixel_size, tolerance=0.002):
+    """
+    Sichtbarkeitsmaske (uint8, 255 = sichtbar) vom Punkt (x, y) in Pixeln,
+    mit Augenhöhe observer_height in Metern über dem Boden.
+    """
+    height, width = height_field.shape
+    center = (float(x), float(y))
+    max_radius = float(np.hypot(max(x, width - x), max(y, height - y)))
+    num_rays = int(2 * np.pi * max_radius) // 2 + 1
+    num_steps = int(max_radius) + 1
+
+    polar = cv2.warpPolar(height_field, (num_steps, num_rays), center, max_radius,
+                          cv2.INTER_NEAREST | cv2.WARP_POLAR_LINEAR)
+    eye = height_field[int(y), int(x)] + observer_height
+
+    distance = (np.arange(num_steps, dtype=np.float32) + 0.5) * (max_radius / num_steps) * pixel_size
+    slope = (polar - eye) / distance
+    horizon = np.maximum.accumulate(slope, axis=1)
+    horizon[:, 1:] = horizon[:, :-1]
+    horizon[:, 0] = -np.inf
+    # Toleranz als Höhe am jeweiligen Punkt
+    visible_polar = ((slope + tolerance / distance) >= horizon).astype(np.uint8) * 255
+
+    visible = cv2.warpPolar(visible_polar, (width, height), center, max_radius,
+                            cv2.INTER_NEAREST | cv2.WARP_POLAR_LINEAR | cv2.WARP_INVERSE_MAP)
+    return visible
+
+
+class ShadowAnalysis:
+    """
+    Hält Sonnenstand und Beobachterpunkt und cached die Ergebnisse, bis
+    sich das Höhenfeld (um mehr als change_threshold Meter) oder die
+    Parameter ändern.
+    """
+
+    def __init__(self, azimuth_deg=135.0, elevation_deg=30.0, change_threshold=0.004):
+        self.azimuth_deg = azimuth_deg
+        self.elevation_deg = elevation_deg
+        self.viewpoint = None  # (x, y, Augenhöhe) in normierten Koordinaten / Metern
+        self.change_threshold = change_threshold
+        self.recomputed = 0
+
+        self._lock = threading.Lock()
+        self._reference = None
+        self._params = None
+        self._shadow = None
+        self._visible = None
+
+    def set_sun(self, azimuth_deg, elevation_deg):
+        with self._lock:
+            self.azimuth_deg = azimuth_deg
+            self.elevation_deg = elevation_deg
+
+    def set_viewpoint(self, x, y, observer_height=0.02):
+        """Beobachter bei (x, y) in 0..1, Augenhöhe in Metern (None = aus)"""
+        with self._lock:
+            self.viewpoint = None if x is None else (x, y, observer_height)
+
+    def _height_field_changed(self, height_field):
+        if self._reference is None or self._reference.shape != height_field.shape:
+            return True
+        diff = cv2.absdiff(height_field, self._reference)
+        return cv2.minMaxLoc(diff)[1] > self.change_threshold
+
+    def compute(self, height_field, pixel_size):
+        """Rückgabe: (shadow_mask, visible_mask oder None), ggf. aus dem Cache"""
+        with self._lock:
+            params = (self.azimuth_deg, self.elevation_deg, self.viewpoint, pixel_size)
+            if params == self._params and not self._height_field_changed(height_field):
+                return self._shadow, self._visible
+
+            shadow = compute_sun_shadows(height_field, self.azimuth_deg, self.elevation_deg, pixel_size)
+            visible = None
+            if self.viewpoint is not None:
+                height, width = height_field.shape
+                vx, vy, observer_height = self.viewpoint
+                visible = compute_viewshed(height_field, vx * (width - 1), vy * (height - 1),
+                                           observer_height, pixel_size)
+
+            self._reference = height_field.copy()
+            self._params = params
+            self._shadow, self._visible = shadow, visible
+            self.recomputed += 1
+            return shadow, visible
+
+    def status(self):
+        with self._lock:
+            return {
+                "azimuth_deg": self.azimuth_deg,
+                "elevation_deg": self.elevation_deg,
+                "viewpoint": self.viewpoint,
+                "recomputed": self.recomputed,
+            }
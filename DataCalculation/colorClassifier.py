@@ -0,0 +1,267 @@
+import threading
+
+import cv2
+import numpy as np
+from DataCalculation.frameWorkspace import buffer
+
+# ===============================================
+# Farb-Klassifikator über eine BGR-Lookup-Tabelle
+# ===============================================
+#
+# Statt BGR -> HSV umzurechnen und pro Klasse cv2.inRange aufzurufen, wird
+# einmal eine quantisierte Tabelle (bits=5: 32x32x32 Farbwürfel) gebaut, die
+# jeder Farbe ihre Klassen zuordnet (Bit-Flags, eine Farbe kann zu Straße
+# und Park gehören, wie bei überlappenden HSV-Bereichen). Quelle der Tabelle:
+# - die HSV-Schwellen aus detectBuildings (from_ranges), pro Würfelzelle
+#   zählt die Mehrheit der enthaltenen Farben, oder
+# - beim Einrichten angeklickte Farbproben (from_samples), nächster
+#   Nachbar im Lab-Farbraum.
+#
+# Für die Abfrage wird die Tabelle auf alle 2^24 Farben ausgerollt (16 MB).
+# Das Farbbild wird nach BGRA kopiert und als int32 gelesen: B + G<<8 + R<<16
+# + 255<<24, also (Alpha 255) genau Farbindex - 2^24. np.take versteht
+# negative Indizes wie Python-Listen und landet so ohne weitere Rechnung auf
+# dem richtigen Eintrag: ein einziger Gather-Durchlauf pro Frame.
+#
+# Neues Papier: Proben nehmen bzw. Schwellen ändern und die Tabelle neu bauen.
+
+ROAD = 1
+PARK = 2
+CLASSES = {"background": 0, "road": ROAD, "park": PARK}
+
+# Farbmasken (0/255) aus den Klassen-Flags
+_FLAG_TO_MASK = {
+    flag: np.where(np.arange(256) & flag, 255, 0).astype(np.uint8)
+    for flag in (ROAD, PARK)
+}
+
+
+def default_ranges():
+    """HSV-Bereiche wie in extract_road_candidates und detect_parks"""
+    from DataCalculation import detectBuildings
+    return {
+        ROAD: (detectBuildings.ROAD_HSV_LOWER, detectBuildings.ROAD_HSV_UPPER),
+        PARK: (detectBuildings.PARK_HSV_LOWER, detectBuildings.PARK_HSV_UPPER),
+    }
+
+
+def build_table_from_ranges(ranges, bits=5):
+    """
+    Tabelle [B, G, R] (je 2^bits Stufen) aus HSV-Bereichen {Flag: (lower, upper)}.
+    Eine Zelle bekommt ein Flag, wenn mindestens die Hälfte ihrer Farben im
+    Bereich liegt. Gerechnet wird über alle 2^24 Farben, scheibenweise pro R-Stufe.
+    """
+    levels = 1 << bits
+    step = 256 // levels
+    table = np.zeros((levels, levels, levels), dtype=np.uint8)
+    g, b = np.meshgrid(np.arange(256, dtype=np.uint8), np.arange(256, dtype=np.uint8), indexing="ij")
+    for r_level in range(levels):
+        # Alle Farben mit R in dieser Stufe als Bild (step*256 x 256)
+        colors = np.empty((step, 256, 256, 3), dtype=np.uint8)
+        colors[..., 0] = b
+        colors[..., 1] = g
+        colors[..., 2] = (r_level * step + np.arange(step, dtype=np.uint8))[:, None, None]
+        hsv = cv2.cvtColor(colors.reshape(step * 256, 256, 3), cv2.COLOR_BGR2HSV)
+        for flag, (lower, upper) in ranges.items():
+            inside = cv2.inRange(hsv, np.asarray(lower), np.asarray(upper)).reshape(step, levels, step, levels, step)
+            # Anteil pro Zelle (Achsen: r, g-Stufe, g, b-Stufe, b)
+            count = np.count_nonzero(inside.transpose(3, 1, 0, 2, 4).reshape(levels, levels, -1), axis=2)
+            table[:, :, r_level][count * 2 >= step ** 3] |= flag
+    return table
+
+
+def _to_lab(bgr):
+    bgr = np.ascontiguousarray(bgr, dtype=np.uint8).reshape(-1, 1, 3)
+    return cv2.cvtColor(bgr, cv2.COLOR_BGR2LAB).reshape(-1, 3).astype(np.float32)
+
+
+def build_table_from_samples(samples, bits=5, max_distance=20.0, max_samples=2000, seed=0):
+    """
+    Tabelle aus Farbproben {Flag: Nx3 BGR}. Flag 0 sind Hintergrund-Proben
+    (z.B. Sand), die Farben gezielt ausschließen. Jede Zelle bekommt die
+    Klasse der nächsten Probe (Lab-Abstand, Zellmitte), wenn diese näher
+    als max_distance liegt.
+    """
+    levels = 1 << bits
+    step = 256 // levels
+    rng = np.random.default_rng(seed)
+    labels, colors = [], []
+    for flag, values in samples.items():
+        # Gleiche Farben nur einmal (eine Probe enthält viele gleiche Pixel)
+        values = np.unique(np.asarray(values, dtype=np.uint8).reshape(-1, 3), axis=0)
+        if len(values) > max_samples:
+            values = values[rng.choice(len(values), max_samples, replace=False)]
+        labels.append(np.full(len(values), flag, dtype=np.uint8))
+        colors.append(values)
+    table = np.zeros((levels, levels, levels), dtype=np.uint8)
+    if not colors or sum(len(c) for c in colors) == 0:
+        return table
+    labels = np.concatenate(labels)
+    sample_lab = _to_lab(np.concatenate(colors))
+
+    centers = (np.arange(levels) * step + step // 2).astype(np.uint8)
+    b, g, r = np.meshgrid(centers, centers, centers, indexing="ij")
+    center_lab = _to_lab(np.stack([b, g, r], axis=-1))
+
+    flat = table.reshape(-1)
+    max_distance_sq = np.float32(max_distance) ** 2
+    sample_norm = (sample_lab ** 2).sum(axis=1)
+    for start in range(0, len(center_lab), 2048):
+        chunk = center_lab[start:start + 2048]
+        # |c - s|^2 = |c|^2 - 2 c.s + |s|^2, als Matrixprodukt
+        distance_sq = chunk @ (-2.0 * sample_lab.T)
+        distance_sq += sample_norm
+        distance_sq += (chunk ** 2).sum(axis=1)[:, None]
+        nearest = np.argmin(distance_sq, axis=1)
+        close = distance_sq[np.arange(len(chunk)), nearest] <= max_distance_sq
+        flat[start:start + len(chunk)] = np.where(close, labels[nearest], 0)
+    return table
+
+
+def expand_table(table):
+    """Quantisierte Tabelle [B, G, R] -> 2^24 Einträge, Index B + G<<8 + R<<16"""
+    step = 256 // table.shape[0]
+    by_rgb = table.transpose(2, 1, 0)
+    for axis in range(3):
+        by_rgb = np.repeat(by_rgb, step, axis=axis)
+    return np.ascontiguousarray(by_rgb).reshape(-1)
+
+
+class ColorClassifier:
+    """
+    Straßen-/Park-Kandidaten aus dem Farbbild über die Lookup-Tabelle.
+
+    Die quantisierte Tabelle (table) ist das eigentliche Modell, version
+    zählt jede Änderung mit (für Prozess-Worker, die eine Kopie halten).
+    """
+
+    def __init__(self, table=None, bits=5):
+        self.bits = bits
+        self.source = None
+        self.ranges = {flag: (np.array(lower), np.array(upper))
+                       for flag, (lower, upper) in default_ranges().items()}
+        self.samples = {flag: [] for flag in CLASSES.values()}
+        self._pending_samples = []
+        self._lock = threading.Lock()
+        self.version = 0
+        self.table = None
+        self._lookup = None
+        if table is not None:
+            self.set_table(table, "table")
+
+    @classmethod
+    def from_ranges(cls, ranges=None, bits=5):
+        classifier = cls(bits=bits)
+        if ranges is not None:
+            classifier.ranges = dict(ranges)
+        classifier.rebuild_from_ranges()
+        return classifier
+
+    # Prozess-Worker bekommen nur die kleine Tabelle und rollen sie selbst aus
+    def __getstate__(self):
+        return {"bits": self.bits, "source": self.source, "version": self.version, "table": self.table}
+
+    def __setstate__(self, state):
+        self.__init__(bits=state["bits"])
+        self.source = state["source"]
+        if state["table"] is not None:
+            self.set_table(state["table"], state["source"])
+        self.version = state["version"]
+
+    def set_table(self, table, source):
+        lookup = expand_table(table)
+        with self._lock:
+            self.table = table
+            self._lookup = lookup
+            self.source = source
+            self.version += 1
+
+    def rebuild_from_ranges(self, ranges=None):
+        """Tabelle aus HSV-Bereichen neu bauen (ranges: {Flag: (lower, upper)}, Rest bleibt)"""
+        if ranges:
+            self.ranges.update({flag: (np.array(lower), np.array(upper))
+                                for flag, (lower, upper) in ranges.items()})
+        self.set_table(build_table_from_ranges(self.ranges, self.bits), "ranges")
+
+    def rebuild_from_samples(self, max_distance=20.0):
+        """Tabelle aus den gesammelten Farbproben neu bauen"""
+        with self._lock:
+            samples = {flag: np.concatenate(values) for flag, values in self.samples.items() if values}
+        if not any(flag != 0 for flag in samples):
+            raise ValueError("Keine Farbproben für Straße oder Park")
+        self.set_table(build_table_from_samples(samples, self.bits, max_distance), "samples")
+
+    # --------------------------------------------------------------
+    # Farbproben (Einrichtung)
+    # --------------------------------------------------------------
+
+    def request_sample(self, flag, x, y, radius=0.01):
+        """
+        Probe anfordern: Kreis um (x, y) in normierten Bildkoordinaten
+        (0..1), Radius relativ zur Bildbreite. Eingesammelt wird beim
+        nächsten Frame über collect_samples().
+        """
+        with self._lock:
+            self._pending_samples.append((flag, x, y, radius))
+
+    def collect_samples(self, color_image):
+        """Angeforderte Proben aus diesem Farbbild übernehmen"""
+        if not self._pending_samples:
+            return 0
+        with self._lock:
+            pending, self._pending_samples = self._pending_samples, []
+        height, width = color_image.shape[:2]
+        collected = 0
+        for flag, x, y, radius in pending:
+            mask = np.zeros((height, width), dtype=np.uint8)
+            cv2.circle(mask, (int(x * (width - 1)), int(y * (height - 1))),
+                       max(1, int(radius * width)), 255, -1)
+            colors = color_image[mask > 0].copy()
+            with self._lock:
+                self.samples.setdefault(flag, []).append(colors)
+            collected += len(colors)
+        return collected
+
+    def clear_samples(self):
+        with self._lock:
+            self.samples = {flag: [] for flag in CLASSES.values()}
+            self._pending_samples = []
+
+    def status(self):
+        names = {flag: name for name, flag in CLASSES.items()}
+        with self._lock:
+            return {
+                "source": self.source,
+                "bits": self.bits,
+                "version": self.version,
+                "samples": {names.get(flag, flag): int(sum(len(v) for v in values))
+                            for flag, values in self.samples.items()},
+                "pending_samples": len(self._pending_samples),
+                "ranges": {names[flag]: {"lower": lower.tolist(), "upper": upper.tolist()}
+                           for flag, (lower, upper) in self.ranges.items()},
+                "table_cells": {names[flag]: int(np.count_nonzero(self.table & flag))
+                                for flag in (ROAD, PARK)} if self.table is not None else None,
+            }
+
+    # --------------------------------------------------------------
+    # Klassifikation
+    # --------------------------------------------------------------
+
+    def classify(self, color_image, workspace=None):
+        """Klassen-Flags pro Pixel (uint8), ein Gather-Durchlauf über das Bild"""
+        lookup = self._lookup
+        if lookup is None:
+            raise RuntimeError("Farbtabelle noch nicht gebaut")
+        shape = color_image.shape[:2]
+        bgra = cv2.cvtColor(color_image, cv2.COLOR_BGR2BGRA,
+                            dst=buffer(workspace, "classifier_bgra", shape + (4,)))
+        # int32-Sicht: Farbindex - 2^24 (Alpha 255), siehe oben
+        return np.take(lookup, bgra.view(np.int32)[..., 0],
+                       out=buffer(workspace, "classifier_labels", shape))
+
+    def candidates(self, color_image, workspace=None):
+        """Straßen- und Park-Kandidaten (0/255), Ersatz für die beiden inRange auf HSV"""
+        labels = self.classify(color_image, workspace)
+        road = cv2.LUT(labels, _FLAG_TO_MASK[ROAD], dst=buffer(workspace, "road_candidate", labels.shape))
+        park = cv2.LUT(labels, _FLAG_TO_MASK[PARK], dst=buffer(workspace, "park_candidate", labels.shape))
+        return road, park
@@ -1,20 +1,90 @@
+import threading
+
 import cv2
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from DataCalculation.frameWorkspace import acquire_workspace, buffer
+
+# Gemeinsamer Thread-Pool für die unabhängigen Zweige von detect_Buildings
+# (OpenCV gibt während der Berechnung den GIL frei). Angelegt beim ersten
+# Aufruf, der Lock verhindert zwei Pools bei gleichzeitigem Start mehrerer
+# Threads (Streams, Broadcaster, Layout-Log).
+_branch_executor = None
+_branch_executor_lock = threading.Lock()
+
+# Verarbeitungsmaßstab (1.0 = volle Auflösung). Der Qualitätsregler senkt
+# ihn, wenn die Bildrate nicht mehr reicht.
+processing_scale = 1.0
+
+# Standard für den Tiefen-Zweig: False = float32 in Metern, True =
+# ganzzahlig in Sensor-Einheiten (siehe detect_building_branch_integer).
+# Pro Kamera über camera.integer_depth einstellbar.
+integer_depth = False
+
+# Farb-Klassifikator (colorClassifier.ColorClassifier) für Straßen- und
+# Park-Kandidaten. None = HSV-Umrechnung mit den Schwellen unten.
+color_classifier = None
+
+# Geometrisches Höhenmodell (tableGeometry.HeightModel): Höhe über der
+# eingemessenen Tischebene statt Abstand zur Kamera. None = depth * depth_scale
+# und relative Höhe per Min/Max-Normierung pro Frame.
+height_model = None
+
+def get_branch_executor():
+    global _branch_executor
+    executor = _branch_executor
+    if executor is not None:
+        return executor
+    with _branch_executor_lock:
+        if _branch_executor is None:
+            _branch_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="detect")
+        return _branch_executor
+
+# Strukturelemente (einmal angelegt statt bei jedem Aufruf)
+KERNEL_NOISE = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3,3))
+KERNEL_BUILDING_CLOSE = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (9,9))
+KERNEL_BUILDING_OPEN = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5,5))
+KERNEL_BUILDING_DILATE = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (7,7))
+KERNEL_ROAD = cv2.getStructuringElement(cv2.MORPH_RECT, (7,7))
+KERNEL_ROAD_GAPS = cv2.getStructuringElement(cv2.MORPH_RECT, (15,15))
+KERNEL_SHADOW = np.ones((15,15), np.uint8)
+KERNEL_PARK = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (9,9))
+
+ROAD_HSV_LOWER = np.array([90,30,30])
+ROAD_HSV_UPPER = np.array([130,150,150])
+PARK_HSV_LOWER = np.array([35, 40, 40])
+PARK_HSV_UPPER = np.array([90, 255, 255])
 
 # ===============================================
 # Hilfsfunktionen für die Gebäudeerkennung
 # ===============================================
+#
+# Alle Hilfsfunktionen nehmen optional einen FrameWorkspace (siehe
+# frameWorkspace.py) und schreiben ihre Zwischenbilder per dst=/out= in
+# dessen Puffer. Ohne Arbeitsbereich legen sie wie bisher neue Arrays an.
 
-def compute_height_from_depth(depth_image, depth_scale):
+def compute_height_from_depth(depth_image, depth_scale, workspace=None, dst=None, height_model=None):
     """
     Berechnet die Höhe aus dem Tiefenbild unter Verwendung des depth_scale.
     Gibt gefilterte Höhe und gültige Pixelmaske zurück.
-    """
-    height_map = depth_image.astype(np.float32) * depth_scale
-    valid = (height_map > 0)
+    dst: optionales float32-Array für die gefilterte Höhe
+    height_model: Höhe in Metern über der Tischebene (tableGeometry) statt
+    depth * depth_scale, gültig sind dann alle Pixel mit Tiefe
+    """
+    shape = depth_image.shape[:2]
+    height_map = buffer(workspace, "height_map", shape, np.float32)
+    if height_model is not None:
+        valid = np.greater(depth_image, 0, out=buffer(workspace, "valid", shape, np.bool_))
+        height_model.height(depth_image, depth_scale, valid.view(np.uint8), out=height_map)
+    else:
+        np.multiply(depth_image, np.float32(depth_scale), out=height_map, dtype=np.float32)
+        valid = np.greater(height_map, 0, out=buffer(workspace, "valid", shape, np.bool_))
     
     # Option 1: GaussianBlur (schnell, weiche Glättung)
-    height_map_filtered = cv2.GaussianBlur(height_map, (7, 7), 0)
+    if dst is None:
+        dst = buffer(workspace, "height_map_filtered", shape, np.float32)
+    height_map_filtered = cv2.GaussianBlur(height_map, (7, 7), 0, dst=dst)
     
     # Option 2: Bilateral Filter (langsamer, erhält Kanten besser)
     # height_map_filtered = cv2.bilateralFilter(height_map, 9, 75, 75)
@@ -25,22 +95,31 @@ def compute_height_from_depth(depth_image, depth_scale):
     
     return height_map_filtered, valid
 
-def estimate_relative_height(height_map_filtered, valid):
+def estimate_relative_height(height_map_filtered, valid, workspace=None, height_model=None):
     """
     Schätzt die relative Höhe basierend auf Höhe und gültigen Pixeln.
-    """
-    relative_height = np.zeros_like(height_map_filtered)
-    
-    # Globale relative Höhe
-    if np.any(valid):
-        min_h = np.min(height_map_filtered[valid])
-        max_h = np.max(height_map_filtered[valid])
+    Mit height_model fester Maßstab (Höhe über dem Tisch / height_range)
+    statt Min/Max-Normierung pro Frame.
+    """
+    relative_height = buffer(workspace, "relative_height", height_map_filtered.shape, np.float32)
+    if height_model is not None:
+        return height_model.relative(height_map_filtered, valid, out=relative_height)
+    
+    # Globale relative Höhe (Minimum/Maximum über die gültigen Pixel ohne Kopie)
+    valid_u8 = valid.view(np.uint8)
+    if cv2.countNonZero(valid_u8) > 0:
+        min_h, max_h, _, _ = cv2.minMaxLoc(height_map_filtered, mask=valid_u8)
+        min_h, max_h = np.float32(min_h), np.float32(max_h)
         if max_h > min_h:
-            relative_height[valid] = (height_map_filtered[valid] - min_h) / (max_h - min_h)
+            np.subtract(height_map_filtered, min_h, out=relative_height)
+            np.divide(relative_height, max_h - min_h, out=relative_height)
+            np.multiply(relative_height, valid, out=relative_height)
+            return relative_height
     
+    relative_height.fill(0)
     return relative_height
 
-def compute_local_height_difference(height_map_filtered, valid):
+def compute_local_height_difference(height_map_filtered, valid, workspace=None):
     """
     Berechnet lokale Höhenunterschiede zur Umgebung.
     Dies erkennt Bau-Steine auch auf Hügeln, da nur der Sprung gemessen wird.
@@ -55,71 +134,84 @@ def compute_local_height_difference(height_map_filtered, valid):
     """
     # Lokaler Durchschnitt der Umgebung (größerer Kernel für sanfte Hügel)
     kernel_size = 21  # Muss ungerade sein, größer = erkennt sanftere Hügel
-    local_mean = cv2.blur(height_map_filtered, (kernel_size, kernel_size))
+    shape = height_map_filtered.shape
+    local_mean = cv2.blur(height_map_filtered, (kernel_size, kernel_size),
+                          dst=buffer(workspace, "local_mean", shape, np.float32))
     
     # Höhendifferenz: Wie viel höher ist jeder Punkt als seine Umgebung?
-    height_difference = height_map_filtered - local_mean
+    height_difference = np.subtract(height_map_filtered, local_mean,
+                                    out=buffer(workspace, "height_difference", shape, np.float32))
     
     # Nur positive Unterschiede (Objekte die HÖHER sind als Umgebung)
-    height_difference[height_difference < 0] = 0
-    height_difference[~valid] = 0
+    np.maximum(height_difference, 0, out=height_difference)
+    np.multiply(height_difference, valid, out=height_difference)
     
     return height_difference
 
-def generate_building_candidates(relative_height, height_map_filtered, valid, height_difference):
+def generate_building_candidates(relative_height, height_map_filtered, valid, height_difference,
+                                 workspace=None):
     """
     Erzeugt eine binäre Maske der Gebäudekandidaten basierend auf Schwellenwerten.
     OPTIMIERT für AR Sandbox mit hügeligem Untergrund.
     """
-    building_candidate = np.zeros_like(relative_height, dtype=np.uint8)
+    shape = relative_height.shape
+    local_height_mask = buffer(workspace, "local_height_mask", shape, np.bool_)
+    absolute_height_mask = buffer(workspace, "absolute_height_mask", shape, np.bool_)
+    condition = buffer(workspace, "condition", shape, np.bool_)
     
     # STRATEGIE 1: Lokale Höhendifferenz (funktioniert bei Hügeln!)
     # Ein Bau-Stein ist 1-19cm höher als seine unmittelbare Umgebung
-    local_height_mask = (height_difference >= 0.01) & (height_difference <= 0.20)
+    np.greater_equal(height_difference, 0.01, out=local_height_mask)
+    np.less_equal(height_difference, 0.20, out=condition)
+    np.logical_and(local_height_mask, condition, out=local_height_mask)
     
     # STRATEGIE 2: Absolute Höhe (nur als Backup für flachen Untergrund)
     # Funktioniert wenn Sand relativ flach ist
-    absolute_height_mask = (height_map_filtered >= 0.01) & (height_map_filtered <= 0.20)
+    np.greater_equal(height_map_filtered, 0.01, out=absolute_height_mask)
+    np.less_equal(height_map_filtered, 0.20, out=condition)
+    np.logical_and(absolute_height_mask, condition, out=absolute_height_mask)
     
     # STRATEGIE 3: Relative Höhe (für sehr variable Szenen)
-    relative_mask = relative_height > 0.15
+    relative_mask = np.greater(relative_height, 0.15, out=condition)
     
     # Kombiniere: Hauptsächlich lokale Differenz, aber auch andere akzeptieren
     # ODER-Verknüpfung: Mindestens eine Strategie muss zutreffen
-    building_candidate[(local_height_mask | (absolute_height_mask & relative_mask)) & valid] = 255
+    np.logical_and(absolute_height_mask, relative_mask, out=absolute_height_mask)
+    np.logical_or(local_height_mask, absolute_height_mask, out=local_height_mask)
+    np.logical_and(local_height_mask, valid, out=local_height_mask)
+    building_candidate = np.multiply(local_height_mask.view(np.uint8), 255,
+                                     out=buffer(workspace, "building_candidate", shape))
     
     # Entferne kleine Rauschpunkte
-    kernel_noise = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3,3))
-    building_candidate = cv2.morphologyEx(building_candidate, cv2.MORPH_OPEN, kernel_noise)
-    
-    return building_candidate
+    return cv2.morphologyEx(building_candidate, cv2.MORPH_OPEN, KERNEL_NOISE,
+                            dst=buffer(workspace, "building_candidate_open", shape))
 
-def refine_building_mask(building_candidate):
+def refine_building_mask(building_candidate, workspace=None):
     """
     Verbessert die Gebäudemaske durch morphologische Operationen.
     OPTIMIERT: Füllt Gebäude vollständig aus, nicht nur Ränder.
     """
+    shape = building_candidate.shape
+    closed = buffer(workspace, "building_refine_a", shape)
+    opened = buffer(workspace, "building_refine_b", shape)
+
     # 1. Schließe kleine Lücken innerhalb der Gebäude
-    kernel_close = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (9,9))
-    building_candidate = cv2.morphologyEx(building_candidate, cv2.MORPH_CLOSE, kernel_close)
+    cv2.morphologyEx(building_candidate, cv2.MORPH_CLOSE, KERNEL_BUILDING_CLOSE, dst=closed)
     
     # 2. Entferne kleine Rauschregionen außerhalb
-    kernel_open = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5,5))
-    building_candidate = cv2.morphologyEx(building_candidate, cv2.MORPH_OPEN, kernel_open)
+    cv2.morphologyEx(closed, cv2.MORPH_OPEN, KERNEL_BUILDING_OPEN, dst=opened)
     
     # 3. Dilatation um sicherzustellen, dass Gebäude zusammenhängend sind
-    kernel_dilate = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (7,7))
-    building_candidate = cv2.dilate(building_candidate, kernel_dilate, iterations=1)
-    
-    return building_candidate
+    return cv2.dilate(opened, KERNEL_BUILDING_DILATE, dst=closed, iterations=1)
 
-def filter_building_contours(building_candidate):
+def filter_building_contours(building_candidate, workspace=None):
     """
     Filtert Gebäudekonturen nach Fläche und Form.
     OPTIMIERT: Akzeptiert verschiedene Klötzchen-Gebäudegrößen.
     """
     contours, _ = cv2.findContours(building_candidate, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    building_mask = np.zeros_like(building_candidate)
+    building_mask = buffer(workspace, "building_contours", building_candidate.shape)
+    building_mask.fill(0)
     for cnt in contours:
         area = cv2.contourArea(cnt)
         # Sehr breiter Bereich für verschiedene Klötzchen-Größen
@@ -130,95 +222,106 @@ def filter_building_contours(building_candidate):
             cv2.drawContours(building_mask, [cnt], -1, 255, thickness=cv2.FILLED)
     return building_mask
 
-def smooth_building_mask(building_mask):
+def smooth_building_mask(building_mask, workspace=None, dst=None):
     """
     Glättet die Gebäudemaske, um Kanten zu mildern.
+    dst: optionales Zielarray für die fertige Maske
     """
-    building_mask = cv2.GaussianBlur(building_mask, (3,3), 0)
-    _, building_mask = cv2.threshold(building_mask, 127, 255, cv2.THRESH_BINARY)
+    blurred = cv2.GaussianBlur(building_mask, (3,3), 0,
+                               dst=buffer(workspace, "building_smooth", building_mask.shape))
+    _, building_mask = cv2.threshold(blurred, 127, 255, cv2.THRESH_BINARY, dst=dst)
     return building_mask
 
 # ===============================================
 # Hilfsfunktionen für die Straßenerkennung
 # ===============================================
 
-def extract_road_candidates(hsv):
+def extract_road_candidates(hsv, workspace=None):
     """
     Extrahiert potenzielle Straßenbereiche (dunkler Papierstreifen) im HSV-Bereich.
     OPTIMIERT für AR Sandbox mit dunkelgrauem Papier.
     """
     # Beispiel für helle Grau- bis Weißtöne (Straßenfarbe)
-    lower_road = np.array([90,30,30])
-    upper_road = np.array([130,150,150])
-    road_candidate_mask = cv2.inRange(hsv, lower_road, upper_road)
+    road_candidate_mask = cv2.inRange(hsv, ROAD_HSV_LOWER, ROAD_HSV_UPPER,
+                                      dst=buffer(workspace, "road_candidate", hsv.shape[:2]))
     return road_candidate_mask
 
-def postprocess_road_mask(road_mask):
+def postprocess_road_mask(road_mask, workspace=None):
     """
     Morphologische Nachbearbeitung der Straßenmaske.
     """
-    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (7,7))
-    road_mask = cv2.morphologyEx(road_mask, cv2.MORPH_CLOSE, kernel)
-    road_mask = cv2.morphologyEx(road_mask, cv2.MORPH_OPEN, kernel)
+    closed = cv2.morphologyEx(road_mask, cv2.MORPH_CLOSE, KERNEL_ROAD,
+                              dst=buffer(workspace, "road_closed", road_mask.shape))
+    road_mask = cv2.morphologyEx(closed, cv2.MORPH_OPEN, KERNEL_ROAD,
+                                 dst=buffer(workspace, "road_opened", road_mask.shape))
     return road_mask
 
-def filter_road_contours(road_mask):
+def filter_road_contours(road_mask, workspace=None):
     """
     Filtert Straßenkonturen basierend auf Fläche und Form.
     OPTIMIERT für langen Papierstreifen in AR Sandbox.
     """
     contours, _ = cv2.findContours(road_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    filtered_mask = np.zeros_like(road_mask)
+    filtered_mask = buffer(workspace, "road_contours", road_mask.shape)
+    filtered_mask.fill(0)
     for cnt in contours:
         area = cv2.contourArea(cnt)
         if area > 1000:
             cv2.drawContours(filtered_mask, [cnt], -1, 255, thickness=cv2.FILLED)
     return filtered_mask
 
-def close_road_segments(road_mask):
+def close_road_segments(road_mask, workspace=None):
     """
     Schließt kleine Lücken in Straßensegmenten.
     """
-    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (15,15))
-    road_mask = cv2.morphologyEx(road_mask, cv2.MORPH_CLOSE, kernel)
+    road_mask = cv2.morphologyEx(road_mask, cv2.MORPH_CLOSE, KERNEL_ROAD_GAPS,
+                                 dst=buffer(workspace, "road_mask", road_mask.shape))
     return road_mask
 
 # ===============================================
 # Hilfsfunktion für Schattenkorrektur
 # ===============================================
 
-def correct_shadow_effects(building_mask, road_mask):
+def correct_shadow_effects(building_mask, road_mask, workspace=None):
     """
     Korrigiert Schatteneffekte: Entfernt Straßenbereiche, die unter Gebäudeschatten liegen.
     """
-    shadow_region = cv2.dilate(building_mask, np.ones((15,15), np.uint8))
-    road_mask[shadow_region > 0] = 0
+    shadow_region = cv2.dilate(building_mask, KERNEL_SHADOW,
+                               dst=buffer(workspace, "shadow_region", building_mask.shape))
+    # Maske ist 0/255: Straße nur außerhalb des Schattens behalten
+    cv2.bitwise_not(shadow_region, dst=shadow_region)
+    cv2.bitwise_and(road_mask, shadow_region, dst=road_mask)
     return road_mask
 
 # ===============================================
 # Hilfsfunktion für Park-Erkennung
 # ===============================================
 
-def detect_parks(color_image):
+def detect_parks(color_image, hsv=None, workspace=None, park_candidate=None):
     """
     Erkennung von Parks (grüne Papierschnipsel) basierend auf Farbsegmentierung.
     OPTIMIERT für AR Sandbox mit grünem Papier.
-    """
-    hsv = cv2.cvtColor(color_image, cv2.COLOR_BGR2HSV)
-    
-    # Grüne Farbbereiche (breiter für verschiedene Grüntöne)
-    lower_green = np.array([35, 40, 40])
-    upper_green = np.array([90, 255, 255])
-    park_mask = cv2.inRange(hsv, lower_green, upper_green)
+    Ein bereits berechnetes HSV-Bild oder die fertige Farbmaske
+    (park_candidate, z.B. vom Farb-Klassifikator) kann übergeben werden.
+    """
+    if park_candidate is None:
+        if hsv is None:
+            hsv = cv2.cvtColor(color_image, cv2.COLOR_BGR2HSV,
+                               dst=buffer(workspace, "hsv", color_image.shape))
+        # Grüne Farbbereiche (breiter für verschiedene Grüntöne)
+        park_candidate = cv2.inRange(hsv, PARK_HSV_LOWER, PARK_HSV_UPPER,
+                                     dst=buffer(workspace, "park_candidate", hsv.shape[:2]))
+    shape = park_candidate.shape[:2]
 
     # Morphologie: Schließe Lücken zwischen Papierschnipseln
-    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (9,9))
-    park_mask = cv2.morphologyEx(park_mask, cv2.MORPH_CLOSE, kernel)
-    park_mask = cv2.morphologyEx(park_mask, cv2.MORPH_OPEN, kernel)
+    park_closed = cv2.morphologyEx(park_candidate, cv2.MORPH_CLOSE, KERNEL_PARK,
+                                   dst=buffer(workspace, "park_closed", shape))
+    park_mask = cv2.morphologyEx(park_closed, cv2.MORPH_OPEN, KERNEL_PARK, dst=park_candidate)
     
     # Entferne sehr kleine Schnipsel (Rauschen)
     contours, _ = cv2.findContours(park_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    filtered_park = np.zeros_like(park_mask)
+    filtered_park = buffer(workspace, "park_mask", shape)
+    filtered_park.fill(0)
     for cnt in contours:
         area = cv2.contourArea(cnt)
         if area > 50:  # Mindestgröße für Papierschnipsel
@@ -230,15 +333,20 @@ def detect_parks(color_image):
 # Hilfsfunktion zur Konfliktauflösung der Masken
 # ===============================================
 
-def resolve_mask_conflicts(building_mask, road_mask, park_mask):
+def resolve_mask_conflicts(building_mask, road_mask, park_mask, workspace=None, out=None):
     """
     Löst Konflikte zwischen Masken auf, z.B. überschneidende Bereiche.
+    out: optionale Zielarrays (road_mask, park_mask)
     """
+    road_out, park_out = out if out is not None else (None, None)
+    inverted = buffer(workspace, "inverted_mask", building_mask.shape)
     # Gebäude haben höchste Priorität
-    road_mask = cv2.bitwise_and(road_mask, cv2.bitwise_not(building_mask))
-    park_mask = cv2.bitwise_and(park_mask, cv2.bitwise_not(building_mask))
+    cv2.bitwise_not(building_mask, dst=inverted)
+    road_mask = cv2.bitwise_and(road_mask, inverted, dst=road_out)
+    park_mask = cv2.bitwise_and(park_mask, inverted, dst=park_out)
     # Parks haben Priorität über Straßen
-    road_mask = cv2.bitwise_and(road_mask, cv2.bitwise_not(park_mask))
+    cv2.bitwise_not(park_mask, dst=inverted)
+    road_mask = cv2.bitwise_and(road_mask, inverted, dst=road_mask)
     return road_mask, park_mask
 
 # ===============================================
@@ -288,11 +396,177 @@ def visualize_detection_debug(color_image, depth_image, building_mask, road_mask
         plt.show()
     return fig
 
+# ===============================================
+# Unabhängige Zweige der Erkennung
+# ===============================================
+
+def detect_building_branch(depth_image, depth_scale, workspace=None, out=None, height_out=None,
+                           height_model=None):
+    """
+    Tiefen-Zweig: Höhenkarte -> Kandidaten -> Morphologie -> Konturen.
+    Rückgabe: (building_mask, height_map_filtered) oder (None, None),
+    wenn das Tiefenbild keine gültigen Pixel enthält.
+    out / height_out: optionale Zielarrays für Maske und Höhenkarte
+    height_model: Schwellen in Metern über der Tischebene (tableGeometry)
+    """
+    # 1. Höhe aus Tiefenbild berechnen
+    height_map_filtered, valid = compute_height_from_depth(depth_image, depth_scale,
+                                                           workspace, dst=height_out,
+                                                           height_model=height_model)
+    if cv2.countNonZero(valid.view(np.uint8)) == 0:
+        return None, None
+
+    # 2. Relative Höhe ermitteln (global)
+    relative_height = estimate_relative_height(height_map_filtered, valid, workspace, height_model)
+    
+    # 3. Lokale Höhendifferenz berechnen (wichtig für Hügel!)
+    height_difference = compute_local_height_difference(height_map_filtered, valid, workspace)
+
+    # 4. Gebäude-Kandidaten mit mehreren Strategien erzeugen
+    building_candidate = generate_building_candidates(relative_height, height_map_filtered, 
+                                                      valid, height_difference, workspace)
+
+    # 5. Morphologische Filterung der Gebäudekandidaten
+    building_candidate = refine_building_mask(building_candidate, workspace)
+
+    # 6. Kontur-Analyse für endgültige Gebäudemasken
+    building_mask = filter_building_contours(building_candidate, workspace)
+
+    # 7. Glätten der finalen Gebäudemaske
+    building_mask = smooth_building_mask(building_mask, workspace, dst=out)
+
+    return building_mask, height_map_filtered
+
+def _depth_units(metres, depth_scale):
+    """Schwelle in Metern -> Sensor-Einheiten (gerundet gegen Float-Fehler wie 10.000000000000002)"""
+    return round(metres / depth_scale, 6)
+
+def detect_building_branch_integer(depth_image, depth_scale, workspace=None, out=None, height_out=None):
+    """
+    Tiefen-Zweig ohne Umrechnung in float32-Meter: Glätten, lokaler
+    Mittelwert und alle Schwellen laufen auf dem uint16-Tiefenbild in
+    Sensor-Einheiten (bei depth_scale 0.001 also Millimeter). Die Schwellen
+    werden einmal pro Aufruf von Metern in Einheiten umgerechnet.
+
+    Unterschiede zum float-Zweig: Glättung und lokaler Mittelwert werden auf
+    ganze Einheiten gerundet, die Masken weichen daher an Schwellenkanten um
+    einzelne Pixel ab. Die Höhenkarte (height_out, nur für debug) wird erst
+    am Ende einmal in Meter umgerechnet.
+    Rückgabe wie detect_building_branch.
+    """
+    shape = depth_image.shape[:2]
+    valid = cv2.compare(depth_image, 0, cv2.CMP_GT, dst=buffer(workspace, "valid_u8", shape))
+    if cv2.countNonZero(valid) == 0:
+        return None, None
+
+    # 1. Glätten (OpenCV rechnet GaussianBlur/blur direkt auf uint16)
+    filtered = cv2.GaussianBlur(depth_image, (7, 7), 0,
+                                dst=buffer(workspace, "depth_filtered", shape, np.uint16))
+
+    # 2. Lokale Höhendifferenz: subtract sättigt bei 0, negative Werte fallen weg
+    local_mean = cv2.blur(filtered, (21, 21), dst=buffer(workspace, "depth_local_mean", shape, np.uint16))
+    height_difference = cv2.subtract(filtered, local_mean,
+                                     dst=buffer(workspace, "depth_difference", shape, np.uint16))
+
+    # 3. Kandidaten mit denselben Strategien wie generate_building_candidates
+    low, high = _depth_units(0.01, depth_scale), _depth_units(0.20, depth_scale)
+    low, high = int(np.ceil(low)), int(min(np.floor(high), 65535))
+    local_height_mask = cv2.inRange(height_difference, low, high,
+                                    dst=buffer(workspace, "local_height_mask_u8", shape))
+    absolute_height_mask = cv2.inRange(filtered, low, high,
+                                       dst=buffer(workspace, "absolute_height_mask_u8", shape))
+
+    min_h, max_h, _, _ = cv2.minMaxLoc(filtered, mask=valid)
+    if max_h > min_h:
+        # relative Höhe > 0.15  <=>  Höhe > min + 0.15 * (max - min)
+        relative_low = int(np.floor(min_h + 0.15 * (max_h - min_h))) + 1
+        relative_mask = cv2.inRange(filtered, relative_low, 65535,
+                                    dst=buffer(workspace, "relative_mask_u8", shape))
+        cv2.bitwise_and(absolute_height_mask, relative_mask, dst=absolute_height_mask)
+    else:
+        absolute_height_mask.fill(0)
+    cv2.bitwise_or(local_height_mask, absolute_height_mask, dst=local_height_mask)
+    building_candidate = cv2.bitwise_and(local_height_mask, valid, dst=local_height_mask)
+    building_candidate = cv2.morphologyEx(building_candidate, cv2.MORPH_OPEN, KERNEL_NOISE,
+                                          dst=buffer(workspace, "building_candidate_open", shape))
+
+    # 4.-6. Morphologie, Konturen, Glätten wie im float-Zweig
+    building_candidate = refine_building_mask(building_candidate, workspace)
+    building_mask = filter_building_contours(building_candidate, workspace)
+    building_mask = smooth_building_mask(building_mask, workspace, dst=out)
+
+    if height_out is not None:
+        np.multiply(filtered, np.float32(depth_scale), out=height_out, dtype=np.float32)
+    return building_mask, height_out
+
+def detect_road_branch(hsv, workspace=None, road_candidate_mask=None):
+    """
+    Straßen-Zweig (ohne Schattenkorrektur, die braucht die Gebäudemaske).
+    road_candidate_mask: fertige Farbmaske statt HSV (Farb-Klassifikator)
+    """
+    # 1. Farbbasierte Masken
+    if road_candidate_mask is None:
+        road_candidate_mask = extract_road_candidates(hsv, workspace)
+
+    # 2. Morphologische Nachbearbeitung
+    road_mask_clean = postprocess_road_mask(road_candidate_mask, workspace)
+
+    # 3. Konturfilterung für Straßen (mit Formanalyse)
+    road_mask = filter_road_contours(road_mask_clean, workspace)
+
+    # 4. Finale Verbindung der Straßen
+    road_mask = close_road_segments(road_mask, workspace)
+
+    return road_mask
+
 # ===============================================
 # Hauptfunktion: detect_Buildings
 # ===============================================
 
-def detect_Buildings(depth_image, color_image, depth_scale, baseline_distance, debug=False):
+def _result_arrays(shape, debug, out):
+    """Zielarrays für die drei Masken (und die Höhenkarte bei debug)"""
+    if out is None:
+        out = tuple(np.empty(shape, dtype=np.uint8) for _ in range(3))
+    height_out = np.empty(shape, dtype=np.float32) if debug else None
+    return tuple(out), height_out
+
+def _detect_scaled(depth_image, color_image, depth_scale, baseline_distance, debug, parallel, scale,
+                   out, integer_depth, classifier, height_model):
+    """
+    detect_Buildings auf verkleinerten Bildern, Masken zurück auf Originalgröße.
+    Die Pixel-Schwellen (Konturflächen, Kernel) bleiben unverändert, die
+    Erkennung wird also gröber - das ist der Preis für die Geschwindigkeit.
+    """
+    height, width = depth_image.shape[:2]
+    small_size = (max(1, int(width * scale)), max(1, int(height * scale)))
+    small_shape = (small_size[1], small_size[0])
+    out, height_out = _result_arrays((height, width), debug, out)
+
+    with acquire_workspace(depth_image.shape) as workspace:
+        # Tiefe nicht interpolieren: Mittelwerte mit Löchern (0) wären falsch
+        depth_small = cv2.resize(depth_image, small_size, interpolation=cv2.INTER_NEAREST,
+                                 dst=workspace.get("small_depth", depth_image.dtype, small_shape))
+        color_small = cv2.resize(color_image, small_size, interpolation=cv2.INTER_AREA,
+                                 dst=workspace.get("small_color", color_image.dtype,
+                                                   small_shape + color_image.shape[2:]))
+        small_out = tuple(workspace.get(f"small_mask_{i}", np.uint8, small_shape) for i in range(3))
+        small_height = workspace.get("small_height", np.float32, small_shape) if debug else None
+        with acquire_workspace(small_shape) as small_workspace:
+            results = _detect_full(depth_small, color_small, depth_scale, parallel, small_workspace,
+                                   *small_out, small_height, integer_depth, classifier, height_model)
+        masks = [cv2.resize(mask, (width, height), interpolation=cv2.INTER_NEAREST, dst=target)
+                 for mask, target in zip(results[:3], out)]
+        if debug:
+            height_map = results[3]
+            if height_map is not None:
+                height_map = cv2.resize(height_map, (width, height), interpolation=cv2.INTER_LINEAR,
+                                        dst=height_out)
+            masks.append(height_map)
+    return tuple(masks)
+
+def detect_Buildings(depth_image, color_image, depth_scale, baseline_distance, debug=False,
+                     parallel=True, scale=None, out=None, integer_depth=None, classifier=None,
+                     height_model=None):
     """
     Objekterkennung für AR Sandbox: Erkennung von Gebäuden, Straßen und Parks.
     
@@ -319,6 +593,23 @@ def detect_Buildings(depth_image, color_image, depth_scale, baseline_distance, d
     - depth_scale: Skalierungsfaktor für Tiefenwerte
     - baseline_distance: Abstand der Kameras (derzeit nicht genutzt)
     - debug: Wenn True, gibt zusätzlich die Höhenkarte zurück (default: False)
+    - parallel: Zweige im gemeinsamen Thread-Pool ausführen (default: True)
+    - scale: Verarbeitungsmaßstab, z.B. 0.5 = halbe Auflösung
+      (default: processing_scale)
+    - out: optionale Zielarrays (building_mask, road_mask, park_mask),
+      uint8 in der Größe des Tiefenbilds (z.B. SharedMemory-Slots)
+    - integer_depth: Tiefen-Zweig ganzzahlig in Sensor-Einheiten statt in
+      float32-Metern rechnen (default: integer_depth des Moduls; nur für
+      uint16-Tiefenbilder, sonst immer float)
+    - classifier: ColorClassifier für Straßen/Parks statt HSV-Schwellen
+      (default: color_classifier des Moduls)
+    - height_model: tableGeometry.HeightModel, Höhenschwellen in Metern über
+      der Tischebene (default: height_model des Moduls; schaltet den
+      ganzzahligen Zweig ab, die Höhenkarte ist dann Höhe über dem Tisch)
+
+    Alle Zwischenbilder liegen in einem wiederverwendeten Arbeitsbereich
+    pro Auflösung (frameWorkspace), neu angelegt werden nur die
+    Rückgabe-Arrays (ohne out).
 
     Rückgabe:
     - building_mask: Binärmaske für erkannte Gebäude
@@ -327,81 +618,90 @@ def detect_Buildings(depth_image, color_image, depth_scale, baseline_distance, d
     - (height_map_filtered): Nur wenn debug=True
     """
 
-    # Leere Masken vorbereiten
-    building_mask = np.zeros_like(depth_image, dtype=np.uint8)
-    road_mask = np.zeros_like(depth_image, dtype=np.uint8)
-    park_mask = np.zeros_like(depth_image, dtype=np.uint8)
+    if scale is None:
+        scale = processing_scale
+    if integer_depth is None:
+        integer_depth = globals()["integer_depth"]
+    if height_model is None:
+        height_model = globals()["height_model"]
+    integer_depth = integer_depth and depth_image.dtype == np.uint16 and height_model is None
+    if classifier is None:
+        classifier = color_classifier
+    if scale < 1.0:
+        return _detect_scaled(depth_image, color_image, depth_scale, baseline_distance,
+                              debug, parallel, scale, out, integer_depth, classifier, height_model)
+
+    (building_out, road_out, park_out), height_out = _result_arrays(depth_image.shape[:2], debug, out)
+    with acquire_workspace(depth_image.shape) as workspace:
+        building_mask, road_mask, park_mask, height_map_filtered = _detect_full(
+            depth_image, color_image, depth_scale, parallel, workspace,
+            building_out, road_out, park_out, height_out, integer_depth, classifier, height_model)
 
-    # ========================================================================
-    # GEBÄUDE-ERKENNUNG
-    # ========================================================================
-
-    # 1. Höhe aus Tiefenbild berechnen
-    height_map_filtered, valid = compute_height_from_depth(depth_image, depth_scale)
-    if not np.any(valid):
-        return building_mask, road_mask, park_mask  # Kein gültiges Tiefenbild
-
-    # 2. Relative Höhe ermitteln (global)
-    relative_height = estimate_relative_height(height_map_filtered, valid)
+    if debug:
+        return building_mask, road_mask, park_mask, height_map_filtered
     
-    # 3. Lokale Höhendifferenz berechnen (wichtig für Hügel!)
-    height_difference = compute_local_height_difference(height_map_filtered, valid)
-
-    # 4. Gebäude-Kandidaten mit mehreren Strategien erzeugen
-    building_candidate = generate_building_candidates(relative_height, height_map_filtered, 
-                                                      valid, height_difference)
-
-    # 5. Morphologische Filterung der Gebäudekandidaten
-    building_candidate = refine_building_mask(building_candidate)
-
-    # 6. Kontur-Analyse für endgültige Gebäudemasken
-    building_mask = filter_building_contours(building_candidate)
-
-    # 7. Glätten der finalen Gebäudemaske
-    building_mask = smooth_building_mask(building_mask)
-
-    # ========================================================================
-    # STRASSEN-ERKENNUNG
-    # ========================================================================
-
-    # Farbkonvertierung
-    hsv = cv2.cvtColor(color_image, cv2.COLOR_BGR2HSV)
-
-    # 1. Farbbasierte Masken
-    road_candidate_mask = extract_road_candidates(hsv)
+    return building_mask, road_mask, park_mask
 
-    # 2. Morphologische Nachbearbeitung
-    road_mask_clean = postprocess_road_mask(road_candidate_mask)
-
-    # 3. Konturfilterung für Straßen (mit Formanalyse)
-    road_mask = filter_road_contours(road_mask_clean)
-
-    # 4. Finale Verbindung der Straßen
-    road_mask = close_road_segments(road_mask)
+def _detect_full(depth_image, color_image, depth_scale, parallel, workspace,
+                 building_out, road_out, park_out, height_out, integer_depth=False, classifier=None,
+                 height_model=None):
+    """detect_Buildings in voller Auflösung, Ergebnisse in die Zielarrays"""
+    if integer_depth:
+        building_branch = detect_building_branch_integer
+    else:
+        building_branch = partial(detect_building_branch, height_model=height_model)
 
     # ========================================================================
-    # SCHATTEN-KORREKTUR
+    # PARALLELE ZWEIGE
     # ========================================================================
-
-    road_mask = correct_shadow_effects(building_mask, road_mask)
+    # Gebäude (Tiefe), Straßen und Parks (Farbe) sind bis zur Schatten-
+    # korrektur unabhängig. Der Tiefen-Zweig und die Park-Erkennung laufen
+    # im Thread-Pool, der Straßen-Zweig im aufrufenden Thread. Die Zweige
+    # benutzen verschiedene Puffer desselben Arbeitsbereichs.
+
+    executor = get_branch_executor() if parallel else None
+
+    if executor is not None:
+        building_future = executor.submit(building_branch, depth_image, depth_scale,
+                                          workspace, building_out, height_out)
+
+    if classifier is not None:
+        # Farb-Lookup-Tabelle: beide Farbmasken in einem Durchlauf, ohne HSV
+        hsv = None
+        road_candidate, park_candidate = classifier.candidates(color_image, workspace)
+    else:
+        # Farbkonvertierung (nur einmal, für Straßen und Parks)
+        hsv = cv2.cvtColor(color_image, cv2.COLOR_BGR2HSV, dst=workspace.get("hsv", np.uint8, color_image.shape))
+        road_candidate = park_candidate = None
+
+    if executor is not None:
+        park_future = executor.submit(detect_parks, color_image, hsv, workspace, park_candidate)
+        road_mask = detect_road_branch(hsv, workspace, road_candidate)
+        building_mask, height_map_filtered = building_future.result()
+        park_mask = park_future.result()
+    else:
+        building_mask, height_map_filtered = building_branch(depth_image, depth_scale,
+                                                             workspace, building_out, height_out)
+        road_mask = detect_road_branch(hsv, workspace, road_candidate)
+        park_mask = detect_parks(color_image, hsv, workspace, park_candidate)
+
+    if building_mask is None:
+        # Kein gültiges Tiefenbild: leere Masken
+        for mask in (building_out, road_out, park_out):
+            mask.fill(0)
+        return building_out, road_out, park_out, None
 
     # ========================================================================
-    # PARK-ERKENNUNG
+    # SCHATTEN-KORREKTUR (Zusammenführung)
     # ========================================================================
 
-    park_mask = detect_parks(color_image)
+    road_mask = correct_shadow_effects(building_mask, road_mask, workspace)
 
     # ========================================================================
     # KONFLIKT-AUFLÖSUNG DER MASKEN
     # ========================================================================
 
-    road_mask, park_mask = resolve_mask_conflicts(building_mask, road_mask, park_mask)
+    road_mask, park_mask = resolve_mask_conflicts(building_mask, road_mask, park_mask,
+                                                  workspace, out=(road_out, park_out))
 
-    # ========================================================================
-    # DEBUG-AUSGABE (optional)
-    # ========================================================================
-    
-    if debug:
-        return building_mask, road_mask, park_mask, height_map_filtered
-    
-    return building_mask, road_mask, park_mask
+    return building_mask, road_mask, park_mask, height_map_filtered
@@ -0,0 +1,117 @@
+import cv2
+import numpy as np
+
+# ===============================================
+# Objektlisten aus den Masken von detect_Buildings
+# ===============================================
+
+OBJECT_CLASSES = ("building", "road", "park")
+
+# Breite des Rings um ein Objekt (Pixel), dessen Median als Höhe der
+# Umgebung gilt
+SURROUNDING_WIDTH = 7
+SURROUNDING_KERNEL = cv2.getStructuringElement(cv2.MORPH_ELLIPSE,
+                                               (2 * SURROUNDING_WIDTH + 1, 2 * SURROUNDING_WIDTH + 1))
+
+
+def extract_Objects(building_mask, road_mask, park_mask, height_map=None, camera_distance=True):
+    """
+    Wandelt die drei Binärmasken in eine Liste einzelner Objekte um.
+
+    Parameter:
+    - building_mask, road_mask, park_mask: Masken aus detect_Buildings
+    - height_map: optionale Höhenkarte in Metern (detect_Buildings mit debug=True)
+    - camera_distance: True, wenn height_map der Abstand zur Kamera ist
+      (depth * depth_scale), False bei Höhe über dem Tisch (Höhenmodell)
+
+    Rückgabe: Liste von Dictionaries mit class, bbox, area, centroid, height
+    und der vollen Kontur ("contour", numpy) für objects_to_json().
+    height ist die Höhe über der Umgebung in Metern (Mittel im Objekt gegen
+    den Median eines Rings drumherum), so zählt auf einem Hügel nur der Klotz.
+    """
+    objects = []
+    for object_class, mask in zip(OBJECT_CLASSES, (building_mask, road_mask, park_mask)):
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        for cnt in contours:
+            area = cv2.contourArea(cnt)
+            if area <= 0:
+                continue
+            x, y, w, h = cv2.boundingRect(cnt)
+            moments = cv2.moments(cnt)
+            centroid = (moments["m10"] / moments["m00"], moments["m01"] / moments["m00"])
+
+            height = None
+            if height_map is not None:
+                height = _height_above_surroundings(height_map, cnt, x, y, w, h, camera_distance)
+
+            objects.append({
+                "class": object_class,
+                "bbox": (x, y, w, h),
+                "area": area,
+                "centroid": centroid,
+                "height": height,
+                "contour": cnt,
+            })
+    return objects
+
+
+def _height_above_surroundings(height_map, cnt, x, y, w, h, camera_distance):
+    """Höhe des Objekts über seiner Umgebung (nur im erweiterten Bounding-Box-Ausschnitt)"""
+    x0, y0 = max(x - SURROUNDING_WIDTH, 0), max(y - SURROUNDING_WIDTH, 0)
+    x1 = min(x + w + SURROUNDING_WIDTH, height_map.shape[1])
+    y1 = min(y + h + SURROUNDING_WIDTH, height_map.shape[0])
+    roi = height_map[y0:y1, x0:x1]
+
+    inside = np.zeros(roi.shape, dtype=np.uint8)
+    cv2.drawContours(inside, [cnt - (x0, y0)], -1, 255, thickness=cv2.FILLED)
+    around = cv2.dilate(inside, SURROUNDING_KERNEL)
+    around[inside > 0] = 0
+    if camera_distance:
+        # Abstand 0 = keine Tiefe; beim Höhenmodell ist 0 die Tischebene
+        inside[roi <= 0] = 0
+        around[roi <= 0] = 0
+    if not np.any(inside) or not np.any(around):
+        return None
+
+    difference = cv2.mean(roi, mask=inside)[0] - float(np.median(roi[around > 0]))
+    if camera_distance:
+        # Näher an der Kamera = höher
+        difference = -difference
+    return max(difference, 0.0)
+
+
+def objects_to_json(objects, tolerance=2.0):
+    """
+    Serialisierbare Form der Objektliste. Polygone werden mit
+    Douglas-Peucker (Toleranz in Pixeln) vereinfacht, damit eine Nachricht
+    für eine typische Stadt nur wenige KB groß ist.
+    """
+    result = []
+    for obj in objects:
+        polygon = cv2.approxPolyDP(obj["contour"], tolerance, True).reshape(-1, 2)
+        x, y, w, h = obj["bbox"]
+        result.append({
+            "class": obj["class"],
+            "bbox": [int(x), int(y), int(w), int(h)],
+            "area": round(float(obj["area"]), 1),
+            "centroid": [round(obj["centroid"][0], 1), round(obj["centroid"][1], 1)],
+            "polygon": polygon.tolist(),
+            "height": None if obj["height"] is None else round(obj["height"], 4),
+        })
+    return result
+
+
+def objects_changed(previous, current, tolerance=2.0):
+    """
+    Prüft, ob sich zwei serialisierte Objektlisten sichtbar unterscheiden.
+    Verschiebungen der Bounding-Box bis `tolerance` Pixel gelten als Rauschen.
+    """
+    if previous is None or len(previous) != len(current):
+        return True
+    key = lambda obj: (obj["class"], obj["bbox"][1], obj["bbox"][0])
+    for old, new in zip(sorted(previous, key=key), sorted(current, key=key)):
+        if old["class"] != new["class"]:
+            return True
+        if max(abs(a - b) for a, b in zip(old["bbox"], new["bbox"])) > tolerance:
+            return True
+    return False
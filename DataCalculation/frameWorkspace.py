@@ -0,0 +1,76 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+import numpy as np
+
+# ===============================================
+# Wiederverwendbare Puffer pro Auflösung
+# ===============================================
+#
+# detect_Buildings und calculate_2D_Volume brauchen pro Frame viele
+# Zwischenbilder gleicher Größe. Statt sie jedes Mal neu anzulegen, holt
+# sich jeder Aufruf mit acquire_workspace() einen Arbeitsbereich für seine
+# Auflösung und schreibt über dst=/out= in dessen Puffer. Ein Arbeitsbereich
+# gehört immer nur einem Aufruf; laufen mehrere Aufrufe gleichzeitig (z.B.
+# zwei Themen-Threads), bekommt jeder seinen eigenen. Nach dem ersten Frame
+# entstehen so nur noch die Ergebnis-Masken neu.
+
+
+class FrameWorkspace:
+    """Benannte, vorab angelegte Puffer für eine Auflösung"""
+
+    def __init__(self, shape):
+        self.shape = tuple(shape)
+        self._buffers = {}
+
+    def get(self, name, dtype=np.uint8, shape=None):
+        """
+        Puffer `name` (Inhalt undefiniert). Ohne shape in der Auflösung des
+        Arbeitsbereichs; Größe oder Typ ändern sich nur beim ersten Aufruf.
+        """
+        shape = self.shape if shape is None else tuple(shape)
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = self._buffers[name] = np.empty(shape, dtype=dtype)
+        return buffer
+
+    def zeros(self, name, dtype=np.uint8, shape=None):
+        buffer = self.get(name, dtype, shape)
+        buffer.fill(0)
+        return buffer
+
+    @property
+    def nbytes(self):
+        return sum(buffer.nbytes for buffer in self._buffers.values())
+
+
+def buffer(workspace, name, shape, dtype=np.uint8):
+    """Puffer aus dem Arbeitsbereich oder (ohne Arbeitsbereich) ein neues Array"""
+    if workspace is None:
+        return np.empty(shape, dtype=dtype)
+    return workspace.get(name, dtype, shape)
+
+
+_idle = defaultdict(list)
+_lock = threading.Lock()
+
+
+@contextmanager
+def acquire_workspace(shape):
+    """Leiht einen freien Arbeitsbereich für `shape` (Höhe, Breite) aus"""
+    key = tuple(shape[:2])
+    with _lock:
+        idle = _idle[key]
+        workspace = idle.pop() if idle else FrameWorkspace(key)
+    try:
+        yield workspace
+    finally:
+        with _lock:
+            _idle[key].append(workspace)
+
+
+def clear_workspaces():
+    """Gibt alle ungenutzten Arbeitsbereiche frei (z.B. nach Auflösungswechsel)"""
+    with _lock:
+        _idle.clear()
@@ -0,0 +1,258 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# ===============================================
+# Wassersimulation (Virtual-Pipe-Modell) auf dem Sand-Höhenfeld
+# ===============================================
+#
+# Zwischen benachbarten Zellen liegen "virtuelle Rohre". Der Fluss durch ein
+# Rohr wird vom Unterschied der Wasserspiegel (Gelände + Wasser) beschleunigt
+# und so begrenzt, dass keine Zelle mehr Wasser abgibt, als sie hat. Alles
+# ist vektorisiert und läuft auf einem verkleinerten Raster (z.B. 160x120),
+# mit festem Zeitschritt in einem eigenen Thread - unabhängig von der
+# Bildrate der Kamera.
+
+GRAVITY = 9.81
+
+
+def _pipe_slices(flux):
+    """
+    (Fluss, Zielbereich, Nachbarbereich) je Richtung: der Fluss aus einer
+    Zelle wächst mit ihrem Wasserspiegel minus dem des Nachbarn
+    """
+    left, right, up, down = flux
+    return (
+        (left, np.s_[:, 1:], np.s_[:, :-1]),
+        (right, np.s_[:, :-1], np.s_[:, 1:]),
+        (up, np.s_[1:, :], np.s_[:-1, :]),
+        (down, np.s_[:-1, :], np.s_[1:, :]),
+    )
+
+
+class WaterSimulation:
+    """
+    Flachwasser-Simulation mit festem Zeitschritt.
+
+    Parameter:
+    - grid_shape: Rastergröße (Höhe, Breite) der Simulation
+    - cell_size: Kantenlänge einer Zelle in Metern
+    - dt: Zeitschritt in Sekunden (fest, unabhängig von der Kamera)
+    - evaporation: Verdunstung in m/s (lässt Pfützen langsam verschwinden)
+    """
+
+    def __init__(self, grid_shape=(120, 160), cell_size=0.008, dt=1.0 / 120,
+                 evaporation=0.0002, damping=0.995):
+        self.grid_shape = tuple(grid_shape)
+        self.cell_size = cell_size
+        self.dt = dt
+        self.evaporation = evaporation
+        self.damping = damping
+
+        self.terrain = np.zeros(self.grid_shape, dtype=np.float32)
+        self.water = np.zeros(self.grid_shape, dtype=np.float32)
+        # Ausfluss nach links, rechts, oben, unten
+        self.flux = np.zeros((4,) + self.grid_shape, dtype=np.float32)
+        # Zwischenfelder von step(), einmal angelegt (step läuft 120x pro
+        # Sekunde und hält dabei den Lock)
+        self._surface = np.zeros(self.grid_shape, dtype=np.float32)
+        self._outflow = np.zeros(self.grid_shape, dtype=np.float32)
+        self._limit = np.zeros(self.grid_shape, dtype=np.float32)
+        self._inflow = np.zeros(self.grid_shape, dtype=np.float32)
+        self._scratch = np.zeros(self.grid_shape, dtype=np.float32)
+        self._positive = np.zeros(self.grid_shape, dtype=np.bool_)
+
+        self.rain_rate = 0.0       # m/s auf allen Zellen
+        self.rain_until = 0.0      # time.monotonic(), bis wann es regnet
+        self.sources = []          # (row, col, radius, rate in m/s)
+        self._source_field = np.zeros(self.grid_shape, dtype=np.float32)
+
+        self.steps = 0
+        self._lock = threading.Lock()
+        self._running = False
+        self._thread = None
+
+    # -------------------------------------------
+    # Steuerung
+    # -------------------------------------------
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def advance(self, seconds):
+        """
+        Rechnet die Zeitschritte für `seconds` Sekunden sofort (ohne Thread),
+        z.B. im Stapelbetrieb mit dem Abstand der Aufnahmezeiten zweier Frames
+        """
+        for _ in range(max(0, int(round(seconds / self.dt)))):
+            self.step()
+
+    def _run(self):
+        next_step = time.monotonic()
+        while self._running:
+            self.step()
+            next_step += self.dt
+            delay = next_step - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -0.25:
+                # Zu weit hinterher (z.B. CPU belegt): nicht aufholen, sondern weiter
+                next_step = time.monotonic()
+
+    # -------------------------------------------
+    # Eingaben
+    # -------------------------------------------
+
+    def update_terrain(self, depth_image, depth_scale):
+        """
+        Übernimmt das Gelände aus einem Tiefenbild. Größere Tiefe = tiefer
+        gelegen. Löcher (0) werden mit der höchsten Geländehöhe gefüllt,
+        damit dort kein Wasser hineinläuft.
+        """
+        height, width = self.grid_shape
+        depth = depth_image.astype(np.float32) * depth_scale
+        valid = (depth > 0).astype(np.float32)
+        depth_small = cv2.resize(depth, (width, height), interpolation=cv2.INTER_AREA)
+        valid_small = cv2.resize(valid, (width, height), interpolation=cv2.INTER_AREA)
+
+        terrain = np.zeros(self.grid_shape, dtype=np.float32)
+        covered = valid_small > 0.5
+        if np.any(covered):
+            # Mittelwert nur über gültige Pixel, Gelände = -Tiefe
+            depth_small[covered] /= valid_small[covered]
+            terrain[covered] = -depth_small[covered]
+            terrain[~covered] = terrain[covered].max()
+            terrain -= terrain[covered].min()
+        with self._lock:
+            self.terrain = terrain
+
+    def set_rain(self, rate_mm_per_s, duration=10.0):
+        """Regen auf den ganzen Tisch (mm Wasser pro Sekunde)"""
+        with self._lock:
+            self.rain_rate = rate_mm_per_s / 1000.0
+            self.rain_until = time.monotonic() + duration
+
+    def add_source(self, x, y, rate_mm_per_s=20.0, radius=0.03):
+        """
+        Quelle an Position (x, y) in normierten Koordinaten 0..1.
+        radius ist ebenfalls relativ zur Tischbreite.
+        """
+        height, width = self.grid_shape
+        row = int(np.clip(y, 0, 1) * (height - 1))
+        col = int(np.clip(x, 0, 1) * (width - 1))
+        radius_cells = max(1, int(radius * width))
+        with self._lock:
+            self.sources.append((row, col, radius_cells, rate_mm_per_s / 1000.0))
+            self._rebuild_source_field()
+
+    def clear(self):
+        """Entfernt Wasser, Regen und Quellen"""
+        with self._lock:
+            self.water.fill(0)
+            self.flux.fill(0)
+            self.rain_rate = 0.0
+            self.sources = []
+            self._rebuild_source_field()
+
+    def _rebuild_source_field(self):
+        self._source_field.fill(0)
+        for row, col, radius, rate in self.sources:
+            cv2.circle(self._source_field, (col, row), radius, float(rate), thickness=-1)
+
+    # -------------------------------------------
+    # Simulation
+    # -------------------------------------------
+
+    def step(self):
+        """Ein fester Zeitschritt des Virtual-Pipe-Modells"""
+        dt = self.dt
+        with self._lock:
+            terrain = self.terrain
+            water = self.water
+            flux = self.flux
+
+            # 1. Wasserzufuhr: Quellen und Regen
+            water += np.multiply(self._source_field, dt, out=self._scratch)
+            if self.rain_rate > 0:
+                if time.monotonic() < self.rain_until:
+                    water += self.rain_rate * dt
+                else:
+                    self.rain_rate = 0.0
+
+            # 2. Flüsse aus dem Unterschied der Wasserspiegel
+            surface = np.add(terrain, water, out=self._surface)
+            pipe = dt * GRAVITY * self.cell_size
+            scratch = self._scratch
+            # Rechnungen auf verschobenen Ausschnitten mit OpenCV: NumPy legt
+            # für nicht zusammenhängende Views Zwischenpuffer an. Der Rand
+            # ohne Nachbarn bekommt Differenz 0, dort bleibt der Fluss 0.
+            for pipe_flux, target, source in _pipe_slices(flux):
+                scratch.fill(0)
+                cv2.subtract(surface[target], surface[source], dst=scratch[target])
+                scratch *= pipe
+                pipe_flux *= self.damping
+                pipe_flux += scratch
+                np.maximum(pipe_flux, 0, out=pipe_flux)
+            left, right, up, down = flux
+
+            # 3. Keine Zelle gibt mehr ab, als sie enthält. Sehr kleiner
+            # Ausfluss kann mal dt zu 0 werden: dort nicht teilen (sonst 0/0 = NaN)
+            outflow = self._outflow
+            np.add(left, right, out=outflow)
+            outflow += up
+            outflow += down
+            outflow *= dt
+            cell_volume = np.multiply(water, self.cell_size * self.cell_size, out=scratch)
+            limit = self._limit
+            limit.fill(1.0)
+            np.divide(cell_volume, outflow, out=limit, where=np.greater(outflow, 0, out=self._positive))
+            np.minimum(limit, 1.0, out=limit)
+            flux *= limit
+
+            # 4. Wasserhöhe aus Zu- und Abfluss
+            inflow = self._inflow
+            inflow.fill(0)
+            for pipe_flux, target, source in _pipe_slices(flux):
+                # Was aus einer Zelle Richtung Nachbar fließt, kommt dort an
+                cv2.add(inflow[source], pipe_flux[target], dst=inflow[source])
+            np.add(left, right, out=outflow)
+            outflow += up
+            outflow += down
+            inflow -= outflow
+            inflow *= dt / (self.cell_size * self.cell_size)
+            water += inflow
+
+            # 5. Verdunstung, Abfluss über den Tischrand
+            water -= self.evaporation * dt
+            np.maximum(water, 0, out=water)
+            water[0, :] = water[-1, :] = 0
+            water[:, 0] = water[:, -1] = 0
+            self.steps += 1
+
+    def water_depth(self):
+        """Kopie der aktuellen Wasserhöhe (Meter) auf dem Simulationsraster"""
+        with self._lock:
+            return self.water.copy()
+
+    def status(self):
+        with self._lock:
+            return {
+                "steps": self.steps,
+                "grid": list(self.grid_shape),
+                "water_volume_ml": float(self.water.sum() * self.cell_size ** 2 * 1e6),
+                "raining": self.rain_rate > 0,
+                "sources": [{"row": r, "col": c, "radius": rad, "rate_mm_per_s": rate * 1000}
+                            for r, c, rad, rate in self.sources],
+            }
@@ -0,0 +1,159 @@
+import threading
+import time
+from collections import OrderedDict
+
+# ===============================================
+# Deklarativer Stufen-Graph mit Memoisierung pro Frame
+# ===============================================
+#
+# Eine Stufe hat einen Namen, eine Funktion und die Namen ihrer Eingänge.
+# Die Funktion wird als func(camera, frame_data, *eingangswerte) aufgerufen.
+# Liefert ein Eingang None (z.B. keine Tiefe bei der Laptop-Kamera), ist
+# auch das Ergebnis der Stufe None, ohne dass die Funktion läuft.
+#
+# Ergebnisse werden pro Frame zwischengespeichert: laufen mehrere Themen
+# oder Clients gleichzeitig, rechnet jede Stufe höchstens einmal pro Frame.
+# Ein Frame ist (Kamera-Manager, device_id, seq) - seq zählt im Frame-Pool
+# jedes Kamera-Managers und beginnt bei einem neuen Manager (z.B. nach
+# einem Neustart im CameraHub) wieder bei 0. Nebenbei misst der Graph die
+# Laufzeit jeder Stufe.
+
+
+class Stage:
+    """Eine benannte Verarbeitungsstufe"""
+
+    def __init__(self, name, func, inputs=()):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+
+
+class _PendingResult:
+    """Ergebnis einer Stufe, auf das andere Threads warten können"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class StageTiming:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.last = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "last_ms": round(self.last * 1000, 2),
+            "mean_ms": round(self.total / self.count * 1000, 2) if self.count else 0.0,
+        }
+
+
+class StageGraph:
+    """
+    Führt Stufen mit ihren Abhängigkeiten aus.
+    cache_frames: für wie viele Frames Ergebnisse gehalten werden.
+    """
+
+    def __init__(self, stages=(), cache_frames=4):
+        self.stages = {}
+        self.cache_frames = cache_frames
+        # (camera, device_id, seq) -> {stage_name: _PendingResult}. Der Schlüssel
+        # hält den Kamera-Manager selbst (nicht id()), damit ein neuer Manager
+        # an derselben Speicheradresse nicht die Ergebnisse des alten bekommt
+        self._cache = OrderedDict()
+        self._timings = {}
+        self._lock = threading.Lock()
+        for stage in stages:
+            self.add(stage)
+
+    def add(self, stage):
+        for name in stage.inputs:
+            if name not in self.stages:
+                raise ValueError(f"Stufe '{stage.name}': unbekannter Eingang '{name}'")
+        self.stages[stage.name] = stage
+        self._timings[stage.name] = StageTiming()
+        return stage
+
+    def dependencies(self, name):
+        """Alle Stufen, die für `name` laufen müssen (in Ausführungsreihenfolge)"""
+        order = []
+        def visit(stage_name):
+            if stage_name in order:
+                return
+            for input_name in self.stages[stage_name].inputs:
+                visit(input_name)
+            order.append(stage_name)
+        visit(name)
+        return order
+
+    def run(self, name, camera, frame_data):
+        """Berechnet Stufe `name` für ein Frame (mit Zwischenspeicher)"""
+        seq = frame_data.get("seq")
+        if seq is None:
+            # Ohne Sequenznummer nur innerhalb dieses Aufrufs zwischenspeichern
+            results = {}
+        else:
+            key = (camera, frame_data.get("device_id"), seq)
+            with self._lock:
+                results = self._cache.get(key)
+                if results is None:
+                    results = {}
+                    self._cache[key] = results
+                    while len(self._cache) > self.cache_frames:
+                        self._cache.popitem(last=False)
+        return self._evaluate(name, camera, frame_data, results)
+
+    def _evaluate(self, name, camera, frame_data, results):
+        with self._lock:
+            pending = results.get(name)
+            owner = pending is None
+            if owner:
+                pending = _PendingResult()
+                results[name] = pending
+
+        if not owner:
+            # Ein anderer Thread rechnet diese Stufe gerade für dasselbe Frame
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.value
+
+        try:
+            stage = self.stages[name]
+            input_values = [self._evaluate(input_name, camera, frame_data, results)
+                            for input_name in stage.inputs]
+            if any(value is None for value in input_values):
+                pending.value = None
+            else:
+                start = time.perf_counter()
+                pending.value = stage.func(camera, frame_data, *input_values)
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self._timings[name].add(elapsed)
+        except Exception as e:
+            pending.error = e
+            raise
+        finally:
+            pending.done.set()
+        return pending.value
+
+    def runner(self, name):
+        """Funktion (camera, frame_data) -> Ergebnis von `name`, z.B. als process_func"""
+        if name not in self.stages:
+            raise ValueError(f"Unbekannte Stufe: {name}")
+        def run_stage(camera, frame_data):
+            return self.run(name, camera, frame_data)
+        run_stage.__name__ = f"run_{name}"
+        return run_stage
+
+    def timings(self):
+        with self._lock:
+            return {name: timing.to_dict() for name, timing in self._timings.items()}
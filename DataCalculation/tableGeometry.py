@@ -0,0 +1,210 @@
+import threading
+
+import cv2
+import numpy as np
+
+# ===============================================
+# Geometrisches Höhenmodell: Höhe über der Tischebene
+# ===============================================
+#
+# depth * depth_scale ist der Abstand entlang der optischen Achse, nicht die
+# Höhe. Schaut die Kamera schräg oder nicht mittig auf den Tisch, erscheint
+# ein ebener Tisch als Rampe. Mit den Intrinsics der Tiefenkamera liegt ein
+# Pixel (u, v) mit Tiefe z im Raum bei
+#     P = z * r(u, v),   r = (x_n, y_n, 1)
+# (x_n, y_n: entzerrte, normierte Bildkoordinaten). Die eingemessene
+# Tischebene n·P + d = 0 (n Einheitsnormale zur Kamera hin, d > 0 = Abstand
+# der Kamera zur Ebene) liefert die Höhe über dem Tisch:
+#     h = n·P + d = z * (n·r(u, v)) + d = depth * gain(u, v) + d
+# gain = depth_scale * n·r hängt nur von Intrinsics und Ebene ab und wird
+# einmal pro Auflösung als Tabelle angelegt. Pro Frame bleibt eine
+# Multiplikation mit der Tabelle und eine Addition (nur gültige Pixel).
+
+DEFAULT_FOV_DEG = 58.0
+
+
+class DepthIntrinsics:
+    """
+    Lochkamera des Tiefenbilds in Pixeln (bei width x height). distortion
+    wie bei OpenCV (k1, k2, p1, p2, k3) oder None. Für andere Auflösungen
+    (z.B. verkleinerte Erkennung) wird skaliert.
+    """
+
+    def __init__(self, width, height, fx, fy, cx, cy, distortion=None):
+        self.width = int(width)
+        self.height = int(height)
+        self.fx = float(fx)
+        self.fy = float(fy)
+        self.cx = float(cx)
+        self.cy = float(cy)
+        self.distortion = None if distortion is None else tuple(float(k) for k in distortion)
+
+    @classmethod
+    def from_fov(cls, width, height, horizontal_fov_deg=DEFAULT_FOV_DEG):
+        """Ersatz ohne Kalibrierung: quadratische Pixel, Bildmitte als Hauptpunkt"""
+        f = (width / 2.0) / np.tan(np.deg2rad(horizontal_fov_deg) / 2.0)
+        return cls(width, height, f, f, (width - 1) / 2.0, (height - 1) / 2.0)
+
+    @classmethod
+    def from_dict(cls, values):
+        return cls(**values)
+
+    def to_dict(self):
+        return {"width": self.width, "height": self.height, "fx": self.fx, "fy": self.fy,
+                "cx": self.cx, "cy": self.cy,
+                "distortion": list(self.distortion) if self.distortion is not None else None}
+
+    def rays(self, shape):
+        """Normierte Koordinaten (x_n, y_n) aller Pixel eines Bilds der Größe shape, float32"""
+        height, width = shape
+        sx, sy = width / self.width, height / self.height
+        # Pixelmitten skalieren: (c + 0.5) * s - 0.5
+        fx, fy = self.fx * sx, self.fy * sy
+        cx, cy = (self.cx + 0.5) * sx - 0.5, (self.cy + 0.5) * sy - 0.5
+        u, v = np.meshgrid(np.arange(width, dtype=np.float32), np.arange(height, dtype=np.float32))
+        if self.distortion is None:
+            return (u - cx) / fx, (v - cy) / fy
+        camera_matrix = np.array([[fx, 0, cx], [0, fy, cy], [0, 0, 1]], dtype=np.float64)
+        pixels = np.stack([u.ravel(), v.ravel()], axis=-1).reshape(-1, 1, 2)
+        normalized = cv2.undistortPoints(pixels, camera_matrix, np.array(self.distortion))
+        normalized = normalized.reshape(height, width, 2)
+        return normalized[..., 0].copy(), normalized[..., 1].copy()
+
+
+def back_project(depth_image, depth_scale, intrinsics, step=1):
+    """3D-Punkte (Meter, Kamerakoordinaten) jedes step-ten Pixels: (x, y, z)-Bilder"""
+    ray_x, ray_y = intrinsics.rays(depth_image.shape[:2])
+    z = depth_image[::step, ::step].astype(np.float32) * np.float32(depth_scale)
+    return ray_x[::step, ::step] * z, ray_y[::step, ::step] * z, z
+
+
+def fit_table_plane(depth_image, depth_scale, intrinsics, region=None, step=4, tolerance=0.005,
+                    iterations=300, seed=0):
+    """
+    Misst die Tischebene in einem Tiefenbild ein (Sand glattgestrichen oder
+    freie Tischfläche): RANSAC über jeden step-ten Pixel, danach kleinste
+    Quadrate über alle Punkte näher als tolerance (Meter) an der Ebene.
+    Bauklötze und Hügel fallen so als Ausreißer heraus.
+    region: optionales Rechteck (x0, y0, x1, y1) normiert 0..1
+    Rückgabe: (normal, offset, info) mit n·P + offset = 0, n zur Kamera hin.
+    """
+    x, y, z = back_project(depth_image, depth_scale, intrinsics, step)
+    valid = z > 0
+    if region is not None:
+        rows, cols = z.shape
+        x0, y0, x1, y1 = region
+        inside = np.zeros_like(valid)
+        inside[int(y0 * rows):int(np.ceil(y1 * rows)), int(x0 * cols):int(np.ceil(x1 * cols))] = True
+        valid &= inside
+    points = np.stack([x[valid], y[valid], z[valid]], axis=1)
+    if len(points) < 3:
+        raise ValueError("Zu wenige gültige Tiefenpixel für die Tischebene")
+
+    # RANSAC: Kandidaten-Ebenen aus zufälligen Punkt-Tripeln, blockweise als Matrixprodukt
+    rng = np.random.default_rng(seed)
+    best_count, best_plane = -1, None
+    for start in range(0, iterations, 50):
+        triples = points[rng.integers(0, len(points), size=(min(50, iterations - start), 3))]
+        normals = np.cross(triples[:, 1] - triples[:, 0], triples[:, 2] - triples[:, 0])
+        lengths = np.linalg.norm(normals, axis=1)
+        usable = lengths > 1e-12
+        normals = normals[usable] / lengths[usable, None]
+        offsets = -np.einsum("ij,ij->i", normals, triples[usable, 0])
+        counts = np.count_nonzero(np.abs(points @ normals.T + offsets) < tolerance, axis=0)
+        if len(counts) and counts.max() > best_count:
+            best = int(np.argmax(counts))
+            best_count, best_plane = int(counts[best]), (normals[best], offsets[best])
+    if best_plane is None:
+        raise ValueError("Keine Ebene gefunden (Punkte liegen auf einer Linie)")
+
+    inliers = points[np.abs(points @ best_plane[0] + best_plane[1]) < tolerance]
+    center = inliers.mean(axis=0)
+    _, _, vt = np.linalg.svd(inliers - center, full_matrices=False)
+    normal = vt[2]
+    offset = -float(normal @ center)
+    if offset < 0:
+        # Normale zur Kamera (Ursprung) hin: Punkte über dem Tisch haben h > 0
+        normal, offset = -normal, -offset
+    residual = inliers @ normal + offset
+    info = {
+        "points": len(points),
+        "inliers": len(inliers),
+        "inlier_ratio": round(len(inliers) / len(points), 3),
+        "rms_mm": round(float(np.sqrt(np.mean(residual ** 2))) * 1000, 2),
+    }
+    return normal.astype(np.float64), offset, info
+
+
+class HeightModel:
+    """
+    Höhe über der Tischebene aus einem Tiefenbild (siehe oben).
+    height_range: Höhe (Meter), die als relative Höhe 1.0 gilt; ersetzt die
+    Min/Max-Normierung pro Frame in detectBuildings.estimate_relative_height.
+    """
+
+    def __init__(self, intrinsics, normal, offset, height_range=0.20, fit_info=None):
+        self.intrinsics = intrinsics
+        self.normal = np.asarray(normal, dtype=np.float64) / np.linalg.norm(normal)
+        self.offset = float(offset)
+        self.height_range = height_range
+        self.fit_info = fit_info
+        self._gains = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def fit(cls, depth_image, depth_scale, intrinsics, region=None, height_range=0.20, **kwargs):
+        normal, offset, info = fit_table_plane(depth_image, depth_scale, intrinsics, region, **kwargs)
+        return cls(intrinsics, normal, offset, height_range, info)
+
+    # Prozess-Worker bekommen nur Intrinsics und Ebene, die Tabellen bauen sie selbst
+    def __getstate__(self):
+        return {"intrinsics": self.intrinsics, "normal": self.normal, "offset": self.offset,
+                "height_range": self.height_range, "fit_info": self.fit_info}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def gain(self, shape, depth_scale):
+        """Tabelle depth_scale * n·r(u, v) für diese Auflösung (einmal berechnet)"""
+        key = (tuple(shape), float(depth_scale))
+        table = self._gains.get(key)
+        if table is None:
+            ray_x, ray_y = self.intrinsics.rays(shape)
+            nx, ny, nz = self.normal * depth_scale
+            table = (ray_x * np.float32(nx) + ray_y * np.float32(ny) + np.float32(nz)).astype(np.float32)
+            with self._lock:
+                self._gains[key] = table
+        return table
+
+    def height(self, depth_image, depth_scale, valid=None, out=None):
+        """
+        Höhe über dem Tisch in Metern (float32), Pixel ohne Tiefe = 0.
+        valid: optionale Maske (uint8, ungleich 0 = gültig), sonst depth > 0
+        """
+        if valid is None:
+            valid = cv2.compare(depth_image, 0, cv2.CMP_GT)
+        gain = self.gain(depth_image.shape[:2], depth_scale)
+        # depth * gain ist bei depth = 0 schon 0, die Ebene nur auf gültige Pixel
+        height = cv2.multiply(depth_image, gain, dst=out, dtype=cv2.CV_32F)
+        return cv2.add(height, self.offset, dst=height, mask=valid)
+
+    def relative(self, height, valid, out=None):
+        """Relative Höhe: Höhe / height_range, ungültige Pixel 0"""
+        relative = np.multiply(height, np.float32(1.0 / self.height_range), out=out)
+        return np.multiply(relative, valid, out=relative)
+
+    @property
+    def tilt_deg(self):
+        """Winkel zwischen optischer Achse und Tischnormale"""
+        return float(np.degrees(np.arccos(np.clip(-self.normal[2], -1.0, 1.0))))
+
+    def status(self):
+        return {
+            "intrinsics": self.intrinsics.to_dict(),
+            "normal": [round(float(v), 6) for v in self.normal],
+            "offset_m": round(self.offset, 5),
+            "tilt_deg": round(self.tilt_deg, 2),
+            "height_range_m": self.height_range,
+            "fit": self.fit_info,
+            "tables": [list(shape) for shape, _ in list(self._gains)],
+        }
@@ -0,0 +1,392 @@
+import heapq
+import struct
+import threading
+
+import cv2
+import numpy as np
+
+# ===============================================
+# Vereinfachtes Geländenetz (Quadtree) für 3D-Viewer
+# ===============================================
+#
+# Das Höhenfeld wird auf ein Gitter aus Wurzelknoten (root_size Pixel,
+# Zweierpotenz) umgerechnet. Jeder Knoten kennt seinen Fehler: die größte
+# Abweichung der Höhen in seinem Block von der bilinearen Fläche durch
+# seine vier Ecken. Geteilt wird immer der Knoten mit dem größten Fehler,
+# bis alle unter tolerance liegen oder das Eckpunkt-Budget erreicht ist.
+# Knoten, die im letzten Netz geteilt waren, zählen mit split_bonus
+# mehr, damit Sensorrauschen die Struktur nicht flackern lässt.
+#
+# Jedes Blatt wird für sich trianguliert. Liegen auf seinen Kanten Eckpunkte
+# feinerer Nachbarn, wird ein Fächer um die Blattmitte gebaut, sonst reichen
+# zwei Dreiecke; so entstehen keine Risse zwischen unterschiedlich feinen
+# Blättern.
+#
+# Koordinaten in Metern, y nach oben: x = Spalte, z = Zeile, y = Höhe.
+# Dreiecke gegen den Uhrzeigersinn von oben gesehen (Normale nach oben,
+# rechtshändig wie three.js; Unity muss z spiegeln).
+#
+# Binärformat einer Nachricht (little endian, alle Felder 4-Byte-ausgerichtet
+# bis auf die Indizes am Ende):
+#   Kopf: magic "SMSH", version u16, flags u16 (1 = volles Netz),
+#         seq u32, Anzahl Knoten K u32, Anzahl entfernte Knoten R u32,
+#         Breite m f32, Tiefe m f32
+#   entfernte Knoten-Ids   u32 * R
+#   Knoten-Ids             u32 * K
+#   Eckpunkte pro Knoten   u32 * K
+#   Indizes pro Knoten     u32 * K
+#   Eckpunkte (x, y, z)    f32 * 3 * Summe Eckpunkte
+#   Indizes                u16 * Summe Indizes (innerhalb des Knotens)
+# Knoten-Id: Ebene << 28 | Zeile << 14 | Spalte (Zeile/Spalte auf der Ebene).
+# Ein Delta enthält nur neue oder veränderte Blätter; entfernte Ids (z.B.
+# nach einer Teilung) löscht der Client.
+
+MAGIC = b"SMSH"
+VERSION = 1
+FLAG_FULL = 1
+_HEADER = struct.Struct("<4sHHIIIff")
+
+# Stellschrauben (werden von app.py gesetzt)
+vertex_budget = 20000
+tolerance = 0.003          # Meter
+root_size = 64             # Pixel, Zweierpotenz
+min_size = 2               # kleinste Blattgröße in Pixeln
+split_bonus = 1.5          # Fehler-Faktor für Knoten, die zuletzt geteilt waren
+change_tolerance = 0.002   # Meter, kleinere Höhenänderungen lösen kein Delta aus
+
+
+def node_id(level, row, col):
+    return (level << 28) | (row << 14) | col
+
+
+def _ranges(starts, lengths):
+    """Indizes aller Bereiche [start, start + length) hintereinander"""
+    total = int(lengths.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    ends = np.cumsum(lengths)
+    offsets = np.repeat(starts - (ends - lengths), lengths)
+    return np.arange(total, dtype=np.int64) + offsets
+
+
+def _resample(height_field, root):
+    """Höhenfeld auf (ny * root + 1, nx * root + 1) Gitterpunkte"""
+    height, width = height_field.shape
+    ny = max(1, int(np.ceil((height - 1) / root)))
+    nx = max(1, int(np.ceil((width - 1) / root)))
+    grid = cv2.resize(np.ascontiguousarray(height_field, dtype=np.float32),
+                      (nx * root + 1, ny * root + 1), interpolation=cv2.INTER_LINEAR)
+    return grid, ny, nx
+
+
+def _level_errors(grid, root, smallest):
+    """Fehler pro Knoten für alle teilbaren Größen: {Größe: (Zeilen, Spalten)}"""
+    errors = {}
+    size = root
+    while size >= 2 * smallest:
+        rows, cols = (grid.shape[0] - 1) // size, (grid.shape[1] - 1) // size
+        c00 = grid[0:-1:size, 0:-1:size][:, None, :, None]
+        c01 = grid[0:-1:size, size::size][:, None, :, None]
+        c10 = grid[size::size, 0:-1:size][:, None, :, None]
+        c11 = grid[size::size, size::size][:, None, :, None]
+        t = np.arange(size, dtype=np.float32) / size
+        top = c00 + (c01 - c00) * t
+        bottom = c10 + (c11 - c10) * t
+        block = grid[:-1, :-1].reshape(rows, size, cols, size)
+        errors[size] = np.abs(block - (top + (bottom - top) * t[:, None, None])).max(axis=(1, 3))
+        size //= 2
+    return errors
+
+
+class TerrainMesh:
+    """
+    Ergebnis von build_terrain_mesh, alle Blätter nach Id sortiert in
+    flachen Arrays:
+    - ids, keys (Lage der Randpunkte, gleich = gleiche Eckpunkt-Anordnung)
+    - vertex_offsets / vertices (N, 3) float32
+    - index_offsets / indices uint16 (pro Knoten ab 0)
+    - split: {Größe: bool-Array} geteilte Knoten, für das nächste Netz
+    """
+
+    def __init__(self, width_m, depth_m, ids, keys, vertex_offsets, vertices,
+                 index_offsets, indices, split, vertex_count, max_error):
+        self.width_m = width_m
+        self.depth_m = depth_m
+        self.ids = ids
+        self.keys = keys
+        self.vertex_offsets = vertex_offsets
+        self.vertices = vertices
+        self.index_offsets = index_offsets
+        self.indices = indices
+        self.split = split
+        self.vertex_count = vertex_count
+        self.max_error = max_error
+
+    @property
+    def node_count(self):
+        return len(self.ids)
+
+    @property
+    def triangle_count(self):
+        return len(self.indices) // 3
+
+    def node(self, nid):
+        """(vertices, indices) eines Blatts"""
+        i = int(np.searchsorted(self.ids, nid))
+        if i >= len(self.ids) or self.ids[i] != nid:
+            raise KeyError(nid)
+        return (self.vertices[self.vertex_offsets[i]:self.vertex_offsets[i + 1]],
+                self.indices[self.index_offsets[i]:self.index_offsets[i + 1]])
+
+    def status(self):
+        return {
+            "nodes": self.node_count,
+            "vertices": self.vertex_count,
+            "triangles": self.triangle_count,
+            "max_error_mm": round(self.max_error * 1000, 2),
+            "width_m": self.width_m,
+            "depth_m": round(self.depth_m, 4),
+        }
+
+
+def build_terrain_mesh(height_field, width_m, budget=None, error_tolerance=None,
+                       root=None, smallest=None, previous=None):
+    """
+    Vereinfachtes Netz aus einem Höhenfeld in Metern (oben = größer).
+
+    Parameter (ohne Angabe die Werte des Moduls):
+    - width_m: Breite der Fläche in Metern (Tiefe folgt aus dem Seitenverhältnis)
+    - budget: höchstens so viele Gitter-Eckpunkte (Fächermitten kommen dazu)
+    - error_tolerance: Knoten mit kleinerem Fehler werden nicht geteilt
+    - previous: letztes TerrainMesh, dessen Teilungen bevorzugt werden
+    """
+    budget = vertex_budget if budget is None else budget
+    error_tolerance = tolerance if error_tolerance is None else error_tolerance
+    root = root_size if root is None else root
+    smallest = min_size if smallest is None else smallest
+
+    depth_m = width_m * (height_field.shape[0] - 1) / max(1, height_field.shape[1] - 1)
+    grid, ny, nx = _resample(height_field, root)
+    errors = _level_errors(grid, root, smallest)
+    if previous is not None:
+        for size, error in errors.items():
+            was_split = previous.split.get(size)
+            if was_split is not None and was_split.shape == error.shape:
+                error[was_split] *= split_bonus
+
+    # Greedy-Teilung: immer der Knoten mit dem größten Fehler zuerst
+    used = np.zeros(grid.shape, dtype=bool)
+    used[::root, ::root] = True
+    count = int(used.sum())
+    split = {size: np.zeros(error.shape, dtype=bool) for size, error in errors.items()}
+    leaves = []   # (Ebene, y0, x0, Größe)
+    heap = []
+
+    def push(level, y0, x0, size):
+        if size in errors:
+            heapq.heappush(heap, (-float(errors[size][y0 // size, x0 // size]), level, y0, x0, size))
+        else:
+            leaves.append((level, y0, x0, size))
+
+    for row in range(ny):
+        for col in range(nx):
+            push(0, row * root, col * root, root)
+
+    while heap:
+        error, level, y0, x0, size = heap[0]
+        if -error <= error_tolerance:
+            break
+        half = size // 2
+        new_points = ((y0 + half, x0), (y0, x0 + half), (y0 + half, x0 + half),
+                      (y0 + size, x0 + half), (y0 + half, x0 + size))
+        new = sum(1 for point in new_points if not used[point])
+        if count + new > budget:
+            break
+        heapq.heappop(heap)
+        for point in new_points:
+            used[point] = True
+        count += new
+        split[size][y0 // size, x0 // size] = True
+        for dy in (0, half):
+            for dx in (0, half):
+                push(level + 1, y0 + dy, x0 + dx, half)
+    max_error = -heap[0][0] if heap else 0.0
+    leaves.extend((level, y0, x0, size) for _, level, y0, x0, size in heap)
+
+    leaves = np.array(leaves, dtype=np.int64).reshape(-1, 4)
+    level, y0, x0, size = leaves.T
+    ids = (level << 28) | ((y0 // size) << 14) | (x0 // size)
+    order = np.argsort(ids)
+    mesh = _triangulate(grid, used, ids[order], leaves[order],
+                        width_m / (grid.shape[1] - 1), depth_m / (grid.shape[0] - 1))
+    return TerrainMesh(width_m, depth_m, *mesh, split, count, max_error)
+
+
+def _triangulate(grid, used, ids, leaves, step_x, step_z):
+    """
+    Randpunkte jedes Blatts gegen den Uhrzeigersinn (links runter, unten
+    rechts, rechts hoch, oben links). Nur die vier Ecken: zwei Dreiecke,
+    sonst Fächer um eine zusätzliche Mitte (letzter Eckpunkt des Knotens).
+    """
+    _, y0, x0, size = leaves.T
+    y1, x1 = y0 + size, x0 + size
+    num = len(ids)
+
+    # Alle Randpunkte aller Blätter, davon nur die benutzten Gitterpunkte
+    perimeter = 4 * size
+    leaf = np.repeat(np.arange(num), perimeter)
+    t = np.arange(int(perimeter.sum()), dtype=np.int64) - np.repeat(np.cumsum(perimeter) - perimeter, perimeter)
+    side, offset = t // size[leaf], t % size[leaf]
+    rows = np.select([side == 0, side == 1, side == 2], [y0[leaf] + offset, y1[leaf], y1[leaf] - offset], y0[leaf])
+    cols = np.select([side == 0, side == 1, side == 2], [x0[leaf], x0[leaf] + offset, x1[leaf]], x1[leaf] - offset)
+    keep = used[rows, cols]
+    leaf, rows, cols = leaf[keep], rows[keep], cols[keep]
+    ring = np.bincount(leaf, minlength=num)
+    fan = ring > 4
+
+    # Eckpunkte: Ring, bei Fächern danach die Mitte (Mittelwert des Blocks)
+    vertex_counts = ring + fan
+    vertex_offsets = np.zeros(num + 1, dtype=np.int64)
+    np.cumsum(vertex_counts, out=vertex_offsets[1:])
+    ring_start = np.repeat(vertex_offsets[:-1], ring)
+    ring_position = np.arange(len(leaf)) - np.repeat(np.cumsum(ring) - ring, ring)
+    vertices = np.empty((int(vertex_offsets[-1]), 3), dtype=np.float32)
+    target = ring_start + ring_position
+    vertices[target, 0] = cols * step_x
+    vertices[target, 1] = grid[rows, cols]
+    vertices[target, 2] = rows * step_z
+
+    integral = cv2.integral(grid, sdepth=cv2.CV_64F)
+    f = np.flatnonzero(fan)
+    block_sum = (integral[y1[f] + 1, x1[f] + 1] - integral[y0[f], x1[f] + 1] -
+                 integral[y1[f] + 1, x0[f]] + integral[y0[f], x0[f]])
+    centers = vertex_offsets[f + 1] - 1
+    vertices[centers, 0] = (x0[f] + x1[f]) * 0.5 * step_x
+    vertices[centers, 1] = block_sum / ((size[f] + 1) ** 2)
+    vertices[centers, 2] = (y0[f] + y1[f]) * 0.5 * step_z
+
+    # Indizes: 6 für zwei Dreiecke, 3 pro Randpunkt beim Fächer
+    index_counts = np.where(fan, 3 * ring, 6)
+    index_offsets = np.zeros(num + 1, dtype=np.int64)
+    np.cumsum(index_counts, out=index_offsets[1:])
+    indices = np.empty(int(index_offsets[-1]), dtype=np.uint16)
+    quad = np.flatnonzero(~fan)
+    indices[_ranges(index_offsets[quad], np.full(len(quad), 6))] = np.tile(
+        np.array([0, 1, 2, 0, 2, 3], dtype=np.uint16), len(quad))
+    fan_ring = ring[f]
+    position = np.arange(int(fan_ring.sum())) - np.repeat(np.cumsum(fan_ring) - fan_ring, fan_ring)
+    triangles = np.stack([np.repeat(fan_ring, fan_ring), position,
+                          (position + 1) % np.repeat(fan_ring, fan_ring)], axis=1)
+    indices[_ranges(index_offsets[f], 3 * fan_ring)] = triangles.reshape(-1)
+
+    # Schlüssel der Randpunkt-Anordnung (Positionen im Knoten)
+    keys = np.zeros(num, dtype=np.int64)
+    np.add.at(keys, leaf, (ring_position + 1) * (t[keep] + 1) * 2654435761 % (1 << 40))
+    return ids.astype(np.uint32), keys, vertex_offsets, vertices, index_offsets, indices
+
+
+def encode_mesh_message(mesh, nodes=None, removed_ids=(), seq=0, full=False):
+    """Binärnachricht (siehe oben) mit den Knoten an den Positionen nodes (None = alle)"""
+    nodes = np.arange(mesh.node_count) if nodes is None else np.asarray(nodes, dtype=np.int64)
+    vertex_counts = mesh.vertex_offsets[nodes + 1] - mesh.vertex_offsets[nodes]
+    index_counts = mesh.index_offsets[nodes + 1] - mesh.index_offsets[nodes]
+    return b"".join([
+        _HEADER.pack(MAGIC, VERSION, FLAG_FULL if full else 0, (seq or 0) & 0xFFFFFFFF,
+                     len(nodes), len(removed_ids), mesh.width_m, mesh.depth_m),
+        np.asarray(removed_ids, dtype="<u4").tobytes(),
+        mesh.ids[nodes].astype("<u4").tobytes(),
+        vertex_counts.astype("<u4").tobytes(),
+        index_counts.astype("<u4").tobytes(),
+        mesh.vertices[_ranges(mesh.vertex_offsets[nodes], vertex_counts)].astype("<f4").tobytes(),
+        mesh.indices[_ranges(mesh.index_offsets[nodes], index_counts)].astype("<u2").tobytes(),
+    ])
+
+
+class MeshDeltaEncoder:
+    """
+    Pro Client: die erste Nachricht enthält das volle Netz, danach nur
+    Blätter, die neu sind, eine andere Eckpunkt-Anordnung haben oder
+    deren Höhen sich um mehr als change_tolerance gegenüber dem beim
+    Client liegenden Stand verändert haben, plus die entfernten Ids.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._ids = None       # beim Client: Ids (sortiert), Schlüssel, Offsets, Höhen
+        self._keys = None
+        self._offsets = None
+        self._heights = None
+
+    def encode(self, mesh, seq=0):
+        """Nachricht für dieses Netz, None wenn sich nichts geändert hat"""
+        heights = mesh.vertices[:, 1].copy()
+        if self._ids is None:
+            self._remember(mesh, heights)
+            return encode_mesh_message(mesh, None, (), seq, full=True)
+
+        position = np.minimum(np.searchsorted(self._ids, mesh.ids), len(self._ids) - 1)
+        counts = np.diff(mesh.vertex_offsets)
+        same = ((self._ids[position] == mesh.ids) & (self._keys[position] == mesh.keys) &
+                (np.diff(self._offsets)[position] == counts))
+        changed = ~same
+
+        matched = np.flatnonzero(same)
+        if len(matched):
+            lengths = counts[matched]
+            current = _ranges(mesh.vertex_offsets[matched], lengths)
+            sent = _ranges(self._offsets[position[matched]], lengths)
+            difference = np.abs(heights[current] - self._heights[sent])
+            starts = np.cumsum(lengths) - lengths
+            moved = np.maximum.reduceat(difference, starts) > change_tolerance
+            changed[matched[moved]] = True
+            # Unveränderte Blätter behalten beim Client ihre alten Höhen
+            kept = ~moved
+            heights[current[np.repeat(kept, lengths)]] = self._heights[sent[np.repeat(kept, lengths)]]
+
+        removed = self._ids[~np.isin(self._ids, mesh.ids)]
+        self._remember(mesh, heights)
+        if not changed.any() and not len(removed):
+            return None
+        return encode_mesh_message(mesh, np.flatnonzero(changed), removed, seq)
+
+    def _remember(self, mesh, heights):
+        self._ids = mesh.ids
+        self._keys = mesh.keys
+        self._offsets = mesh.vertex_offsets
+        self._heights = heights
+
+
+class TerrainMesher:
+    """
+    Baut pro Frame das Netz und merkt sich das letzte (für split_bonus
+    und für /mesh ohne laufenden Stream). Die Höhen werden vorher mit
+    smoothing (Gauß-Sigma in Pixeln, 0 = aus) gegen Rauschen geglättet.
+    """
+
+    def __init__(self, smoothing=1.5):
+        self.smoothing = smoothing
+        self.latest = None
+        self.latest_seq = None
+        self._lock = threading.Lock()
+
+    def update(self, height_field, width_m, seq=None):
+        if self.smoothing > 0:
+            height_field = cv2.GaussianBlur(height_field, (0, 0), self.smoothing)
+        with self._lock:
+            previous = self.latest
+        mesh = build_terrain_mesh(height_field, width_m, previous=previous)
+        with self._lock:
+            self.latest = mesh
+            self.latest_seq = seq
+        return mesh
+
+    def status(self):
+        with self._lock:
+            mesh, seq = self.latest, self.latest_seq
+        settings = {"vertex_budget": vertex_budget, "tolerance_mm": tolerance * 1000,
+                    "change_tolerance_mm": change_tolerance * 1000, "smoothing": self.smoothing}
+        if mesh is None:
+            return {"settings": settings, "mesh": None}
+        return {"settings": settings, "seq": seq, "mesh": mesh.status()}
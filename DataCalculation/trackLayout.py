@@ -0,0 +1,150 @@
+import numpy as np
+
+# ===============================================
+# Objekte über die Zeit verfolgen (Stadt-Layout)
+# ===============================================
+#
+# Eingabe sind die serialisierten Objektlisten aus objects_to_json (class,
+# bbox, area, centroid, polygon, height). Pro Klasse werden die Objekte
+# eines Frames den bekannten Objekten über den Abstand der Schwerpunkte
+# zugeordnet (gierig, kürzeste Abstände zuerst). Daraus entstehen Ereignisse:
+#
+#   appeared - Objekt ist confirm_frames Frames in Folge zu sehen
+#   moved    - Schwerpunkt weiter als move_tolerance Pixel vom letzten
+#              gemeldeten Stand entfernt
+#   resized  - Fläche um mehr als resize_tolerance (Anteil) verändert
+#              (schließt eine Verschiebung mit ein)
+#   removed  - Objekt lost_frames Frames in Folge nicht gefunden
+#
+# Verglichen wird immer mit dem zuletzt gemeldeten Stand, nicht mit dem
+# letzten Frame; langsames Schieben wird also auch gemeldet, Rauschen nicht.
+
+def geometry(obj):
+    """Geometrie eines Objekts in der Form des Logs (Polygon flach)"""
+    polygon = obj["polygon"]
+    if len(polygon) and isinstance(polygon[0], (list, tuple)):
+        polygon = [int(v) for point in polygon for v in point]
+    return {
+        "bbox": [int(v) for v in obj["bbox"]],
+        "centroid": [round(float(v), 1) for v in obj["centroid"]],
+        "area": round(float(obj["area"]), 1),
+        "height": None if obj.get("height") is None else round(float(obj["height"]), 4),
+        "polygon": polygon,
+    }
+
+
+class _Track:
+    def __init__(self, track_id, object_class, shape):
+        self.id = track_id
+        self.object_class = object_class
+        self.current = shape       # zuletzt gesehen
+        self.reported = None       # zuletzt gemeldet (None = noch nicht bestätigt)
+        self.hits = 1
+        self.misses = 0
+
+
+class LayoutTracker:
+    """
+    Ordnet Objekte über Frames zu und liefert die Layout-Ereignisse.
+
+    Parameter:
+    - move_tolerance: Pixel, ab denen eine Verschiebung gemeldet wird
+    - resize_tolerance: relative Flächenänderung für "resized"
+    - min_area: kleinere Objekte (Pixel²) werden ignoriert
+    - confirm_frames / lost_frames: Entprellung von Erscheinen/Verschwinden
+    - max_distance: größter Schwerpunkt-Abstand für eine Zuordnung, mindestens
+      aber die halbe Diagonale der Bounding-Box
+    """
+
+    def __init__(self, move_tolerance=4.0, resize_tolerance=0.15, min_area=50.0,
+                 confirm_frames=3, lost_frames=5, max_distance=40.0):
+        self.move_tolerance = move_tolerance
+        self.resize_tolerance = resize_tolerance
+        self.min_area = min_area
+        self.confirm_frames = confirm_frames
+        self.lost_frames = lost_frames
+        self.max_distance = max_distance
+        self._tracks = {}
+        self._next_id = 1
+
+    def state(self):
+        """Alle bestätigten Objekte im zuletzt gemeldeten Stand"""
+        return [{"id": track.id, "class": track.object_class, **track.reported}
+                for track in self._tracks.values() if track.reported is not None]
+
+    def update(self, objects, timestamp, seq=None):
+        """Objektliste eines Frames verarbeiten, Rückgabe: Liste der Ereignisse"""
+        shapes = {}
+        for obj in objects:
+            if obj["area"] >= self.min_area:
+                shapes.setdefault(obj["class"], []).append(geometry(obj))
+
+        events = []
+        classes = set(shapes) | {track.object_class for track in self._tracks.values()}
+        for object_class in sorted(classes):
+            events.extend(self._update_class(object_class, shapes.get(object_class, []), timestamp, seq))
+        return events
+
+    def _update_class(self, object_class, shapes, timestamp, seq):
+        tracks = [track for track in self._tracks.values() if track.object_class == object_class]
+        matched_tracks, matched_shapes = set(), set()
+        if tracks and shapes:
+            track_centers = np.array([track.current["centroid"] for track in tracks])
+            shape_centers = np.array([shape["centroid"] for shape in shapes])
+            distance = np.linalg.norm(track_centers[:, None, :] - shape_centers[None, :, :], axis=2)
+            gate = np.array([max(self.max_distance, 0.5 * np.hypot(*shape["bbox"][2:])) for shape in shapes])
+            for flat in np.argsort(distance, axis=None):
+                t, s = np.unravel_index(flat, distance.shape)
+                if distance[t, s] > gate.max():
+                    break
+                if distance[t, s] > gate[s] or t in matched_tracks or s in matched_shapes:
+                    continue
+                matched_tracks.add(t)
+                matched_shapes.add(s)
+                tracks[t].current = shapes[s]
+
+        events = []
+        for t, track in enumerate(tracks):
+            if t in matched_tracks:
+                track.hits += 1
+                track.misses = 0
+                event = self._check(track)
+            else:
+                track.misses += 1
+                event = None
+                if track.misses >= self.lost_frames or (track.reported is None and track.misses > 0):
+                    del self._tracks[track.id]
+                    if track.reported is not None:
+                        event = {"type": "removed", "id": track.id, "class": track.object_class}
+            if event is not None:
+                events.append({"t": round(timestamp, 3), "seq": seq, **event})
+
+        for s, shape in enumerate(shapes):
+            if s not in matched_shapes:
+                track = _Track(self._next_id, object_class, shape)
+                self._next_id += 1
+                self._tracks[track.id] = track
+                event = self._check(track)
+                if event is not None:
+                    events.append({"t": round(timestamp, 3), "seq": seq, **event})
+        return events
+
+    def _check(self, track):
+        """Ereignis für eine gefundene Spur oder None"""
+        if track.reported is None:
+            if track.hits < self.confirm_frames:
+                return None
+            event_type = "appeared"
+        else:
+            reported, current = track.reported, track.current
+            area_change = abs(current["area"] - reported["area"]) / max(reported["area"], 1.0)
+            shift = np.hypot(current["centroid"][0] - reported["centroid"][0],
+                             current["centroid"][1] - reported["centroid"][1])
+            if area_change > self.resize_tolerance:
+                event_type = "resized"
+            elif shift > self.move_tolerance:
+                event_type = "moved"
+            else:
+                return None
+        track.reported = track.current
+        return {"type": event_type, "id": track.id, "class": track.object_class, **track.current}
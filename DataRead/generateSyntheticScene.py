@@ -0,0 +1,220 @@
+import time
+
+import cv2
+import numpy as np
+from templates.base_camera_manager import BaseCameraManager
+
+# ============================================================================
+# Synthetische Sandkasten-Szenen mit Ground-Truth-Masken
+# ============================================================================
+#
+# Eine Szene besteht aus sanften Hügeln, rechteckigen Bauklötzen
+# verschiedener Höhe, dunklen Straßenstreifen (Papier) und grünen
+# Park-Schnipseln. Die Geometrie wird in normierten Koordinaten (0..1)
+# aus dem Seed gewürfelt und erst danach auf die gewünschte Auflösung
+# gezeichnet: derselbe Seed ergibt bei 640x480 und 4K dieselbe Szene.
+#
+# Die Kamera schaut senkrecht von oben (camera_height über dem Tisch).
+# Das Tiefenbild bekommt tiefenabhängiges Rauschen und Löcher (zufällige
+# Flecken und Ausfälle an Gebäudekanten), wie bei echten Sensoren.
+
+SAND_COLOR = (140, 180, 210)    # BGR
+ROAD_COLOR = (95, 80, 70)       # dunkles, leicht bläuliches Grau
+PARK_COLOR = (60, 160, 70)
+BLOCK_COLORS = [(40, 40, 200), (230, 230, 230), (40, 200, 230), (200, 120, 60)]
+
+
+class SceneLayout:
+    """Gewürfelte, auflösungsunabhängige Geometrie einer Szene"""
+
+    def __init__(self, seed, num_hills=6, num_buildings=(6, 14), num_roads=(1, 3),
+                 num_parks=(1, 3)):
+        rng = np.random.default_rng(seed)
+        self.seed = seed
+
+        # Hügel: (x, y, Radius, Höhe in m)
+        self.hills = [(rng.uniform(0, 1), rng.uniform(0, 1), rng.uniform(0.1, 0.3),
+                       rng.uniform(-0.03, 0.08)) for _ in range(num_hills)]
+
+        # Straßen: Polylinien mit Breite (normiert)
+        self.roads = []
+        for _ in range(rng.integers(num_roads[0], num_roads[1] + 1)):
+            points = np.cumsum(rng.uniform(-0.25, 0.25, (4, 2)), axis=0) + rng.uniform(0.2, 0.8, 2)
+            self.roads.append((np.clip(points, 0.02, 0.98), rng.uniform(0.025, 0.045)))
+
+        # Parks: Wolken aus Papierschnipseln (Mittelpunkt, Ausdehnung, Schnipsel)
+        self.parks = []
+        for _ in range(rng.integers(num_parks[0], num_parks[1] + 1)):
+            center = rng.uniform(0.15, 0.85, 2)
+            spread = rng.uniform(0.03, 0.07)
+            pieces = [(center + rng.normal(0, spread, 2), rng.uniform(0.006, 0.012),
+                       rng.uniform(0, 180)) for _ in range(rng.integers(25, 60))]
+            self.parks.append(pieces)
+
+        # Gebäude: (x0, y0, x1, y1, Höhe in m, Farbe)
+        self.buildings = []
+        for _ in range(rng.integers(num_buildings[0], num_buildings[1] + 1)):
+            w, h = rng.uniform(0.03, 0.09, 2)
+            x0, y0 = rng.uniform(0.03, 0.97 - w), rng.uniform(0.03, 0.97 - h)
+            self.buildings.append((x0, y0, x0 + w, y0 + h, rng.uniform(0.02, 0.12),
+                                   BLOCK_COLORS[rng.integers(len(BLOCK_COLORS))]))
+
+
+def _terrain(layout, width, height):
+    """Hügel-Höhenfeld in Metern (auf kleinem Raster gerechnet, dann skaliert)"""
+    small_w, small_h = 160, max(2, int(160 * height / width))
+    x, y = np.meshgrid(np.linspace(0, 1, small_w), np.linspace(0, height / width, small_h) * (width / height))
+    ground = np.zeros((small_h, small_w), dtype=np.float32)
+    for cx, cy, radius, amplitude in layout.hills:
+        ground += np.float32(amplitude) * np.exp(-((x - cx) ** 2 + (y - cy) ** 2) / (2 * radius ** 2)).astype(np.float32)
+    ground -= ground.min()
+    return cv2.resize(ground, (width, height), interpolation=cv2.INTER_CUBIC)
+
+
+def _pixel(point, width, height):
+    return int(round(point[0] * (width - 1))), int(round(point[1] * (height - 1)))
+
+
+def generate_Scene(width=640, height=480, seed=0, depth_scale=0.001, camera_height=1.0,
+                   depth_noise=0.0015, hole_fraction=0.01):
+    """
+    Erzeugt eine Szene in der gewünschten Auflösung.
+
+    Parameter:
+    - depth_scale: Meter pro Tiefeneinheit des uint16-Tiefenbilds
+    - camera_height: Abstand Kamera - Tischebene in Metern
+    - depth_noise: Rauschen (Standardabweichung) in Metern bei 1 m Abstand,
+      wächst quadratisch mit dem Abstand
+    - hole_fraction: Anteil der Pixel in zufälligen Löchern (Tiefe 0)
+
+    Rückgabe: Dictionary mit "depth" (uint16), "color" (BGR), den
+    Ground-Truth-Masken "building_mask", "road_mask", "park_mask" (uint8,
+    0/255), "height" (Meter über dem Tisch) und "depth_scale".
+    """
+    layout = SceneLayout(seed)
+    rng = np.random.default_rng(seed + 1)
+    scale = width / 640.0
+
+    ground = _terrain(layout, width, height)
+    surface = ground.copy()
+
+    # Straßen und Parks liegen flach auf dem Sand (nur Farbe)
+    road_mask = np.zeros((height, width), dtype=np.uint8)
+    for points, road_width in layout.roads:
+        pixels = np.array([_pixel(p, width, height) for p in points], dtype=np.int32)
+        cv2.polylines(road_mask, [pixels], False, 255, thickness=max(1, int(road_width * width)),
+                      lineType=cv2.LINE_AA)
+    cv2.threshold(road_mask, 127, 255, cv2.THRESH_BINARY, dst=road_mask)
+
+    confetti = np.zeros((height, width), dtype=np.uint8)
+    for pieces in layout.parks:
+        for center, size, angle in pieces:
+            axes = (max(1, int(size * width)), max(1, int(size * width * 0.6)))
+            cv2.ellipse(confetti, _pixel(np.clip(center, 0, 1), width, height), axes, angle, 0, 360, 255, -1)
+    # Ground Truth: Schnipsel-Wolke mit geschlossenen Lücken
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (max(3, int(9 * scale)) | 1,) * 2)
+    park_mask = cv2.morphologyEx(confetti, cv2.MORPH_CLOSE, kernel)
+
+    # Gebäude: flaches Dach über der Geländehöhe in der Mitte des Klotzes
+    building_mask = np.zeros((height, width), dtype=np.uint8)
+    color = np.empty((height, width, 3), dtype=np.uint8)
+    color[:] = SAND_COLOR
+    color[road_mask > 0] = ROAD_COLOR
+    color[confetti > 0] = PARK_COLOR
+    for x0, y0, x1, y1, block_height, block_color in layout.buildings:
+        c0, r0 = _pixel((x0, y0), width, height)
+        c1, r1 = _pixel((x1, y1), width, height)
+        roof = ground[(r0 + r1) // 2, (c0 + c1) // 2] + block_height
+        surface[r0:r1, c0:c1] = np.maximum(surface[r0:r1, c0:c1], roof)
+        building_mask[r0:r1, c0:c1] = 255
+        color[r0:r1, c0:c1] = block_color
+
+    # Prioritäten wie in detect_Buildings: Gebäude > Parks > Straßen
+    park_mask[building_mask > 0] = 0
+    road_mask[(building_mask > 0) | (park_mask > 0)] = 0
+
+    # Beleuchtung: Schattierung aus der Geländeneigung, dazu Sandkörnung
+    grad_x = cv2.Sobel(surface, cv2.CV_32F, 1, 0, ksize=3) * (width / 1.0) / 8
+    shade = np.clip(1.0 - 0.5 * grad_x, 0.6, 1.2)
+    grain = rng.normal(1.0, 0.04, (height, width)).astype(np.float32)
+    lit = color.astype(np.float32) * (shade * grain)[..., None]
+    color = np.clip(lit, 0, 255).astype(np.uint8)
+
+    # Tiefe: Abstand zur Kamera mit Rauschen
+    depth_m = np.float32(camera_height) - surface
+    depth_m += rng.normal(0, 1, (height, width)).astype(np.float32) * (np.float32(depth_noise) * depth_m * depth_m)
+    depth = np.clip(depth_m / depth_scale + 0.5, 1, 65535).astype(np.uint16)
+
+    # Löcher: zufällige Flecken und Ausfälle an Gebäudekanten
+    holes = np.zeros((height, width), dtype=np.uint8)
+    target = hole_fraction * width * height
+    while cv2.countNonZero(holes) < target:
+        for _ in range(16):
+            center = (int(rng.integers(width)), int(rng.integers(height)))
+            radius = int(rng.uniform(2, 10) * scale) + 1
+            cv2.circle(holes, center, radius, 255, -1)
+    # Verdeckung: ein schmaler Streifen rechts neben jedem Klotz (Emitter
+    # und Sensor liegen nebeneinander, der Klotz verdeckt den Sand dahinter)
+    shift = max(2, int(3 * scale))
+    occluded = np.zeros_like(building_mask)
+    occluded[:, shift:] = building_mask[:, :-shift]
+    occluded[building_mask > 0] = 0
+    depth[(holes > 0) | ((occluded > 0) & (rng.random((height, width)) < 0.7))] = 0
+
+    return {
+        "depth": depth,
+        "color": color,
+        "building_mask": building_mask,
+        "road_mask": road_mask,
+        "park_mask": park_mask,
+        "height": surface,
+        "depth_scale": depth_scale,
+    }
+
+
+def generate_Scene_Set(count, width=640, height=480, seed=0, **kwargs):
+    """Reproduzierbare Szenenfolge mit den Seeds seed .. seed + count - 1"""
+    for i in range(count):
+        yield generate_Scene(width, height, seed + i, **kwargs)
+
+
+class SyntheticCameraManager(BaseCameraManager):
+    """
+    Kamera ohne Hardware: spielt synthetische Szenen mit fester Bildrate ab.
+    Nützlich zum Testen der Themen und für Benchmarks.
+    """
+
+    def __init__(self, width=640, height=480, seed=0, num_scenes=8, fps=15, depth_scale=0.001):
+        super().__init__()
+        self.width = width
+        self.height = height
+        self.seed = seed
+        self.num_scenes = num_scenes
+        self.fps = fps
+        self.depth_scale = depth_scale
+        self.device_id = f"synthetic:{seed}"
+        self.scenes = []
+        self.position = 0
+        self._next_frame = 0.0
+
+    def start(self):
+        self.scenes = [{"color": scene["color"], "depth": scene["depth"]}
+                       for scene in generate_Scene_Set(self.num_scenes, self.width, self.height,
+                                                       self.seed, depth_scale=self.depth_scale)]
+        self.position = 0
+        self._next_frame = time.monotonic()
+        print(f"Synthetische Kamera mit {len(self.scenes)} Szenen gestartet")
+
+    def read_frame(self):
+        # Bildrate einhalten (blockierend wie eine echte Kamera)
+        delay = self._next_frame - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._next_frame = max(self._next_frame + 1.0 / self.fps, time.monotonic())
+        scene = self.scenes[self.position]
+        self.position = (self.position + 1) % len(self.scenes)
+        return {"color": scene["color"].copy(), "depth": scene["depth"].copy()}
+
+    def stop(self):
+        self.scenes = []
+        print("Synthetische Kamera gestoppt")
@@ -0,0 +1,275 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from DataCalculation.extractObjects import objects_to_json
+from DataCalculation.trackLayout import LayoutTracker
+
+# ============================================================================
+# Ereignis-Log des Stadt-Layouts (statt roher Aufnahmen)
+# ============================================================================
+#
+# Aufbau eines Log-Ordners:
+#   meta.json      - Start, Einstellungen des Trackers
+#   events.jsonl   - eine JSON-Zeile pro Ereignis (appeared, moved, resized,
+#                    removed, siehe trackLayout) und regelmäßig eine Zeile
+#                    {"type": "snapshot", "t": ..., "objects": [...]} mit
+#                    allen bekannten Objekten
+#   snapshots.bin  - feste Datensätze (SNAPSHOT_DTYPE): Zeit und Byte-Offset
+#                    jeder Snapshot-Zeile
+#
+# Zeiten sind Unix-Sekunden. Die Datei wird nur angehängt. Zum Springen an
+# eine Uhrzeit sucht der Reader im gemappten snapshots.bin den letzten
+# Snapshot davor und liest ab dort nur noch die Ereignisse bis zur Uhrzeit.
+
+SNAPSHOT_DTYPE = np.dtype([("t", "<f8"), ("offset", "<u8")])
+EVENT_TYPES = ("appeared", "moved", "resized", "removed")
+
+
+def _dumps(record):
+    return json.dumps(record, separators=(",", ":"), ensure_ascii=False)
+
+
+class LayoutLogWriter:
+    """
+    Schreibt Ereignisse und alle snapshot_interval Sekunden einen Snapshot.
+    Ein bestehender Ordner wird fortgesetzt (neuer Snapshot beim Öffnen,
+    Objekt-Ids beginnen dann aber wieder bei 1).
+    """
+
+    def __init__(self, path, snapshot_interval=300.0, meta=None):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.snapshot_interval = snapshot_interval
+        self.events_written = 0
+        self.snapshots_written = 0
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_path):
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump({"created": time.time(), "snapshot_dtype": SNAPSHOT_DTYPE.descr,
+                           **(meta or {})}, f, indent=2)
+        self._events = open(os.path.join(path, "events.jsonl"), "ab")
+        self._snapshots = open(os.path.join(path, "snapshots.bin"), "ab")
+        self._last_snapshot = None
+        self._lock = threading.Lock()
+
+    def write(self, events, timestamp, state):
+        """
+        Hängt die Ereignisse an. state: Funktion ohne Argumente, die alle
+        bekannten Objekte liefert (nur aufgerufen, wenn ein Snapshot fällig ist).
+        """
+        with self._lock:
+            if self._last_snapshot is None or timestamp - self._last_snapshot >= self.snapshot_interval:
+                self._write_snapshot(timestamp, state())
+            if events:
+                self._events.write(b"".join(_dumps(event).encode("utf-8") + b"\n" for event in events))
+                self.events_written += len(events)
+                self._events.flush()
+
+    def _write_snapshot(self, timestamp, objects):
+        offset = self._events.tell()
+        self._events.write(_dumps({"type": "snapshot", "t": round(timestamp, 3),
+                                   "objects": objects}).encode("utf-8") + b"\n")
+        self._events.flush()
+        record = np.array([(timestamp, offset)], dtype=SNAPSHOT_DTYPE)
+        self._snapshots.write(record.tobytes())
+        self._snapshots.flush()
+        self._last_snapshot = timestamp
+        self.snapshots_written += 1
+
+    def close(self):
+        with self._lock:
+            self._events.close()
+            self._snapshots.close()
+
+
+class LayoutLogReader:
+    """
+    Liest ein Layout-Log. state_at(t) springt über den letzten Snapshot vor
+    t, events()/replay() lesen die Datei am Stück (ein ganzer Tag in Sekunden).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        snapshots_path = os.path.join(path, "snapshots.bin")
+        count = os.path.getsize(snapshots_path) // SNAPSHOT_DTYPE.itemsize if os.path.exists(snapshots_path) else 0
+        if count > 0:
+            self.snapshots = np.memmap(snapshots_path, dtype=SNAPSHOT_DTYPE, mode="r", shape=(count,))
+        else:
+            self.snapshots = np.zeros(0, dtype=SNAPSHOT_DTYPE)
+        self.events_path = os.path.join(path, "events.jsonl")
+
+    def _offset_before(self, t):
+        """Byte-Offset des letzten Snapshots mit Zeit <= t (0 = Dateianfang)"""
+        if t is None or len(self.snapshots) == 0:
+            return 0
+        i = int(np.searchsorted(self.snapshots["t"], t, side="right")) - 1
+        return int(self.snapshots["offset"][max(i, 0)])
+
+    def _records(self, offset=0):
+        with open(self.events_path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        for line in data.splitlines():
+            if line:
+                yield json.loads(line)
+
+    def events(self, start=None, end=None, types=EVENT_TYPES):
+        """Ereignisse mit start <= t <= end (ohne Snapshots)"""
+        for record in self._records(self._offset_before(start)):
+            t = record["t"]
+            if end is not None and t > end:
+                return
+            if record["type"] in types and (start is None or t >= start):
+                yield record
+
+    def replay(self, start=None, end=None):
+        """
+        Spielt das Log ab: liefert (Ereignis, Zustand) nach jedem Ereignis.
+        Zustand: {id: Objekt}, wird weiterbenutzt (bei Bedarf kopieren).
+        """
+        objects = {}
+        for record in self._records(self._offset_before(start)):
+            t = record["t"]
+            if end is not None and t > end:
+                return
+            if record["type"] == "snapshot":
+                objects = {obj["id"]: obj for obj in record["objects"]}
+                continue
+            _apply(objects, record)
+            if start is None or t >= start:
+                yield record, objects
+
+    def state_at(self, t):
+        """Alle Objekte zur Zeit t: {id: Objekt}"""
+        objects = {}
+        for record in self._records(self._offset_before(t)):
+            if record["t"] > t:
+                break
+            if record["type"] == "snapshot":
+                objects = {obj["id"]: obj for obj in record["objects"]}
+            else:
+                _apply(objects, record)
+        return objects
+
+    def summary(self):
+        """Anzahl Ereignisse pro Typ und Klasse, Zeitraum"""
+        counts = {}
+        first = last = None
+        for record in self.events():
+            first = record["t"] if first is None else first
+            last = record["t"]
+            key = f'{record["type"]}:{record.get("class")}'
+            counts[key] = counts.get(key, 0) + 1
+        return {"first": first, "last": last, "snapshots": len(self.snapshots), "events": counts}
+
+
+def _apply(objects, event):
+    if event["type"] == "removed":
+        objects.pop(event["id"], None)
+    else:
+        objects[event["id"]] = {key: value for key, value in event.items() if key not in ("type", "t", "seq")}
+
+
+class LayoutLogger:
+    """Tracker plus Writer: Objektlisten rein, Ereignisse ins Log"""
+
+    def __init__(self, path, snapshot_interval=300.0, tracker=None, meta=None):
+        self.path = path
+        self.tracker = tracker or LayoutTracker()
+        self.frames = 0
+        self.writer = LayoutLogWriter(path, snapshot_interval, {
+            **(meta or {}),
+            "tracker": {key: value for key, value in vars(self.tracker).items() if not key.startswith("_")},
+        })
+
+    def record(self, objects, timestamp, seq=None):
+        """Serialisierte Objektliste (objects_to_json) eines Frames verarbeiten"""
+        events = self.tracker.update(objects, timestamp, seq)
+        self.writer.write(events, timestamp, self.tracker.state)
+        self.frames += 1
+        return events
+
+    def close(self):
+        self.writer.close()
+
+    def status(self):
+        return {
+            "path": self.path,
+            "frames": self.frames,
+            "objects": len(self.tracker.state()),
+            "events_written": self.writer.events_written,
+            "snapshots_written": self.writer.snapshots_written,
+        }
+
+
+class LayoutRecorder:
+    """
+    Hintergrund-Thread für die Flask-App: holt mit fps Bildern pro Sekunde
+    das neueste Frame vom CameraHub, rechnet die Objektliste (object_source:
+    Funktion(camera, frame_data) -> {"seq", "objects"}) und schreibt die
+    Layout-Ereignisse ins Log. Die Kamera bleibt dabei geöffnet.
+    """
+
+    def __init__(self, camera_hub, object_source, path, fps=2.0, snapshot_interval=300.0,
+                 polygon_tolerance=2.0, tracker=None):
+        self.camera_hub = camera_hub
+        self.object_source = object_source
+        self.path = path
+        self.fps = fps
+        self.polygon_tolerance = polygon_tolerance
+        self.logger = LayoutLogger(path, snapshot_interval, tracker,
+                                   {"fps": fps, "polygon_tolerance": polygon_tolerance})
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        print(f"[INFO] Layout-Log gestartet: {self.path}")
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.logger.close()
+
+    @property
+    def running(self):
+        return self._running
+
+    def _run(self):
+        camera = self.camera_hub.acquire()
+        last_seq = -1
+        try:
+            while self._running:
+                started = time.monotonic()
+                frame_data = self.camera_hub.wait_for_newer(last_seq, timeout=1.0)
+                if frame_data is None:
+                    continue
+                last_seq = frame_data["seq"]
+                # Monotone Aufnahmezeit -> Unix-Zeit
+                timestamp = time.time() - (time.monotonic() - frame_data.get("timestamp", time.monotonic()))
+                try:
+                    result = self.object_source(camera, frame_data)
+                except Exception as e:
+                    print(f"Fehler im Layout-Log: {e}")
+                    result = None
+                finally:
+                    self.camera_hub.done(frame_data)
+                if result is not None:
+                    self.logger.record(objects_to_json(result["objects"], self.polygon_tolerance),
+                                       timestamp, result.get("seq"))
+                time.sleep(max(0.0, 1.0 / self.fps - (time.monotonic() - started)))
+        finally:
+            self.camera_hub.release()
+
+    def status(self):
+        return {"running": self._running, "fps": self.fps, **self.logger.status()}
@@ -2,10 +2,12 @@ import numpy as np
 import cv2
 from primesense import openni2
 from templates.base_camera_manager import BaseCameraManager
+from DataCalculation.tableGeometry import DepthIntrinsics
 from templates.openNI import init_openni2
 
 class AsusXtionCameraManager(BaseCameraManager):
     def __init__(self):
+        super().__init__()
         self.device = None
         self.color_stream = None
         self.depth_stream = None
@@ -13,6 +15,8 @@ class AsusXtionCameraManager(BaseCameraManager):
         # Attribute hinzufügen, damit der Zugriff funktioniert
         self.depth_scale = 0.001  # Beispiel: 1 mm = 0.001 m (kann angepasst werden)
         self.baseline_distance = None  # Wenn du es hast, sonst None
+        # Typische Werte der Xtion PRO Live (640x480, Tiefe)
+        self.depth_intrinsics = DepthIntrinsics(640, 480, 570.34, 570.34, 319.5, 239.5)
     
     def start(self):
         init_openni2()
@@ -32,6 +36,9 @@ class AsusXtionCameraManager(BaseCameraManager):
         # Nutze ausgelagerte Funktion
         return read_frames_asus(self.color_stream, self.depth_stream)
 
+    def read_frame_into(self, slot, timeout=None):
+        return read_frames_asus_into(self.color_stream, self.depth_stream, slot)
+
     def stop(self):
         if self.color_stream:
             self.color_stream.stop()
@@ -45,33 +52,58 @@ class AsusXtionCameraManager(BaseCameraManager):
 def read_frames_asus(color_stream, depth_stream):
     """
     Liest Farbbild und Tiefenbild von Asus Xtion Kamera über OpenNI2.
+    Fehler des Treibers (z.B. Kabel gezogen) werden weitergereicht, der
+    CaptureSupervisor im CameraHub zählt sie und verbindet neu.
+    """
+    # Farb-Frame lesen
+    c_frame = color_stream.read_frame()
+    width, height = c_frame.width, c_frame.height
+    c_data = c_frame.get_buffer_as_uint8()
+
+    if len(c_data) == width * height * 3:
+        color = np.frombuffer(c_data, dtype=np.uint8).reshape((height, width, 3))
+        color = cv2.cvtColor(color, cv2.COLOR_RGB2BGR)
+    elif len(c_data) == width * height:
+        color = np.frombuffer(c_data, dtype=np.uint8).reshape((height, width))
+        color = cv2.cvtColor(color, cv2.COLOR_GRAY2BGR)
+    else:
+        raise RuntimeError(f"Unerwartete Farbbildgröße: {len(c_data)} Bytes")
+
+    # Tiefenbild lesen
+    d_frame = depth_stream.read_frame()
+    depth = np.frombuffer(
+        d_frame.get_buffer_as_uint16(), dtype=np.uint16).reshape(
+            (d_frame.height, d_frame.width))
+
+    return {
+        "color": color,
+        "depth": depth
+    }
+
+def read_frames_asus_into(color_stream, depth_stream, slot):
+    """
+    Wie read_frames_asus, schreibt aber direkt in die Puffer des FrameSlot.
+    Die OpenNI-Puffer werden nur als View gelesen, die einzige Kopie ist
+    die Farbkonvertierung in den Slot.
     """
-    try:
-        # Farb-Frame lesen
-        c_frame = color_stream.read_frame()
-        width, height = c_frame.width, c_frame.height
-        c_data = c_frame.get_buffer_as_uint8()
-
-        if len(c_data) == width * height * 3:
-            color = np.frombuffer(c_data, dtype=np.uint8).reshape((height, width, 3))
-            color = cv2.cvtColor(color, cv2.COLOR_RGB2BGR)
-        elif len(c_data) == width * height:
-            color = np.frombuffer(c_data, dtype=np.uint8).reshape((height, width))
-            color = cv2.cvtColor(color, cv2.COLOR_GRAY2BGR)
-        else:
-            print(f"[WARNUNG] Unerwartete Farbbildgröße: {len(c_data)} Bytes")
-            return None
-
-        # Tiefenbild lesen
-        d_frame = depth_stream.read_frame()
-        depth = np.frombuffer(
-            d_frame.get_buffer_as_uint16(), dtype=np.uint16).reshape(
-                (d_frame.height, d_frame.width))
-
-        return {
-            "color": color,
-            "depth": depth
-        }
-    except Exception as e:
-        print(f"[FEHLER] Fehler beim Lesen der Kamera-Frames: {e}")
-        return None
\ No newline at end of file
+    c_frame = color_stream.read_frame()
+    width, height = c_frame.width, c_frame.height
+    c_data = c_frame.get_buffer_as_uint8()
+    color = slot.buffer("color", (height, width, 3), np.uint8)
+
+    if len(c_data) == width * height * 3:
+        src = np.frombuffer(c_data, dtype=np.uint8).reshape((height, width, 3))
+        cv2.cvtColor(src, cv2.COLOR_RGB2BGR, dst=color)
+    elif len(c_data) == width * height:
+        src = np.frombuffer(c_data, dtype=np.uint8).reshape((height, width))
+        cv2.cvtColor(src, cv2.COLOR_GRAY2BGR, dst=color)
+    else:
+        raise RuntimeError(f"Unerwartete Farbbildgröße: {len(c_data)} Bytes")
+
+    d_frame = depth_stream.read_frame()
+    src = np.frombuffer(
+        d_frame.get_buffer_as_uint16(), dtype=np.uint16).reshape(
+            (d_frame.height, d_frame.width))
+    np.copyto(slot.buffer("depth", src.shape, np.uint16), src)
+
+    return True
@@ -0,0 +1,209 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import cv2
+from templates.base_camera_manager import BaseCameraManager
+from templates.frame_pool import FrameSlot
+
+# ============================================================================
+# Fusion mehrerer Kameras zu einem großen Sandkasten-Höhenfeld
+# ============================================================================
+#
+# Jede Kamera bekommt eine Registrierung:
+#   homography   - 3x3, bildet Farbbild-Pixel der Kamera auf das gemeinsame
+#                  Sandkasten-Raster ab (z.B. aus den ArUco-Markern)
+#   depth_offset - Meter, die auf die Tiefe addiert werden, damit alle
+#                  Kameras dieselbe Bezugsebene haben (Höhenunterschied
+#                  der Kameras über dem Tisch)
+#
+# Aus den Homographien werden einmalig Remap-Tabellen pro Kamera und
+# Eingangsauflösung berechnet. Pro Frame bleibt je Kamera ein cv2.remap,
+# das parallel zur Aufnahme der anderen Kameras läuft.
+
+
+class CameraRegistration:
+    """Lage einer Kamera im gemeinsamen Sandkasten-Raster"""
+
+    def __init__(self, homography, depth_offset=0.0):
+        self.homography = np.asarray(homography, dtype=np.float64)
+        if self.homography.shape != (3, 3):
+            raise ValueError("Homographie muss eine 3x3-Matrix sein")
+        self.depth_offset = depth_offset
+
+
+def build_remap_tables(homography, color_shape, source_shape, grid_shape):
+    """
+    Berechnet die Remap-Tabellen, die jedem Rasterpunkt das Quellpixel
+    zuordnen. `homography` bezieht sich auf das Farbbild, für Quellen mit
+    anderer Auflösung (z.B. Tiefe) wird sie passend skaliert.
+
+    Rückgabe: (map1, map2, coverage) - Festkomma-Maps für cv2.remap und
+    eine uint8-Maske der vom Bild abgedeckten Rasterpunkte.
+    """
+    grid_h, grid_w = grid_shape
+    src_h, src_w = source_shape[:2]
+    scale = np.diag([color_shape[1] / src_w, color_shape[0] / src_h, 1.0])
+    grid_to_source = np.linalg.inv(homography @ scale)
+
+    u, v = np.meshgrid(np.arange(grid_w, dtype=np.float64),
+                       np.arange(grid_h, dtype=np.float64))
+    points = np.stack([u, v, np.ones_like(u)], axis=-1) @ grid_to_source.T
+    map_x = (points[..., 0] / points[..., 2]).astype(np.float32)
+    map_y = (points[..., 1] / points[..., 2]).astype(np.float32)
+
+    coverage = ((map_x >= 0) & (map_x <= src_w - 1) &
+                (map_y >= 0) & (map_y <= src_h - 1)).astype(np.uint8) * 255
+    map1, map2 = cv2.convertMaps(map_x, map_y, cv2.CV_16SC2)
+    return map1, map2, coverage
+
+
+class _CameraWarper:
+    """Remap-Tabellen und Zielpuffer einer Kamera (werden wiederverwendet)"""
+
+    def __init__(self, camera, registration, grid_shape):
+        self.camera = camera
+        self.registration = registration
+        self.grid_shape = grid_shape
+        self._tables = {}
+        self.depth = np.zeros(grid_shape, dtype=np.uint16)
+        self.color = np.zeros(grid_shape + (3,), dtype=np.uint8)
+        self.depth_valid = np.zeros(grid_shape, dtype=np.uint8)
+        self.color_valid = np.zeros(grid_shape, dtype=np.uint8)
+        self.has_depth = False
+        self.has_color = False
+
+    def _tables_for(self, color_shape, source_shape):
+        key = (tuple(color_shape[:2]), tuple(source_shape[:2]))
+        if key not in self._tables:
+            self._tables[key] = build_remap_tables(
+                self.registration.homography, color_shape, source_shape, self.grid_shape)
+        return self._tables[key]
+
+    def capture(self, timeout=None):
+        """Liest ein Frame der Kamera und projiziert es ins Raster"""
+        frame_data = self.camera.read_pooled_frame(timeout)
+        self.has_depth = self.has_color = False
+        if frame_data is None:
+            return False
+
+        color = frame_data.get("color")
+        depth = frame_data.get("depth")
+        color_shape = color.shape if color is not None else depth.shape
+
+        if color is not None:
+            map1, map2, coverage = self._tables_for(color_shape, color.shape)
+            cv2.remap(color, map1, map2, cv2.INTER_LINEAR, dst=self.color,
+                      borderMode=cv2.BORDER_CONSTANT)
+            np.copyto(self.color_valid, coverage)
+            self.has_color = True
+
+        if depth is not None:
+            # Tiefe nicht interpolieren: Mittelwerte mit Löchern (0) wären falsch
+            map1, map2, coverage = self._tables_for(color_shape, depth.shape)
+            cv2.remap(depth, map1, map2, cv2.INTER_NEAREST, dst=self.depth,
+                      borderMode=cv2.BORDER_CONSTANT)
+            cv2.compare(self.depth, 0, cv2.CMP_GT, dst=self.depth_valid)
+            cv2.bitwise_and(self.depth_valid, coverage, dst=self.depth_valid)
+            self.has_depth = True
+        return True
+
+
+class FusedCameraManager(BaseCameraManager):
+    """
+    Kombiniert mehrere Kamera-Manager zu einer virtuellen Kamera, deren
+    Frames das gesamte Sandkasten-Raster abdecken. Überlappungen werden
+    gemittelt, die Ausgabe hat das bekannte Format (uint16-Tiefe mit
+    depth_scale, BGR-Farbe), sodass detect_Buildings und die Themen sie
+    unverändert verarbeiten.
+    """
+
+    def __init__(self, cameras, registrations, grid_shape=(960, 1280), depth_scale=0.001):
+        super().__init__()
+        if not cameras:
+            raise ValueError("Kamera-Fusion ohne Kameras: FUSED_CAMERAS in app.py "
+                             "braucht mindestens einen Eintrag")
+        if len(cameras) != len(registrations):
+            raise ValueError("Jede Kamera braucht genau eine Registrierung")
+        self.cameras = cameras
+        self.registrations = registrations
+        self.grid_shape = tuple(grid_shape)
+        self.depth_scale = depth_scale
+        self.device_id = "fused:" + "+".join(camera.device_id for camera in cameras)
+        self._warpers = [_CameraWarper(camera, registration, self.grid_shape)
+                         for camera, registration in zip(cameras, registrations)]
+        self._executor = None
+
+        # Akkumulatoren für die Überlagerung (einmal alloziert)
+        self._depth_sum = np.zeros(self.grid_shape, dtype=np.float32)
+        self._depth_count = np.zeros(self.grid_shape, dtype=np.float32)
+        self._color_sum = np.zeros(self.grid_shape + (3,), dtype=np.float32)
+        self._color_count = np.zeros(self.grid_shape, dtype=np.float32)
+        self._scratch = np.zeros(self.grid_shape, dtype=np.float32)
+
+    def start(self):
+        for camera in self.cameras:
+            camera.start()
+        self._executor = ThreadPoolExecutor(max_workers=len(self.cameras),
+                                            thread_name_prefix="fusion")
+        print(f"Kamera-Fusion mit {len(self.cameras)} Kameras gestartet")
+
+    def read_frame(self):
+        # Eigener Slot außerhalb des Pools: Aufrufer bekommt neue Arrays
+        slot = FrameSlot(-1)
+        if not self.read_frame_into(slot):
+            return None
+        return {"color": slot.color, "depth": slot.depth}
+
+    def read_frame_into(self, slot, timeout=None):
+        # Aufnahme + Reprojektion laufen pro Kamera parallel (OpenCV gibt den GIL frei)
+        results = list(self._executor.map(lambda warper: warper.capture(timeout), self._warpers))
+        if not any(results):
+            return False
+
+        self._depth_sum.fill(0)
+        self._depth_count.fill(0)
+        self._color_sum.fill(0)
+        self._color_count.fill(0)
+        has_depth = has_color = False
+
+        for warper in self._warpers:
+            if warper.has_depth:
+                has_depth = True
+                # Tiefe in Meter der gemeinsamen Bezugsebene umrechnen
+                camera_scale = warper.camera.depth_scale
+                np.multiply(warper.depth, np.float32(camera_scale), out=self._scratch,
+                            casting="unsafe")
+                self._scratch += np.float32(warper.registration.depth_offset)
+                cv2.add(self._depth_sum, self._scratch, dst=self._depth_sum,
+                        mask=warper.depth_valid)
+                cv2.add(self._depth_count, 1.0, dst=self._depth_count,
+                        mask=warper.depth_valid)
+            if warper.has_color:
+                has_color = True
+                cv2.add(self._color_sum, warper.color, dst=self._color_sum,
+                        mask=warper.color_valid, dtype=cv2.CV_32F)
+                cv2.add(self._color_count, 1.0, dst=self._color_count,
+                        mask=warper.color_valid)
+
+        if has_depth:
+            np.maximum(self._depth_count, 1.0, out=self._depth_count)
+            np.divide(self._depth_sum, self._depth_count, out=self._depth_sum)
+            self._depth_sum /= np.float32(self.depth_scale)
+            self._depth_sum += np.float32(0.5)
+            depth = slot.buffer("depth", self.grid_shape, np.uint16)
+            np.copyto(depth, self._depth_sum, casting="unsafe")
+        if has_color:
+            np.maximum(self._color_count, 1.0, out=self._color_count)
+            np.divide(self._color_sum, self._color_count[..., None], out=self._color_sum)
+            self._color_sum += np.float32(0.5)
+            color = slot.buffer("color", self.grid_shape + (3,), np.uint8)
+            np.copyto(color, self._color_sum, casting="unsafe")
+        return True
+
+    def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        for camera in self.cameras:
+            camera.stop()
+        print("Kamera-Fusion gestoppt")
@@ -2,19 +2,25 @@ import numpy as np
 import pyrealsense2 as rs
 import cv2
 from templates.base_camera_manager import BaseCameraManager
+from DataCalculation.tableGeometry import DepthIntrinsics
 
 class IntelD415CameraManager(BaseCameraManager):
     """Manager für Intel RealSense D415 Kamera"""
     
-    def __init__(self):
+    def __init__(self, serial=None):
         super().__init__()
         self.pipeline = None
         self.config = None
+        self.serial = serial  # Seriennummer, nötig bei mehreren D415
+        if serial is not None:
+            self.device_id = f"intel_d415:{serial}"
     
     def start(self):
         self.pipeline = rs.pipeline()
         self.config = rs.config()
         self.depth_scale = 0.001  # RealSense üblich
+        if self.serial is not None:
+            self.config.enable_device(self.serial)
 
         # Geräte-Konfiguration
         pipeline_wrapper = rs.pipeline_wrapper(self.pipeline)
@@ -38,11 +44,19 @@ class IntelD415CameraManager(BaseCameraManager):
             rs.stream.color, 640, 480, rs.format.bgr8, 30)
         
         # Pipeline starten
-        self.pipeline.start(self.config)
+        profile = self.pipeline.start(self.config)
+        # Die Tiefe wird auf das Farbbild aligniert, es gelten dessen Intrinsics
+        # (Verzeichnung der D415-Farbkamera ist vernachlässigbar)
+        color = profile.get_stream(rs.stream.color).as_video_stream_profile().get_intrinsics()
+        self.depth_intrinsics = DepthIntrinsics(color.width, color.height, color.fx, color.fy,
+                                                color.ppx, color.ppy)
         print("Intel RealSense D415 erfolgreich initialisiert")
     
     def read_frame(self):
         return read_Intel_Camera_optimized(self.pipeline)
+
+    def read_frame_into(self, slot, timeout=None):
+        return read_Intel_Camera_optimized_into(self.pipeline, slot, timeout)
     
     def stop(self):
         if self.pipeline is not None:
@@ -86,10 +100,88 @@ def read_Intel_Camera_optimized(pipeline):
     Fokus auf maximale Bildqualität und Stabilität
     """
     
+    frames = wait_for_filtered_frames(pipeline)
+    if frames is None:
+        return None
+    color_frame, depth_frame = frames
+    
+    # ========================================================================
+    # NUMPY ARRAYS ERSTELLEN
+    # ========================================================================
+    
+    color_image = np.asanyarray(color_frame.get_data())
+    depth_image = np.asanyarray(depth_frame.get_data())
+    
+    # Linken Rand korrigieren (falls nötig)
+    if depth_image.shape[1] > 60:
+        depth_image[:, :60] = 0
+    
+    # ZUSÄTZLICHE POST-PROCESSING (optional - für noch bessere Qualität)
+    
+    # Median-Filter auf Depth (entfernt Salz-Pfeffer-Rauschen)
+    depth_image = cv2.medianBlur(depth_image.astype(np.uint16), 5)
+    
+    # Bilateral Filter auf Color (behält Kanten, glättet Flächen)
+    color_image = cv2.bilateralFilter(
+        color_image, d=5, sigmaColor=50, sigmaSpace=50)
+    
+    return {
+        "color": color_image, 
+        "depth": depth_image
+    }
+
+
+def read_Intel_Camera_optimized_into(pipeline, slot, timeout=None):
+    """
+    Wie read_Intel_Camera_optimized, aber Median- und Bilateral-Filter
+    schreiben direkt in die Puffer des FrameSlot (keine Zwischenkopien).
+    timeout: Sekunden bis False zurückgegeben wird (None = 5 s wie librealsense)
+    """
+    frames = wait_for_filtered_frames(pipeline, timeout)
+    if frames is None:
+        return False
+    color_frame, depth_frame = frames
+
+    # Views auf die librealsense-Puffer, z16 ist bereits uint16
+    color_image = np.asanyarray(color_frame.get_data())
+    depth_image = np.asanyarray(depth_frame.get_data())
+
+    if depth_image.shape[1] > 60:
+        depth_image[:, :60] = 0
+
+    depth = slot.buffer("depth", depth_image.shape, np.uint16)
+    cv2.medianBlur(depth_image, 5, dst=depth)
+
+    color = slot.buffer("color", color_image.shape, np.uint8)
+    cv2.bilateralFilter(color_image, 5, 50, 50, dst=color)
+    return True
+
+
+# Stärke der Tiefen-Filter (vom Qualitätsregler gesetzt):
+# 2 = volle Pipeline, 1 = schwächerer Spatial-Filter ohne Temporal-Filter,
+# 0 = nur Bereichsgrenze und Lochfüllung
+filter_strength = 2
+
+# Standard-Wartezeit von librealsense (wait_for_frames) in Millisekunden
+DEFAULT_TIMEOUT_MS = 5000
+
+def wait_for_filtered_frames(pipeline, timeout=None):
+    """
+    Wartet auf ein Frame-Paar, aligniert es und wendet die Filter-Pipeline
+    auf das Tiefenbild an. Rückgabe: (color_frame, depth_frame) oder None.
+    Wie stark gefiltert wird, bestimmt filter_strength.
+    timeout: höchstens so viele Sekunden warten, danach None statt der
+    RuntimeError von wait_for_frames (None = DEFAULT_TIMEOUT_MS)
+    """
+    strength = filter_strength
+    timeout_ms = DEFAULT_TIMEOUT_MS if timeout is None else max(1, int(timeout * 1000))
+    
     # Frames abrufen und alignieren
     align_to = rs.stream.color
     align = rs.align(align_to)
-    frames = pipeline.wait_for_frames()
+    success, frames = pipeline.try_wait_for_frames(timeout_ms)
+    if not success:
+        return None
     aligned_frames = align.process(frames)
     
     color_frame = aligned_frames.get_color_frame()
@@ -114,54 +206,33 @@ def read_Intel_Camera_optimized(pipeline):
     threshold_filter.set_option(rs.option.max_distance, 0.9)   # 90cm
     depth_frame = threshold_filter.process(depth_frame)
     
-    # 3. DISPARITY TRANSFORM - für bessere Filter-Performance
-    depth_to_disparity = rs.disparity_transform(True)
-    depth_frame = depth_to_disparity.process(depth_frame)
-    
-    # 4. SPATIAL FILTER - reduziert räumliches Rauschen
-    spatial = rs.spatial_filter()
-    spatial.set_option(rs.option.filter_magnitude, 5)      # Stärker filtern
-    spatial.set_option(rs.option.filter_smooth_alpha, 0.6) # Höhere Glättung
-    spatial.set_option(rs.option.filter_smooth_delta, 25)  # Delta erhöht
-    spatial.set_option(rs.option.holes_fill, 3)            # Loch-Füllung
-    depth_frame = spatial.process(depth_frame)
-    
-    # 5. TEMPORAL FILTER - reduziert zeitliches Rauschen (Flackern!)
-    temporal = rs.temporal_filter()
-    temporal.set_option(rs.option.filter_smooth_alpha, 0.5)  # Mittelstark
-    temporal.set_option(rs.option.filter_smooth_delta, 25)
-    depth_frame = temporal.process(depth_frame)
-    
-    # 6. ZURÜCK ZU DEPTH
-    disparity_to_depth = rs.disparity_transform(False)
-    depth_frame = disparity_to_depth.process(depth_frame)
+    if strength > 0:
+        # 3. DISPARITY TRANSFORM - für bessere Filter-Performance
+        depth_to_disparity = rs.disparity_transform(True)
+        depth_frame = depth_to_disparity.process(depth_frame)
+        
+        # 4. SPATIAL FILTER - reduziert räumliches Rauschen
+        spatial = rs.spatial_filter()
+        spatial.set_option(rs.option.filter_magnitude, 5 if strength >= 2 else 2)  # Stärker filtern
+        spatial.set_option(rs.option.filter_smooth_alpha, 0.6) # Höhere Glättung
+        spatial.set_option(rs.option.filter_smooth_delta, 25)  # Delta erhöht
+        spatial.set_option(rs.option.holes_fill, 3)            # Loch-Füllung
+        depth_frame = spatial.process(depth_frame)
+        
+        # 5. TEMPORAL FILTER - reduziert zeitliches Rauschen (Flackern!)
+        if strength >= 2:
+            temporal = rs.temporal_filter()
+            temporal.set_option(rs.option.filter_smooth_alpha, 0.5)  # Mittelstark
+            temporal.set_option(rs.option.filter_smooth_delta, 25)
+            depth_frame = temporal.process(depth_frame)
+        
+        # 6. ZURÜCK ZU DEPTH
+        disparity_to_depth = rs.disparity_transform(False)
+        depth_frame = disparity_to_depth.process(depth_frame)
     
     # 7. HOLE FILLING - füllt verbleibende Löcher
     hole_filling = rs.hole_filling_filter()
     hole_filling.set_option(rs.option.holes_fill, 1)  # Farthest-from-around
     depth_frame = hole_filling.process(depth_frame)
     
-    # ========================================================================
-    # NUMPY ARRAYS ERSTELLEN
-    # ========================================================================
-    
-    color_image = np.asanyarray(color_frame.get_data())
-    depth_image = np.asanyarray(depth_frame.get_data())
-    
-    # Linken Rand korrigieren (falls nötig)
-    if depth_image.shape[1] > 60:
-        depth_image[:, :60] = 0
-    
-    # ZUSÄTZLICHE POST-PROCESSING (optional - für noch bessere Qualität)
-    
-    # Median-Filter auf Depth (entfernt Salz-Pfeffer-Rauschen)
-    depth_image = cv2.medianBlur(depth_image.astype(np.uint16), 5)
-    
-    # Bilateral Filter auf Color (behält Kanten, glättet Flächen)
-    color_image = cv2.bilateralFilter(
-        color_image, d=5, sigmaColor=50, sigmaSpace=50)
-    
-    return {
-        "color": color_image, 
-        "depth": depth_image
-    }
+    return color_frame, depth_frame
@@ -1,38 +1,175 @@
 import numpy as np
 import cv2
 from templates.base_camera_manager import BaseCameraManager
+from DataCalculation.tableGeometry import DepthIntrinsics
+
+KINECT_COLOR_SHAPE = (1080, 1920)
+KINECT_DEPTH_SHAPE = (424, 512)
+
+# ============================================================================
+# Registrierung Farbe -> Tiefenraster
+# ============================================================================
+#
+# Die Kinect liefert 1920x1080 Farbe neben 512x424 Tiefe, die Pixel liegen
+# nicht übereinander. Für ein Tiefenpixel (u, v) mit Tiefe z gilt (Kameras
+# nebeneinander, Versatz tx entlang x):
+#     color_x = fx_c * (x_n + tx / z) + cx_c  =  A(u, v) + fx_c * tx / z
+#     color_y = fy_c * y_n + cy_c             =  C(u, v)
+# (x_n, y_n) sind die entzerrten, normierten Koordinaten des Tiefenpixels.
+# A und C hängen nur von den Intrinsics ab und werden einmal berechnet.
+# Pro Frame bleibt eine Division, eine Addition und ein cv2.remap auf
+# 512x424 - alle weiteren Stufen arbeiten dann auf der kleinen Auflösung.
+
+
+class KinectIntrinsics:
+    """
+    Kameraparameter der Kinect v2. Die Standardwerte sind typische Werte
+    ab Werk; Tiefen-Intrinsics werden beim Start vom Gerät übernommen,
+    wenn der Coordinate Mapper sie liefert.
+    """
+
+    def __init__(self, depth_focal=(365.5, 365.5), depth_center=(254.9, 205.4),
+                 depth_distortion=(0.09, -0.27, 0.09),
+                 color_focal=(1081.37, 1081.37), color_center=(959.5, 539.5),
+                 baseline=0.052):
+        self.depth_focal = depth_focal
+        self.depth_center = depth_center
+        self.depth_distortion = depth_distortion  # k1, k2, k3
+        self.color_focal = color_focal
+        self.color_center = color_center
+        self.baseline = baseline  # Meter, Versatz Farbkamera zu Tiefenkamera entlang x
+
+
+class ColorToDepthRegistration:
+    """Bildet Farbbilder per vorberechneter Lookup-Tabelle auf das Tiefenraster ab"""
+
+    def __init__(self, intrinsics, depth_shape=KINECT_DEPTH_SHAPE):
+        self.intrinsics = intrinsics
+        self.depth_shape = depth_shape
+        height, width = depth_shape
+
+        # Entzerrte, normierte Koordinaten aller Tiefenpixel (einmalig)
+        fx_d, fy_d = intrinsics.depth_focal
+        cx_d, cy_d = intrinsics.depth_center
+        k1, k2, k3 = intrinsics.depth_distortion
+        camera_matrix = np.array([[fx_d, 0, cx_d], [0, fy_d, cy_d], [0, 0, 1]], dtype=np.float64)
+        distortion = np.array([k1, k2, 0, 0, k3], dtype=np.float64)
+        u, v = np.meshgrid(np.arange(width, dtype=np.float32), np.arange(height, dtype=np.float32))
+        pixels = np.stack([u.ravel(), v.ravel()], axis=-1).reshape(-1, 1, 2)
+        normalized = cv2.undistortPoints(pixels, camera_matrix, distortion).reshape(height, width, 2)
+
+        fx_c, fy_c = intrinsics.color_focal
+        cx_c, cy_c = intrinsics.color_center
+        self._base_x = (normalized[..., 0] * fx_c + cx_c).astype(np.float32)
+        self.map_y = (normalized[..., 1] * fy_c + cy_c).astype(np.float32)
+        # fx_c * tx in Pixel * Millimeter (Tiefe kommt in mm)
+        self._parallax = float(fx_c * intrinsics.baseline * 1000.0)
+
+        # Puffer pro Frame (einmal alloziert)
+        self.map_x = np.zeros(depth_shape, dtype=np.float32)
+        self._depth_float = np.zeros(depth_shape, dtype=np.float32)
+        self._invalid = np.zeros(depth_shape, dtype=np.uint8)
+        self._registered = np.zeros(depth_shape + (4,), dtype=np.uint8)
+
+    def update_maps(self, depth_image):
+        """Pro-Frame-Anteil der Tabelle: map_x = A + fx_c * tx / z"""
+        np.copyto(self._depth_float, depth_image, casting="unsafe")
+        cv2.divide(self._parallax, self._depth_float, dst=self.map_x)  # z = 0 -> 0
+        cv2.add(self.map_x, self._base_x, dst=self.map_x)
+        # Pixel ohne Tiefe nach außen legen -> schwarz
+        cv2.compare(depth_image, 0, cv2.CMP_EQ, dst=self._invalid)
+        self.map_x[self._invalid > 0] = -1.0
+
+    def register(self, color_bgra, depth_image, dst):
+        """Farbbild (BGRA, volle Auflösung) -> BGR auf dem Tiefenraster in dst"""
+        self.update_maps(depth_image)
+        cv2.remap(color_bgra, self.map_x, self.map_y, cv2.INTER_LINEAR,
+                  dst=self._registered, borderMode=cv2.BORDER_CONSTANT)
+        cv2.cvtColor(self._registered, cv2.COLOR_BGRA2BGR, dst=dst)
+        return dst
+
 
 class KinectCameraManager(BaseCameraManager):
     """Manager für Microsoft Kinect Kamera (Kinect v2) geht nur mit Python 3.8"""
-    
-    def __init__(self):
+
+    def __init__(self, register_color=True, intrinsics=None):
         super().__init__()
         self.kinect = None
-    
+        # register_color: Farbe auf das 512x424-Tiefenraster abbilden
+        self.register_color = register_color
+        self.intrinsics = intrinsics
+        self.registration = None
+
     def start(self):
         from pykinect2 import PyKinectRuntime, PyKinectV2
         self.kinect = PyKinectRuntime.PyKinectRuntime(PyKinectV2.FrameSourceTypes_Color | PyKinectV2.FrameSourceTypes_Depth)
+        if self.intrinsics is None:
+            self.intrinsics = self._device_intrinsics()
+        if self.register_color:
+            self.registration = ColorToDepthRegistration(self.intrinsics)
+        k1, k2, k3 = self.intrinsics.depth_distortion
+        self.depth_intrinsics = DepthIntrinsics(KINECT_DEPTH_SHAPE[1], KINECT_DEPTH_SHAPE[0],
+                                                *self.intrinsics.depth_focal,
+                                                *self.intrinsics.depth_center, (k1, k2, 0, 0, k3))
         print("Microsoft Kinect erfolgreich initialisiert")
-    
+
+    def _device_intrinsics(self):
+        """Tiefen-Intrinsics vom Gerät, falls verfügbar (sonst Standardwerte)"""
+        intrinsics = KinectIntrinsics()
+        try:
+            device = self.kinect._mapper.GetDepthCameraIntrinsics()
+            if device.FocalLengthX > 0:
+                intrinsics.depth_focal = (device.FocalLengthX, device.FocalLengthY)
+                intrinsics.depth_center = (device.PrincipalPointX, device.PrincipalPointY)
+                intrinsics.depth_distortion = (device.RadialDistortionSecondOrder,
+                                               device.RadialDistortionFourthOrder,
+                                               device.RadialDistortionSixthOrder)
+        except Exception as e:
+            print(f"Kinect-Intrinsics nicht verfügbar, nutze Standardwerte: {e}")
+        return intrinsics
+
     def read_frame(self):
         if self.kinect.has_new_color_frame() and self.kinect.has_new_depth_frame():
             color_frame = self.kinect.get_last_color_frame()
             depth_frame = self.kinect.get_last_depth_frame()
-            
-            # Color Frame in ein numpy Array umwandeln (BGRA 1920x1080)
-            color_image = color_frame.reshape((1080, 1920, 4)).astype(np.uint8)
-            # In BGR konvertieren für OpenCV (falls gewünscht)
-            color_image = cv2.cvtColor(color_image, cv2.COLOR_BGRA2BGR)
-            
+
             # Depth Frame (512x424) in numpy Array
-            depth_image = depth_frame.reshape((424, 512)).astype(np.uint16)
-            
+            depth_image = depth_frame.reshape(KINECT_DEPTH_SHAPE).astype(np.uint16)
+
+            # Color Frame in ein numpy Array umwandeln (BGRA 1920x1080)
+            color_bgra = color_frame.reshape(KINECT_COLOR_SHAPE + (4,)).astype(np.uint8)
+            if self.registration is not None:
+                color_image = np.empty(KINECT_DEPTH_SHAPE + (3,), dtype=np.uint8)
+                self.registration.register(color_bgra, depth_image, color_image)
+            else:
+                # In BGR konvertieren für OpenCV (falls gewünscht)
+                color_image = cv2.cvtColor(color_bgra, cv2.COLOR_BGRA2BGR)
+
             return {
                 "color": color_image,
                 "depth": depth_image
             }
         return None
-    
+
+    def read_frame_into(self, slot, timeout=None):
+        if self.kinect.has_new_color_frame() and self.kinect.has_new_depth_frame():
+            color_frame = self.kinect.get_last_color_frame()
+            depth_frame = self.kinect.get_last_depth_frame()
+
+            depth = slot.buffer("depth", KINECT_DEPTH_SHAPE, np.uint16)
+            np.copyto(depth, depth_frame.reshape(KINECT_DEPTH_SHAPE))
+
+            # Kinect liefert bereits uint8/uint16 - reshape ist nur eine View
+            color_bgra = color_frame.reshape(KINECT_COLOR_SHAPE + (4,))
+            if self.registration is not None:
+                color = slot.buffer("color", KINECT_DEPTH_SHAPE + (3,), np.uint8)
+                self.registration.register(color_bgra, depth, color)
+            else:
+                color = slot.buffer("color", KINECT_COLOR_SHAPE + (3,), np.uint8)
+                cv2.cvtColor(color_bgra, cv2.COLOR_BGRA2BGR, dst=color)
+            return True
+        return False
+
     def stop(self):
         if self.kinect:
             self.kinect.close()
@@ -22,6 +22,14 @@ class LaptopCameraManager(BaseCameraManager):
                 "depth": None  # Laptop-Kamera hat keine Tiefendaten
             }
         return None
+
+    def read_frame_into(self, slot, timeout=None):
+        # VideoCapture.read schreibt direkt in den übergebenen Puffer,
+        # solange Größe und Typ passen (sonst wird neu alloziert)
+        success, frame = self.camera.read(slot.buffers.get("color"))
+        if success:
+            slot.adopt("color", frame)
+        return success
     
     def stop(self):
         if self.camera:
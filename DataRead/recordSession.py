@@ -0,0 +1,326 @@
+import json
+import mmap
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+import cv2
+from templates.base_camera_manager import BaseCameraManager
+from DataCalculation.tableGeometry import DepthIntrinsics
+
+# ============================================================================
+# Session-Aufzeichnung (Tiefe + Farbe)
+# ============================================================================
+#
+# Aufbau eines Session-Ordners:
+#   meta.json        - Kamera-Infos (depth_scale, Farbformat, ...)
+#   index.bin        - feste Datensätze (INDEX_DTYPE), einer pro Frame
+#   chunk_00000.bin  - aneinandergehängte, kodierte Bilder
+#   chunk_00001.bin  - ... (neuer Chunk ab CHUNK_BYTES)
+#
+# Tiefe wird als 16-Bit-PNG gespeichert (verlustfrei), Farbe als JPEG oder
+# roh. Durch die festen Index-Datensätze ist Frame i ein einziger Seek bzw.
+# ein Zugriff auf das gemappte index.bin.
+
+INDEX_DTYPE = np.dtype([
+    ("seq", "<i8"),
+    ("timestamp", "<f8"),
+    ("depth_scale", "<f4"),
+    ("chunk", "<u4"),
+    ("depth_offset", "<u8"),
+    ("depth_size", "<u4"),
+    ("color_offset", "<u8"),
+    ("color_size", "<u4"),
+    ("depth_height", "<u2"),
+    ("depth_width", "<u2"),
+    ("color_height", "<u2"),
+    ("color_width", "<u2"),
+])
+
+CHUNK_BYTES = 256 * 1024 * 1024
+COLOR_FORMATS = ("jpeg", "raw")
+
+
+def _chunk_path(path, chunk):
+    return os.path.join(path, f"chunk_{chunk:05d}.bin")
+
+
+class SessionRecorder:
+    """
+    Schreibt Frames im Hintergrund in einen Session-Ordner.
+
+    record() kopiert nur die Arrays und stellt sie in eine Queue, Kodierung
+    und Schreiben laufen im Writer-Thread. Ist die Queue voll, wird das
+    Frame verworfen und gezählt, statt die Aufnahme-Schleife zu blockieren.
+    """
+
+    def __init__(self, path, camera, color_format="jpeg", jpeg_quality=95,
+                 queue_size=120, chunk_bytes=CHUNK_BYTES):
+        if color_format not in COLOR_FORMATS:
+            raise ValueError(f"Unbekanntes Farbformat: {color_format}")
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.camera = camera
+        self.color_format = color_format
+        self.jpeg_quality = jpeg_quality
+        self.chunk_bytes = chunk_bytes
+        self.frames_written = 0
+        self.frames_dropped = 0
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._seq = 0
+        self._chunk = 0
+        self._chunk_file = None
+        self._index_file = None
+        self._thread = None
+
+    def start(self):
+        meta = {
+            "camera": type(self.camera).__name__,
+            "depth_scale": float(self.camera.depth_scale),
+            "baseline_distance": self.camera.baseline_distance,
+            "depth_intrinsics": (self.camera.depth_intrinsics.to_dict()
+                                 if getattr(self.camera, "depth_intrinsics", None) is not None else None),
+            "color_format": self.color_format,
+            "index_dtype": INDEX_DTYPE.descr,
+            "created": time.time(),
+        }
+        with open(os.path.join(self.path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+
+        self._index_file = open(os.path.join(self.path, "index.bin"), "wb")
+        self._chunk_file = open(_chunk_path(self.path, self._chunk), "wb")
+        self._thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self._thread.start()
+        print(f"[INFO] Aufnahme gestartet: {self.path}")
+
+    def record(self, frame_data):
+        """Nimmt ein Frame in die Schreib-Queue auf (nicht blockierend)"""
+        depth = frame_data.get("depth")
+        color = frame_data.get("color")
+        if depth is None and color is None:
+            return
+        # Kopie, da Frames aus dem Frame-Pool später überschrieben werden
+        item = (
+            self._seq,
+            frame_data.get("timestamp", time.monotonic()),
+            None if depth is None else depth.copy(),
+            None if color is None else color.copy(),
+        )
+        self._seq += 1
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.frames_dropped += 1
+
+    def stop(self):
+        """Schreibt alle noch wartenden Frames und schließt die Dateien"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self._chunk_file.close()
+        self._index_file.close()
+        print(f"[INFO] Aufnahme beendet: {self.frames_written} Frames, "
+              f"{self.frames_dropped} verworfen")
+
+    def _encode(self, depth, color):
+        depth_bytes = b""
+        color_bytes = b""
+        if depth is not None:
+            ok, buffer = cv2.imencode('.png', depth.astype(np.uint16, copy=False),
+                                      [cv2.IMWRITE_PNG_COMPRESSION, 1])
+            if ok:
+                depth_bytes = buffer.tobytes()
+        if color is not None:
+            if self.color_format == "jpeg":
+                ok, buffer = cv2.imencode('.jpg', color,
+                                          [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+                if ok:
+                    color_bytes = buffer.tobytes()
+            else:
+                color_bytes = np.ascontiguousarray(color, dtype=np.uint8).tobytes()
+        return depth_bytes, color_bytes
+
+    def _writer_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            seq, timestamp, depth, color = item
+            try:
+                self._write_frame(seq, timestamp, depth, color)
+            except Exception as e:
+                print(f"[FEHLER] Frame {seq} konnte nicht geschrieben werden: {e}")
+
+    def _write_frame(self, seq, timestamp, depth, color):
+        depth_bytes, color_bytes = self._encode(depth, color)
+
+        if self._chunk_file.tell() + len(depth_bytes) + len(color_bytes) > self.chunk_bytes \
+                and self._chunk_file.tell() > 0:
+            self._chunk_file.close()
+            self._chunk += 1
+            self._chunk_file = open(_chunk_path(self.path, self._chunk), "wb")
+
+        depth_offset = self._chunk_file.tell()
+        self._chunk_file.write(depth_bytes)
+        color_offset = self._chunk_file.tell()
+        self._chunk_file.write(color_bytes)
+
+        record = np.zeros(1, dtype=INDEX_DTYPE)
+        record["seq"] = seq
+        record["timestamp"] = timestamp
+        record["depth_scale"] = self.camera.depth_scale
+        record["chunk"] = self._chunk
+        record["depth_offset"] = depth_offset
+        record["depth_size"] = len(depth_bytes)
+        record["color_offset"] = color_offset
+        record["color_size"] = len(color_bytes)
+        if depth is not None:
+            record["depth_height"], record["depth_width"] = depth.shape[:2]
+        if color is not None:
+            record["color_height"], record["color_width"] = color.shape[:2]
+
+        # Chunk zuerst, dann Index: ein Index-Eintrag zeigt nie auf fehlende Daten
+        self._chunk_file.flush()
+        self._index_file.write(record.tobytes())
+        self._index_file.flush()
+        self.frames_written += 1
+
+
+# ============================================================================
+# Session-Wiedergabe
+# ============================================================================
+
+class SessionReader:
+    """
+    Liest eine aufgezeichnete Session. Index und Chunks werden gemappt,
+    read(i) ist daher ein O(1)-Zugriff ohne sequentielles Lesen.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.depth_scale = self.meta["depth_scale"]
+        self.baseline_distance = self.meta.get("baseline_distance")
+        self.color_format = self.meta["color_format"]
+
+        index_path = os.path.join(path, "index.bin")
+        count = os.path.getsize(index_path) // INDEX_DTYPE.itemsize
+        if count > 0:
+            self.index = np.memmap(index_path, dtype=INDEX_DTYPE, mode="r", shape=(count,))
+        else:
+            self.index = np.zeros(0, dtype=INDEX_DTYPE)
+        self._chunks = {}
+
+    def __len__(self):
+        return len(self.index)
+
+    def close(self):
+        for chunk_file, chunk_map in self._chunks.values():
+            chunk_map.close()
+            chunk_file.close()
+        self._chunks = {}
+
+    def _chunk_view(self, chunk):
+        if chunk not in self._chunks:
+            chunk_file = open(_chunk_path(self.path, chunk), "rb")
+            chunk_map = mmap.mmap(chunk_file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._chunks[chunk] = (chunk_file, chunk_map)
+        return memoryview(self._chunks[chunk][1])
+
+    def read_raw(self, i):
+        """Rohe (kodierte) Bytes von Frame i als memoryviews: (record, depth, color)"""
+        record = self.index[i]
+        view = self._chunk_view(int(record["chunk"]))
+        depth_start = int(record["depth_offset"])
+        color_start = int(record["color_offset"])
+        depth_bytes = view[depth_start:depth_start + int(record["depth_size"])]
+        color_bytes = view[color_start:color_start + int(record["color_size"])]
+        return record, depth_bytes, color_bytes
+
+    def read(self, i):
+        """Dekodiert Frame i im bekannten Dictionary-Format"""
+        record, depth_bytes, color_bytes = self.read_raw(i)
+        depth = None
+        color = None
+        if len(depth_bytes) > 0:
+            depth = cv2.imdecode(np.frombuffer(depth_bytes, np.uint8), cv2.IMREAD_UNCHANGED)
+        if len(color_bytes) > 0:
+            if self.color_format == "jpeg":
+                color = cv2.imdecode(np.frombuffer(color_bytes, np.uint8), cv2.IMREAD_COLOR)
+            else:
+                shape = (int(record["color_height"]), int(record["color_width"]), 3)
+                color = np.frombuffer(color_bytes, np.uint8).reshape(shape).copy()
+        return {
+            "color": color,
+            "depth": depth,
+            "seq": int(record["seq"]),
+            "timestamp": float(record["timestamp"]),
+        }
+
+    def find_frame(self, timestamp):
+        """Index des ersten Frames mit Zeitstempel >= timestamp (binäre Suche)"""
+        return int(np.searchsorted(self.index["timestamp"], timestamp))
+
+
+class RecordedCameraManager(BaseCameraManager):
+    """
+    Spielt eine aufgezeichnete Session wie eine Kamera ab.
+    realtime=True hält die aufgezeichneten Frame-Abstände ein.
+    """
+
+    def __init__(self, path, realtime=True, loop=True):
+        super().__init__()
+        self.path = path
+        self.device_id = f"recording:{path}"
+        self.realtime = realtime
+        self.loop = loop
+        self.reader = None
+        self.position = 0
+        self._last_timestamp = None
+        self._last_wall = None
+
+    def start(self):
+        self.reader = SessionReader(self.path)
+        self.depth_scale = self.reader.depth_scale
+        self.baseline_distance = self.reader.baseline_distance
+        if self.reader.meta.get("depth_intrinsics"):
+            self.depth_intrinsics = DepthIntrinsics.from_dict(self.reader.meta["depth_intrinsics"])
+        self.position = 0
+        print(f"Aufzeichnung geladen: {self.path} ({len(self.reader)} Frames)")
+
+    def read_frame(self):
+        if self.reader is None or len(self.reader) == 0:
+            return None
+        if self.position >= len(self.reader):
+            if not self.loop:
+                return None
+            self.position = 0
+            self._last_timestamp = None
+
+        frame_data = self.reader.read(self.position)
+        self.position += 1
+        self._pace(frame_data["timestamp"])
+        return frame_data
+
+    def _pace(self, timestamp):
+        if not self.realtime:
+            return
+        now = time.monotonic()
+        if self._last_timestamp is not None:
+            delay = (timestamp - self._last_timestamp) - (now - self._last_wall)
+            if delay > 0:
+                time.sleep(min(delay, 1.0))
+        self._last_timestamp = timestamp
+        self._last_wall = time.monotonic()
+
+    def stop(self):
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+        print("Aufzeichnung gestoppt")
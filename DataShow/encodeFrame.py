@@ -0,0 +1,25 @@
+import cv2
+
+# Gemeinsame Ausgabe aller Themen: Bild -> Multipart-Frame für den Stream.
+# Qualität und Ausgabegröße werden vom Qualitätsregler (app.py) gesetzt.
+jpeg_quality = 95    # OpenCV-Standard
+output_scale = 1.0   # < 1.0 verkleinert die Ausgabe vor dem Kodieren
+
+def set_Quality(quality=None, scale=None):
+    global jpeg_quality, output_scale
+    if quality is not None:
+        jpeg_quality = int(quality)
+    if scale is not None:
+        output_scale = float(scale)
+
+def encode_Frame(image, extension='.jpg'):
+    if output_scale != 1.0:
+        height, width = image.shape[:2]
+        size = (max(1, int(width * output_scale)), max(1, int(height * output_scale)))
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+    params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality] if extension == '.jpg' else []
+    ret, buffer = cv2.imencode(extension, image, params)
+    frame = buffer.tobytes() # Bild in Bytes umwandeln
+    beamerOutput = (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+    return ret, beamerOutput
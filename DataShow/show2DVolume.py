@@ -1,5 +1,6 @@
 import cv2
 import numpy as np
+from DataShow import encodeFrame
 
 def show_2D_Volume(calculationOutput,building_mask, road_mask, park_mask):
     if calculationOutput is not None:
@@ -21,7 +22,5 @@ def show_2D_Volume(calculationOutput,building_mask, road_mask, park_mask):
             noise_colormap[park_mask > 0] = (0, 255, 0)
         
         # Konvertiere das Bild in JPEG-Format
-        ret, buffer = cv2.imencode('.jpg', noise_colormap)
-        frame = buffer.tobytes() # Bild in Bytes umwandeln
-        beamerOutput = (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+        ret, beamerOutput = encodeFrame.encode_Frame(noise_colormap)
         return ret, beamerOutput
\ No newline at end of file
@@ -0,0 +1,32 @@
+import cv2
+import numpy as np
+from DataShow import encodeFrame
+
+# Ersatzbild, solange der CaptureSupervisor die Kamera neu verbindet
+
+def show_Camera_Lost(status, output_size=(640, 480)):
+    width, height = output_size
+    output = np.full((height, width, 3), 40, dtype=np.uint8)
+    scale = width / 640.0
+
+    lines = ["Kamera getrennt"]
+    if status.get("last_good_age_s") is not None:
+        lines.append(f"Letztes Bild vor {status['last_good_age_s']:.0f} s")
+    if status.get("next_attempt_s") is not None:
+        lines.append(f"Neuer Versuch in {status['next_attempt_s']:.0f} s")
+    else:
+        lines.append("Verbinde neu ...")
+    if status.get("last_error"):
+        lines.append(status["last_error"][:60])
+
+    y = int(height * 0.4)
+    for i, text in enumerate(lines):
+        font_scale = (1.6 if i == 0 else 0.8) * scale
+        (text_width, text_height), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, 2)
+        cv2.putText(output, text, ((width - text_width) // 2, y), cv2.FONT_HERSHEY_SIMPLEX,
+                    font_scale, (0, 0, 255) if i == 0 else (220, 220, 220), 2)
+        y += text_height + int(24 * scale)
+
+    # Konvertiere das Bild in JPEG-Format
+    ret, beamerOutput = encodeFrame.encode_Frame(output)
+    return ret, beamerOutput
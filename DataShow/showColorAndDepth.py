@@ -1,5 +1,6 @@
 import numpy as np
 import cv2
+from DataShow import encodeFrame
 
 def show_Color_And_Depth(depth_image, color_image):
     if depth_image is not None and color_image is not None:
@@ -9,7 +10,5 @@ def show_Color_And_Depth(depth_image, color_image):
         #images = np.hstack((color_image, depth_colormap))
 
         # Konvertiere das Bild in JPEG-Format
-        ret, buffer = cv2.imencode('.jpg', depth_colormap)
-        frame = buffer.tobytes() # Bild in Bytes umwandeln
-        beamerOutput = (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+        ret, beamerOutput = encodeFrame.encode_Frame(depth_colormap)
         return ret, beamerOutput
\ No newline at end of file
@@ -0,0 +1,27 @@
+import cv2
+import numpy as np
+from DataShow import encodeFrame
+
+FULL_SCALE = 0.02  # Meter Höhenunterschied für volle Farbe
+
+def show_Cut_Fill(height_map, difference, totals=None, output_size=None):
+    if height_map is not None and difference is not None:
+        # Höhenfarben wie im Thema "Höhe" als Hintergrund
+        output = cv2.applyColorMap(height_map, cv2.COLORMAP_DEEPGREEN)
+
+        # Abtrag blau, Auftrag rot (128 = unverändert)
+        scaled = np.clip(difference * (127.0 / FULL_SCALE) + 128.0, 0, 255).astype(np.uint8)
+        heat = cv2.applyColorMap(scaled, cv2.COLORMAP_JET)
+        changed = cv2.compare(difference, 0, cv2.CMP_NE)
+        blended = cv2.addWeighted(output, 0.35, heat, 0.65, 0)
+        cv2.copyTo(blended, changed, output)
+
+        if output_size is not None:
+            output = cv2.resize(output, output_size, interpolation=cv2.INTER_LINEAR)
+        if totals is not None:
+            text = f"Abtrag {totals['cut_cm3']:.0f} cm3  Auftrag {totals['fill_cm3']:.0f} cm3"
+            cv2.putText(output, text, (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 255, 255), 2)
+
+        # Konvertiere das Bild in JPEG-Format
+        ret, beamerOutput = encodeFrame.encode_Frame(output)
+        return ret, beamerOutput
@@ -1,9 +1,7 @@
-import cv2
+from DataShow import encodeFrame
 
 def show_Gray_Picture(calculationOutput):
     if calculationOutput.all() != None:
         # Konvertiere das Bild in JPEG-Format
-        ret, buffer = cv2.imencode('.jpg', calculationOutput)
-        frame = buffer.tobytes() # Bild in Bytes umwandeln
-        beamerOutput = (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+        ret, beamerOutput = encodeFrame.encode_Frame(calculationOutput)
         return beamerOutput
\ No newline at end of file
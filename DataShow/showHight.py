@@ -1,11 +1,10 @@
 import cv2
+from DataShow import encodeFrame
 
 def show_Hights(calculationOutput):
     if calculationOutput is not None:
         # Tiefenbild einfärben
         depth_colormap = cv2.applyColorMap(calculationOutput, cv2.COLORMAP_DEEPGREEN)
         # Konvertiere das Bild in JPEG-Format
-        ret, buffer = cv2.imencode('.jpg', depth_colormap)
-        frame = buffer.tobytes() # Bild in Bytes umwandeln
-        beamerOutput = (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+        ret, beamerOutput = encodeFrame.encode_Frame(depth_colormap)
         return ret, beamerOutput
\ No newline at end of file
@@ -1,5 +1,6 @@
 import numpy as np
 import cv2
+from DataShow import encodeFrame
 
 def show_Objects(building_mask, road_mask, park_mask, color_image):
     # Bildgröße von einer der Masken ableiten
@@ -27,7 +28,5 @@ def show_Objects(building_mask, road_mask, park_mask, color_image):
     # images = np.hstack((output_img, color_rgba))
 
     # Als PNG mit Alphakanal encodieren
-    ret, buffer = cv2.imencode('.png', output_img)
-    frame = buffer.tobytes() # Bild in Bytes umwandeln
-    beamerOutput = (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+    ret, beamerOutput = encodeFrame.encode_Frame(output_img, '.png')
     return ret, beamerOutput
@@ -1,11 +1,12 @@
 import cv2
-from app import current_homography
+from UserControls import calibration
 import numpy as np
+from DataShow import encodeFrame
 
 def show_Colors(calculationOutput):
     if calculationOutput is not None:
-        if current_homography is not None:
-            H = np.array(current_homography, dtype=np.float32)
+        if calibration.current_homography is not None:
+            H = np.array(calibration.current_homography, dtype=np.float32)
             height, width = calculationOutput.shape[:2]
             calculationOutput = cv2.warpPerspective(calculationOutput, H, (width, height))
 
@@ -16,7 +17,5 @@ def show_Colors(calculationOutput):
         print(f"[DEBUG] Bildgröße nach Transformation: {calculationOutput.shape}")
 
         # Konvertiere das Bild in JPEG-Format
-        ret, buffer = cv2.imencode('.jpg', calculationOutput)
-        frame = buffer.tobytes() # Bild in Bytes umwandeln
-        beamerOutput = (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+        ret, beamerOutput = encodeFrame.encode_Frame(calculationOutput)
         return ret, beamerOutput
\ No newline at end of file
@@ -0,0 +1,32 @@
+import cv2
+import numpy as np
+from DataShow import encodeFrame
+
+SHADOW_DARKEN = 0.45               # Helligkeit im Schatten
+VIEWSHED_COLOR = (60, 200, 255)    # BGR, gelb-orange für sichtbare Flächen
+VIEWPOINT_COLOR = (0, 0, 255)
+
+def show_Shadows(height_map, shadow_mask, visible_mask=None, viewpoint=None, output_size=None):
+    if height_map is not None and shadow_mask is not None:
+        # Höhenfarben wie im Thema "Höhe", Schatten abgedunkelt
+        output = cv2.applyColorMap(height_map, cv2.COLORMAP_DEEPGREEN)
+        shadow = cv2.resize(shadow_mask, output.shape[1::-1], interpolation=cv2.INTER_NEAREST)
+        darkened = cv2.convertScaleAbs(output, alpha=SHADOW_DARKEN)
+        cv2.copyTo(darkened, shadow, output)
+
+        # Sichtbare Flächen vom Beobachter aus einfärben
+        if visible_mask is not None:
+            visible = cv2.resize(visible_mask, output.shape[1::-1], interpolation=cv2.INTER_NEAREST)
+            tinted = cv2.addWeighted(output, 0.6, np.full_like(output, VIEWSHED_COLOR), 0.4, 0)
+            cv2.copyTo(tinted, visible, output)
+            if viewpoint is not None:
+                height, width = output.shape[:2]
+                center = (int(viewpoint[0] * (width - 1)), int(viewpoint[1] * (height - 1)))
+                cv2.circle(output, center, 8, VIEWPOINT_COLOR, thickness=-1)
+
+        if output_size is not None:
+            output = cv2.resize(output, output_size, interpolation=cv2.INTER_LINEAR)
+
+        # Konvertiere das Bild in JPEG-Format
+        ret, beamerOutput = encodeFrame.encode_Frame(output)
+        return ret, beamerOutput
@@ -0,0 +1,29 @@
+import cv2
+import numpy as np
+from DataShow import encodeFrame
+
+WATER_COLOR = (255, 140, 20)  # BGR, kräftiges Blau
+_water_layers = {}
+
+def _water_layer(height, width):
+    # Einfarbige Wasserebene, einmal pro Ausgabegröße angelegt
+    if (height, width) not in _water_layers:
+        _water_layers[(height, width)] = np.full((height, width, 3), WATER_COLOR, dtype=np.uint8)
+    return _water_layers[(height, width)]
+
+def show_Water(height_map, water_depth, output_size=None, full_depth=0.01):
+    if height_map is not None and water_depth is not None:
+        # Höhenfarben wie im Thema "Höhe"
+        terrain_colormap = cv2.applyColorMap(height_map, cv2.COLORMAP_DEEPGREEN)
+        if output_size is not None:
+            terrain_colormap = cv2.resize(terrain_colormap, output_size, interpolation=cv2.INTER_LINEAR)
+        height, width = terrain_colormap.shape[:2]
+
+        # Wasser vom Simulationsraster auf Ausgabegröße, Deckkraft nach Wassertiefe
+        water = cv2.resize(water_depth, (width, height), interpolation=cv2.INTER_LINEAR)
+        alpha = cv2.min(cv2.multiply(water, 0.85 / full_depth), 0.85)
+        output = cv2.blendLinear(_water_layer(height, width), terrain_colormap, alpha, 1.0 - alpha)
+
+        # Konvertiere das Bild in JPEG-Format
+        ret, beamerOutput = encodeFrame.encode_Frame(output)
+        return ret, beamerOutput
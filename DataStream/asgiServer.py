@@ -0,0 +1,294 @@
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from DataCalculation.extractObjects import objects_to_json, objects_changed
+from DataCalculation.terrainMesh import MeshDeltaEncoder
+from DataStream.streamHub import StreamHub
+
+# ============================================================================
+# Asynchroner Streaming-Server (ASGI)
+# ============================================================================
+#
+# Läuft neben der Flask-App, z.B. mit:
+#   uvicorn DataStream.asgiServer:asgi_app --port 5001
+#
+# Alle Clients eines Themas teilen sich einen Verarbeitungs-Thread,
+# jeder Client hat nur einen LatestFrameMailbox und eine Coroutine.
+#
+# WebSocket /objects_ws liefert statt Bildern die erkannten Objekte als JSON.
+# Query-Parameter: tolerance=<Pixel> (Polygon-Vereinfachung, Standard 2.0),
+# on_change=1 (nur senden, wenn sich die Objekte sichtbar verändert haben).
+#
+# WebSocket /mesh_ws liefert das vereinfachte Geländenetz als Binärnachrichten
+# (Format in DataCalculation/terrainMesh.py): zuerst das volle Netz, danach
+# nur veränderte Quadtree-Blätter.
+#
+# Mit latency_tracker kommen /latency/clock, /latency/beacon und
+# /latency/stats dazu (wie in der Flask-App), /video_feed?client=<id>
+# ordnet die Versandzeiten einem Browser zu.
+
+OBJECTS_CHANNEL = "objects"
+MESH_CHANNEL = "mesh"
+
+MULTIPART_HEADERS = [
+    (b"content-type", b"multipart/x-mixed-replace; boundary=frame"),
+    (b"cache-control", b"no-cache, no-store"),
+]
+
+
+def create_asgi_app(themes, camera_factory, object_source=None, latency_tracker=None,
+                    mesh_source=None):
+    """
+    Erstellt die ASGI-Anwendung.
+
+    Args:
+        themes: Liste der VideoTheme-Objekte (Index = Themen-Nummer)
+        camera_factory: Funktion ohne Argumente, die einen Kamera-Manager liefert
+        object_source: Objekt mit name/process_func, das pro Frame
+            {"seq": ..., "objects": extract_Objects(...)} liefert
+            (None = kein /objects_ws)
+        latency_tracker: LatencyTracker für die Latenzmessung (None = aus)
+        mesh_source: Objekt mit name/process_func, das pro Frame
+            {"seq": ..., "mesh": TerrainMesh} liefert (None = kein /mesh_ws)
+    """
+    channels = dict(enumerate(themes))
+    if object_source is not None:
+        channels[OBJECTS_CHANNEL] = object_source
+    if mesh_source is not None:
+        channels[MESH_CHANNEL] = mesh_source
+    stream_hub = StreamHub(channels, camera_factory)
+
+    async def asgi_app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            await _lifespan(receive, send)
+            return
+        if scope["type"] == "websocket":
+            if scope["path"].rstrip("/") == "/objects_ws" and object_source is not None:
+                await _stream_objects(stream_hub, scope, receive, send)
+            elif scope["path"].rstrip("/") == "/mesh_ws" and mesh_source is not None:
+                await _stream_mesh(stream_hub, receive, send)
+            else:
+                await receive()
+                await send({"type": "websocket.close", "code": 1008})
+            return
+        if scope["type"] != "http":
+            return
+
+        path = scope["path"].rstrip("/")
+        if path == "/video_feed" or path.startswith("/video_feed/"):
+            theme_index = _theme_index_from_request(scope, path)
+            if theme_index is None or not 0 <= theme_index < len(themes):
+                await _send_json(send, {"error": "Unbekanntes Thema"}, status=404)
+                return
+            query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+            await _stream_theme(stream_hub, theme_index, receive, send,
+                                latency_tracker, query.get("client", [None])[0])
+        elif path == "/stream_stats":
+            await _send_json(send, {"clients": stream_hub.stats(),
+                                    "camera": stream_hub.camera_hub.supervisor.status()})
+        elif path.startswith("/latency/") and latency_tracker is not None:
+            await _latency_endpoint(latency_tracker, path, scope, receive, send)
+        else:
+            await _send_json(send, {"error": "Nicht gefunden"}, status=404)
+
+    asgi_app.stream_hub = stream_hub
+    return asgi_app
+
+
+def _theme_index_from_request(scope, path):
+    """Thema aus /video_feed/<index> oder /video_feed?theme=<index>"""
+    try:
+        if path.startswith("/video_feed/"):
+            return int(path.rsplit("/", 1)[1])
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        return int(query.get("theme", ["0"])[0])
+    except ValueError:
+        return None
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def _send_json(send, data, status=200):
+    body = json.dumps(data).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode("ascii"))],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def _read_body(receive):
+    body = b""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return body
+        body += message.get("body", b"")
+        if not message.get("more_body", False):
+            return body
+
+
+async def _latency_endpoint(latency_tracker, path, scope, receive, send):
+    if path == "/latency/clock":
+        await _send_json(send, latency_tracker.clock())
+    elif path == "/latency/stats":
+        await _send_json(send, latency_tracker.stats())
+    elif path == "/latency/beacon" and scope["method"] == "POST":
+        try:
+            report = json.loads(await _read_body(receive))
+        except ValueError:
+            report = None
+        if not isinstance(report, dict):
+            await _send_json(send, {"error": "JSON-Objekt erwartet"}, status=400)
+            return
+        await _send_json(send, {"matched": latency_tracker.record_beacon(report)})
+    else:
+        await _send_json(send, {"error": "Nicht gefunden"}, status=404)
+
+
+async def _stream_theme(stream_hub, theme_index, receive, send, latency_tracker=None, client_id=None):
+    """
+    Schickt das MJPEG-Multipart eines Themas an einen Client.
+    `await send` wartet, wenn der Client langsam liest - in der Zeit ersetzt
+    der Broadcaster das Frame im Briefkasten, der Client überspringt also
+    Frames statt einen Rückstau aufzubauen.
+    """
+    await send({"type": "http.response.start", "status": 200, "headers": MULTIPART_HEADERS})
+
+    mailbox = stream_hub.subscribe(theme_index, asyncio.get_running_loop())
+    disconnect = asyncio.ensure_future(_wait_for_disconnect(receive))
+    try:
+        while True:
+            next_frame = asyncio.ensure_future(mailbox.get())
+            done, _ = await asyncio.wait({next_frame, disconnect},
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if disconnect in done:
+                next_frame.cancel()
+                break
+            part = next_frame.result()
+            await send({"type": "http.response.body", "body": part, "more_body": True})
+            if latency_tracker is not None:
+                latency_tracker.record_sent(part, client_id)
+    except OSError:
+        # Verbindung während des Sendens abgebrochen
+        pass
+    finally:
+        stream_hub.unsubscribe(theme_index, mailbox)
+        disconnect.cancel()
+
+
+async def _stream_objects(stream_hub, scope, receive, send):
+    """
+    Schickt pro Frame die Objektliste als JSON-Textnachricht:
+    {"seq": ..., "objects": [{class, bbox, area, centroid, polygon, height}, ...]}
+    """
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    try:
+        tolerance = float(query.get("tolerance", ["2.0"])[0])
+    except ValueError:
+        tolerance = 2.0
+    on_change = query.get("on_change", ["0"])[0] in ("1", "true")
+
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+    await send({"type": "websocket.accept"})
+
+    mailbox = stream_hub.subscribe(OBJECTS_CHANNEL, asyncio.get_running_loop())
+    disconnect = asyncio.ensure_future(_wait_for_websocket_close(receive))
+    last_sent = None
+    try:
+        while True:
+            next_objects = asyncio.ensure_future(mailbox.get())
+            done, _ = await asyncio.wait({next_objects, disconnect},
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if disconnect in done:
+                next_objects.cancel()
+                break
+            result = next_objects.result()
+            objects = objects_to_json(result["objects"], tolerance)
+            if on_change and not objects_changed(last_sent, objects, tolerance):
+                continue
+            last_sent = objects
+            await send({"type": "websocket.send",
+                        "text": json.dumps({"seq": result["seq"], "objects": objects},
+                                           separators=(",", ":"))})
+    except OSError:
+        pass
+    finally:
+        stream_hub.unsubscribe(OBJECTS_CHANNEL, mailbox)
+        disconnect.cancel()
+
+
+async def _stream_mesh(stream_hub, receive, send):
+    """Schickt das Geländenetz: erst voll, danach nur geänderte Blätter (bytes)"""
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+    await send({"type": "websocket.accept"})
+
+    mailbox = stream_hub.subscribe(MESH_CHANNEL, asyncio.get_running_loop())
+    disconnect = asyncio.ensure_future(_wait_for_websocket_close(receive))
+    encoder = MeshDeltaEncoder()
+    try:
+        while True:
+            next_mesh = asyncio.ensure_future(mailbox.get())
+            done, _ = await asyncio.wait({next_mesh, disconnect},
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if disconnect in done:
+                next_mesh.cancel()
+                break
+            result = next_mesh.result()
+            data = encoder.encode(result["mesh"], result["seq"])
+            if data is None:
+                continue
+            await send({"type": "websocket.send", "bytes": data})
+    except OSError:
+        pass
+    finally:
+        stream_hub.unsubscribe(MESH_CHANNEL, mailbox)
+        disconnect.cancel()
+
+
+async def _wait_for_websocket_close(receive):
+    while True:
+        message = await receive()
+        if message["type"] == "websocket.disconnect":
+            return
+
+
+def _create_default_app():
+    import app as flask_app
+    return create_asgi_app(
+        flask_app.videoThemes,
+        lambda: flask_app.create_camera_manager(flask_app.ACTIVE_CAMERA),
+        object_source=flask_app.VideoTheme(-1, "Objektliste", "object_list"),
+        latency_tracker=flask_app.latencyTracker,
+        mesh_source=flask_app.VideoTheme(-2, "Geländenetz", "terrain_mesh"))
+
+
+def __getattr__(name):
+    # Die Flask-App (inkl. Kamera-Treiber) erst beim Zugriff durch den
+    # ASGI-Server importieren, damit create_asgi_app auch ohne sie nutzbar ist
+    if name == "asgi_app":
+        globals()["asgi_app"] = _create_default_app()
+        return globals()["asgi_app"]
+    raise AttributeError(name)
@@ -0,0 +1,192 @@
+import threading
+import time
+
+# ============================================================================
+# Überwachung der Kamera-Aufnahme (Hänger, Fehler, Neuverbindung)
+# ============================================================================
+#
+# Der Aufnahme-Thread des CameraHub meldet jedes Lese-Ergebnis hier an:
+# frame_ok(), read_error(e) oder empty_read(). Die Kamera gilt als verloren,
+# wenn seit stall_timeout Sekunden kein gutes Frame kam (Hänger, Kabel ab)
+# oder error_budget Lesefehler in Folge auftraten. Dann wird sie gestoppt
+# und neu gestartet, bei Misserfolg mit exponentiell wachsender Wartezeit
+# (backoff_initial, verdoppelt bis backoff_max) - kein Fehler-Dauerfeuer auf
+# Kern und Konsole. Gemeldet wird nur der erste Fehler einer Serie und jeder
+# Verbindungsversuch.
+#
+# lost ergibt sich allein aus der Zeit seit dem letzten guten Frame; so
+# sehen Streams und /camera/health den Ausfall auch dann, wenn der Treiber
+# im Lesen blockiert. Neu verbinden kann erst der Aufnahme-Thread, sobald
+# der Treiber zurückkehrt; blockierende Treiber (D415) bekommen dafür die
+# Wartezeit von wait_for_frame mit und melden danach ein leeres Lesen.
+
+
+class Backoff:
+    """Wartezeiten initial, 2*initial, 4*initial, ... bis maximum"""
+
+    def __init__(self, initial=0.5, maximum=30.0, factor=2.0):
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.failures = 0
+
+    def next(self):
+        delay = min(self.maximum, self.initial * self.factor ** self.failures)
+        self.failures += 1
+        return delay
+
+    def reset(self):
+        self.failures = 0
+
+
+class CaptureSupervisor:
+    """Fehlerzähler und Zustand einer Kamera (ok, lost, reconnecting, stopped)"""
+
+    def __init__(self, stall_timeout=3.0, error_budget=10, backoff_initial=0.5, backoff_max=30.0):
+        self.stall_timeout = stall_timeout
+        self.error_budget = error_budget
+        self.backoff = Backoff(backoff_initial, backoff_max)
+        self.state = "stopped"
+        self.frames = 0
+        self.read_errors = 0
+        self.empty_reads = 0
+        self.stalls = 0
+        self.reconnects = 0
+        self.reconnect_failures = 0
+        self.consecutive_errors = 0
+        self.last_error = None
+        self.last_good = None       # time.monotonic() des letzten guten Frames
+        self.next_attempt = None    # time.monotonic() des nächsten Verbindungsversuchs
+        self._since = time.monotonic()
+        self._lock = threading.Lock()
+
+    def started(self):
+        with self._lock:
+            self.state = "ok"
+            self._since = time.monotonic()
+            self.consecutive_errors = 0
+
+    def stopped(self):
+        with self._lock:
+            self.state = "stopped"
+            self.next_attempt = None
+
+    def frame_ok(self):
+        now = time.monotonic()
+        with self._lock:
+            if self.state != "ok":
+                if self.state == "reconnecting":
+                    print(f"[INFO] Kamera wieder verbunden ({self.reconnects}. Neuverbindung)")
+                self.state = "ok"
+                self.backoff.reset()
+                self.next_attempt = None
+            self.frames += 1
+            self.consecutive_errors = 0
+            self.last_good = now
+
+    def read_error(self, error):
+        with self._lock:
+            self.read_errors += 1
+            self.consecutive_errors += 1
+            self.last_error = f"{type(error).__name__}: {error}"
+            first = self.consecutive_errors == 1
+        if first:
+            print(f"[FEHLER] Kamera-Lesefehler: {self.last_error}")
+
+    def empty_read(self):
+        with self._lock:
+            self.empty_reads += 1
+
+    def _silence(self, now):
+        """Sekunden ohne gutes Frame (seit Start bzw. Neuverbindung)"""
+        return now - max(self.last_good or self._since, self._since)
+
+    @property
+    def lost(self):
+        """Kamera liefert nicht (verloren, Neuverbindung läuft oder Hänger)"""
+        with self._lock:
+            if self.state in ("lost", "reconnecting"):
+                return True
+            return self.state == "ok" and self._silence(time.monotonic()) > self.stall_timeout
+
+    def should_reconnect(self):
+        """Vom Aufnahme-Thread nach einem leeren oder fehlerhaften Lesen"""
+        with self._lock:
+            if self.consecutive_errors >= self.error_budget:
+                reason = f"{self.consecutive_errors} Lesefehler in Folge"
+            elif self._silence(time.monotonic()) > self.stall_timeout:
+                reason = f"seit {self.stall_timeout:.0f} s kein Frame"
+                self.stalls += 1
+            else:
+                return False
+            if self.state == "ok":
+                print(f"[WARNUNG] Kamera verloren: {reason}")
+            self.state = "lost"
+            return True
+
+    def reconnect(self, camera, wait):
+        """
+        Stoppt und startet den Kamera-Manager neu, bis es klappt.
+        wait(Sekunden) schläft unterbrechbar und gibt False zurück, wenn
+        die Aufnahme beendet werden soll. Rückgabe: True bei Erfolg.
+        """
+        while True:
+            delay = self.backoff.next()
+            with self._lock:
+                self.state = "lost"
+                self.next_attempt = time.monotonic() + delay
+            print(f"[INFO] Neuer Kamera-Versuch in {delay:.1f} s")
+            if not wait(delay):
+                return False
+            try:
+                camera.stop()
+            except Exception as e:
+                print(f"[WARNUNG] Kamera ließ sich nicht stoppen: {e}")
+            try:
+                camera.start()
+            except Exception as e:
+                with self._lock:
+                    self.reconnect_failures += 1
+                    self.last_error = f"{type(e).__name__}: {e}"
+                print(f"[FEHLER] Kamera-Start fehlgeschlagen: {self.last_error}")
+                continue
+            with self._lock:
+                # Bis zum ersten guten Frame zählt die Verbindung noch als offen
+                self.state = "reconnecting"
+                self.reconnects += 1
+                self.consecutive_errors = 0
+                self.next_attempt = None
+                self._since = time.monotonic()
+            return True
+
+    def start_failed(self, error):
+        """Erster Start im CameraHub fehlgeschlagen: Aufnahme-Thread verbindet neu"""
+        with self._lock:
+            self.state = "lost"
+            self.reconnect_failures += 1
+            self.last_error = f"{type(error).__name__}: {error}"
+        print(f"[FEHLER] Kamera-Start fehlgeschlagen: {self.last_error}")
+
+    def status(self):
+        now = time.monotonic()
+        lost = self.lost
+        with self._lock:
+            return {
+                "state": "stalled" if lost and self.state == "ok" else self.state,
+                "lost": lost,
+                "frames": self.frames,
+                "read_errors": self.read_errors,
+                "empty_reads": self.empty_reads,
+                "stalls": self.stalls,
+                "reconnects": self.reconnects,
+                "reconnect_failures": self.reconnect_failures,
+                "consecutive_errors": self.consecutive_errors,
+                "last_error": self.last_error,
+                "last_good_frame": (round(time.time() - (now - self.last_good), 3)
+                                    if self.last_good is not None else None),
+                "last_good_age_s": round(now - self.last_good, 2) if self.last_good is not None else None,
+                "next_attempt_s": (round(max(0.0, self.next_attempt - now), 2)
+                                   if self.next_attempt is not None else None),
+                "stall_timeout_s": self.stall_timeout,
+                "error_budget": self.error_budget,
+            }
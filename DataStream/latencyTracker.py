@@ -0,0 +1,191 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from urllib.parse import quote
+
+import numpy as np
+
+# ===============================================
+# Latenzmessung Kamera -> Projektion
+# ===============================================
+#
+# Jedes Frame trägt ab der Aufnahme "seq" und "timestamp" (time.monotonic()).
+# Die Themen vermerken unter frame_data["latency"][Thema], wann die
+# Analyse fertig war und wann das Bild kodiert war. Beim Versand bekommt
+# jeder Multipart-Teil Kopfzeilen mit Sequenznummer und Aufnahmezeit, der
+# Stream merkt sich, wann der Teil geschrieben war. Der Browser meldet über
+# den Beacon, wann er das Bild angezeigt hat (in Server-Uhrzeit, über
+# /latency/clock abgeglichen). Daraus werden pro Thema und pro Client
+# Perzentile für jede Teilstrecke berechnet.
+
+SEGMENTS = ("capture_to_processed", "processed_to_encoded", "encoded_to_sent",
+            "sent_to_displayed", "capture_to_displayed")
+
+# Abstand zwischen Wanduhr (time.time) und time.monotonic()
+_WALL_OFFSET = time.time() - time.monotonic()
+
+
+def wall_time_ms(monotonic_time):
+    """Monotone Zeit -> Millisekunden seit 1970 (Server-Uhr)"""
+    return (monotonic_time + _WALL_OFFSET) * 1000.0
+
+
+def monotonic_from_wall_ms(wall_ms):
+    return wall_ms / 1000.0 - _WALL_OFFSET
+
+
+class StreamPart(bytes):
+    """Multipart-Teil (bytes) mit den Zeitmarken seines Frames"""
+    theme = None
+    seq = None
+    captured = None
+    processed = None
+    encoded = None
+
+
+def stamp_part(beamer_output, theme_name, frame_data):
+    """
+    Fügt Sequenznummer, Aufnahmezeit, Thema und Länge als Kopfzeilen in den
+    Multipart-Teil ein. Rückgabe: StreamPart (verhält sich wie bytes).
+    """
+    header_end = beamer_output.find(b"\r\n\r\n")
+    if header_end < 0:
+        return beamer_output
+    seq = frame_data.get("seq")
+    captured = frame_data.get("timestamp")
+    processed, encoded = frame_data.get("latency", {}).get(theme_name, (None, None))
+
+    payload_length = len(beamer_output) - header_end - 4 - 2  # ohne abschließendes \r\n
+    headers = [b"Content-Length: %d" % payload_length]
+    if seq is not None:
+        headers.append(b"X-Frame-Seq: %d" % seq)
+    if captured is not None:
+        headers.append(b"X-Capture-Time: %.3f" % wall_time_ms(captured))
+    if theme_name is not None:
+        # Prozent-kodiert, Kopfzeilen sind nur ASCII (Browser: decodeURIComponent)
+        headers.append(b"X-Theme: " + quote(theme_name).encode("ascii"))
+
+    part = StreamPart(beamer_output[:header_end] + b"\r\n" + b"\r\n".join(headers) +
+                      beamer_output[header_end:])
+    part.theme = theme_name
+    part.seq = seq
+    part.captured = captured
+    part.processed = processed
+    part.encoded = encoded
+    return part
+
+
+class _Percentiles:
+    """Gleitendes Fenster pro Teilstrecke"""
+
+    def __init__(self, window):
+        self.samples = {segment: deque(maxlen=window) for segment in SEGMENTS}
+
+    def add(self, segment, seconds):
+        if seconds is not None:
+            self.samples[segment].append(seconds * 1000.0)
+
+    def to_dict(self):
+        result = {}
+        for segment, values in self.samples.items():
+            if not values:
+                continue
+            p50, p90, p99 = np.percentile(np.fromiter(values, dtype=np.float64), (50, 90, 99))
+            result[segment] = {"count": len(values), "p50_ms": round(float(p50), 1),
+                               "p90_ms": round(float(p90), 1), "p99_ms": round(float(p99), 1)}
+        return result
+
+
+def _difference(end, start):
+    if end is None or start is None:
+        return None
+    return end - start
+
+
+class LatencyTracker:
+    """
+    Sammelt die Zeitmarken. record_sent() nach dem Schreiben eines Teils,
+    record_displayed() aus dem Beacon des Browsers.
+
+    window: Anzahl Messwerte pro Teilstrecke für die Perzentile
+    pending: wie viele versendete Frames auf ihren Beacon warten dürfen
+    """
+
+    def __init__(self, window=1000, pending=2048):
+        self.window = window
+        self.max_pending = pending
+        self._themes = {}
+        self._clients = {}
+        self._sent = OrderedDict()  # (Thema, Client, seq) -> (captured, sent)
+        self._lock = threading.Lock()
+
+    def _stats(self, theme, client):
+        theme_stats = self._themes.get(theme)
+        if theme_stats is None:
+            theme_stats = self._themes[theme] = _Percentiles(self.window)
+        client_stats = self._clients.get(client)
+        if client_stats is None:
+            client_stats = self._clients[client] = _Percentiles(self.window)
+        return theme_stats, client_stats
+
+    def record_sent(self, part, client_id, sent=None):
+        """Ein Teil wurde an den Client geschrieben"""
+        if not isinstance(part, StreamPart) or part.seq is None:
+            return
+        client_id = client_id or "anonym"
+        sent = time.monotonic() if sent is None else sent
+        segments = {
+            "capture_to_processed": _difference(part.processed, part.captured),
+            "processed_to_encoded": _difference(part.encoded, part.processed),
+            "encoded_to_sent": _difference(sent, part.encoded),
+        }
+        with self._lock:
+            for stats in self._stats(part.theme, client_id):
+                for segment, seconds in segments.items():
+                    stats.add(segment, seconds)
+            self._sent[(part.theme, client_id, part.seq)] = (part.captured, sent)
+            while len(self._sent) > self.max_pending:
+                self._sent.popitem(last=False)
+
+    def record_displayed(self, theme, client_id, seq, displayed_wall_ms):
+        """Beacon: Frame `seq` wurde zur Server-Zeit displayed_wall_ms angezeigt"""
+        with self._lock:
+            entry = self._sent.pop((theme, client_id, seq), None)
+            if entry is None:
+                return False
+            captured, sent = entry
+            displayed = monotonic_from_wall_ms(displayed_wall_ms)
+            for stats in self._stats(theme, client_id):
+                stats.add("sent_to_displayed", displayed - sent)
+                stats.add("capture_to_displayed", _difference(displayed, captured))
+            return True
+
+    def record_beacon(self, report):
+        """
+        Beacon-Daten des Browsers:
+        {"client": id, "frames": [{"theme": ..., "seq": ..., "displayed": ms}, ...]}
+        Rückgabe: Anzahl zugeordneter Frames.
+        """
+        client_id = report.get("client") or "anonym"
+        matched = 0
+        for frame in report.get("frames", []):
+            try:
+                if self.record_displayed(frame["theme"], client_id, int(frame["seq"]),
+                                         float(frame["displayed"])):
+                    matched += 1
+            except (KeyError, TypeError, ValueError):
+                continue
+        return matched
+
+    def stats(self):
+        with self._lock:
+            return {
+                "themes": {theme: stats.to_dict() for theme, stats in self._themes.items()},
+                "clients": {client: stats.to_dict() for client, stats in self._clients.items()},
+                "waiting_for_beacon": len(self._sent),
+            }
+
+    @staticmethod
+    def clock():
+        """Server-Uhrzeit für den Uhrenabgleich im Browser"""
+        return {"server_ms": time.time() * 1000.0}
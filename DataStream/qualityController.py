@@ -0,0 +1,152 @@
+import collections
+import threading
+import time
+
+# ===============================================
+# Adaptiver Qualitätsregler
+# ===============================================
+#
+# Beobachtet die Verarbeitungszeit pro Frame (gleitender Mittelwert) und
+# vergleicht sie mit dem Budget 1 / target_fps. Reicht das Budget nicht,
+# wird eine Stufe schlechter geschaltet (kleinere Erkennungsauflösung,
+# weniger Iterationen, stärkere JPEG-Kompression, ...). Erst wenn lange
+# genug deutlich Luft ist, geht es wieder eine Stufe zurück.
+#
+# Hysterese: Verschlechtern ab degrade_ratio * Budget, Verbessern erst
+# unter recover_ratio * Budget und nachdem das recover_after Sekunden
+# lang so war. Nach jedem Wechsel wird cooldown Sekunden gewartet, damit
+# der Mittelwert die neue Stufe abbildet.
+#
+# Sehen mehrere Clients dasselbe Thema, rechnet nur der erste die Stufen,
+# die übrigen holen sie aus dem Zwischenspeicher des stageGraph. Ihre
+# Laufzeiten nahe 0 würden den Mittelwert drücken und das Zurückschalten
+# verzögern, deshalb zählt je Frame nur der erste fertige Aufruf.
+
+# Wie viele zuletzt gemeldete Frames timed() sich je Funktion merkt
+RECENT_FRAMES = 32
+
+
+class QualityController:
+    """
+    Parameter:
+    - levels: Liste von Einstellungen (Dictionaries), Stufe 0 = beste Qualität
+    - apply_level: Funktion(settings), die eine Stufe auf die Module anwendet
+    - target_fps: angestrebte Bildrate
+    """
+
+    def __init__(self, levels, apply_level, target_fps=15.0, degrade_ratio=1.1,
+                 recover_ratio=0.7, window=20, cooldown=2.0, recover_after=3.0):
+        if not levels:
+            raise ValueError("Mindestens eine Qualitätsstufe nötig")
+        self.levels = levels
+        self.apply_level = apply_level
+        self.target_fps = target_fps
+        self.degrade_ratio = degrade_ratio
+        self.recover_ratio = recover_ratio
+        self.alpha = 2.0 / (window + 1)
+        self.cooldown = cooldown
+        self.recover_after = recover_after
+
+        self.level = 0
+        self.auto = True
+        self.frame_time = None      # gleitender Mittelwert in Sekunden
+        self.frames = 0
+        self.changes = 0
+        self._last_change = time.monotonic()
+        self._headroom_since = None
+        self._lock = threading.Lock()
+        self.apply_level(self.levels[0])
+
+    @property
+    def budget(self):
+        return 1.0 / self.target_fps
+
+    def record_frame(self, seconds):
+        """Meldet die Verarbeitungszeit eines Frames"""
+        with self._lock:
+            self.frames += 1
+            if self.frame_time is None:
+                self.frame_time = seconds
+            else:
+                self.frame_time += self.alpha * (seconds - self.frame_time)
+            if not self.auto:
+                return
+
+            now = time.monotonic()
+            if now - self._last_change < self.cooldown:
+                return
+
+            if self.frame_time > self.budget * self.degrade_ratio:
+                self._headroom_since = None
+                if self.level < len(self.levels) - 1:
+                    self._set_level(self.level + 1, now)
+            elif self.frame_time < self.budget * self.recover_ratio:
+                if self._headroom_since is None:
+                    self._headroom_since = now
+                elif now - self._headroom_since >= self.recover_after and self.level > 0:
+                    self._set_level(self.level - 1, now)
+            else:
+                self._headroom_since = None
+
+    def _set_level(self, level, now=None):
+        self.level = level
+        self.changes += 1
+        self._last_change = time.monotonic() if now is None else now
+        self._headroom_since = None
+        self.apply_level(self.levels[level])
+        print(f"Qualitätsstufe {level}: {self.levels[level]}")
+
+    def timed(self, func, frame_key=None):
+        """
+        Verpackt eine Verarbeitungsfunktion so, dass jede Laufzeit gemeldet wird.
+        frame_key(*args, **kwargs): optionale Kennung des Frames, dann wird
+        je Frame nur die erste Laufzeit gemeldet
+        """
+        recent = collections.deque(maxlen=RECENT_FRAMES)
+        recent_lock = threading.Lock()
+
+        def first_report(args, kwargs):
+            key = frame_key(*args, **kwargs)
+            with recent_lock:
+                if key in recent:
+                    return False
+                recent.append(key)
+                return True
+
+        def run_timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                if frame_key is None or first_report(args, kwargs):
+                    self.record_frame(seconds)
+        run_timed.__name__ = getattr(func, "__name__", "run_timed")
+        return run_timed
+
+    def set_target_fps(self, fps):
+        with self._lock:
+            self.target_fps = max(0.1, float(fps))
+
+    def set_level(self, level=None):
+        """Stufe fest einstellen (Automatik aus) oder mit None zurück zur Automatik"""
+        with self._lock:
+            if level is None:
+                self.auto = True
+                return
+            self.auto = False
+            self._set_level(max(0, min(int(level), len(self.levels) - 1)))
+
+    def status(self):
+        with self._lock:
+            return {
+                "level": self.level,
+                "num_levels": len(self.levels),
+                "settings": self.levels[self.level],
+                "auto": self.auto,
+                "target_fps": self.target_fps,
+                "frame_ms": round(self.frame_time * 1000, 2) if self.frame_time is not None else None,
+                "budget_ms": round(self.budget * 1000, 2),
+                "frames": self.frames,
+                "changes": self.changes,
+            }
@@ -0,0 +1,102 @@
+import threading
+import time
+
+# ===============================================
+# Steuerkanal für laufende Streams
+# ===============================================
+#
+# Ein Themenwechsel soll den laufenden Stream nicht beenden (neuer
+# /video_feed = Kamera neu öffnen, bei der RealSense Sekunden schwarzer
+# Beamer). Jeder Stream meldet stattdessen ein StreamControl an. Die Routen
+# legen dort das neue Thema ab, der Stream-Thread übernimmt es vor dem
+# nächsten Frame. Die Zuordnung läuft über die Client-Id aus
+# /video_feed?client=<id>.
+
+
+class StreamControl:
+    """Aktuelles und angefordertes Thema eines laufenden Streams"""
+
+    def __init__(self, theme, client_id=None):
+        self.client_id = client_id
+        self.theme = theme
+        self.started = time.monotonic()
+        self.switches = 0
+        self.last_switch = None
+        # Verarbeitungsfehler (vom Stream-Thread gezählt)
+        self.errors = 0
+        self.last_error = None
+        self._pending = None
+        self._requested_at = None
+        self._lock = threading.Lock()
+
+    def request(self, theme):
+        """Neues Thema anfordern, gilt ab dem nächsten Frame"""
+        with self._lock:
+            self._pending = theme
+            self._requested_at = time.monotonic()
+
+    @property
+    def target(self):
+        """Thema nach dem nächsten Frame (angefordert oder aktuell)"""
+        with self._lock:
+            return self._pending if self._pending is not None else self.theme
+
+    def take(self):
+        """Vom Stream-Thread vor jedem Frame: angefordertes Thema oder None"""
+        with self._lock:
+            theme, self._pending = self._pending, None
+            if theme is None:
+                return None
+            self.theme = theme
+            self.switches += 1
+            self.last_switch = time.monotonic() - self._requested_at
+            return theme
+
+    def status(self):
+        with self._lock:
+            return {
+                "client": self.client_id,
+                "theme": self.theme.name,
+                "pending": self._pending.name if self._pending is not None else None,
+                "switches": self.switches,
+                "last_switch_ms": round(self.last_switch * 1000, 1) if self.last_switch is not None else None,
+                "errors": self.errors,
+                "last_error": self.last_error,
+                "uptime_s": round(time.monotonic() - self.started, 1),
+            }
+
+
+class StreamControls:
+    """Alle laufenden Streams, nach Client-Id"""
+
+    def __init__(self):
+        self._controls = []
+        self._lock = threading.Lock()
+
+    def register(self, theme, client_id=None):
+        control = StreamControl(theme, client_id)
+        with self._lock:
+            self._controls.append(control)
+        return control
+
+    def unregister(self, control):
+        with self._lock:
+            if control in self._controls:
+                self._controls.remove(control)
+
+    def find(self, client_id=None):
+        """Streams eines Clients, ohne client_id alle laufenden Streams"""
+        with self._lock:
+            if client_id is None:
+                return list(self._controls)
+            return [control for control in self._controls if control.client_id == client_id]
+
+    def request(self, theme, client_id=None):
+        """Thema für die Streams eines Clients (bzw. alle) anfordern, Rückgabe: Anzahl"""
+        controls = self.find(client_id)
+        for control in controls:
+            control.request(theme)
+        return len(controls)
+
+    def status(self):
+        return [control.status() for control in self.find()]
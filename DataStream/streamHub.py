@@ -0,0 +1,308 @@
+import asyncio
+import threading
+
+from DataStream.captureSupervisor import CaptureSupervisor
+from DataStream.latencyTracker import stamp_part
+
+# ============================================================================
+# Gemeinsame Kamera + Verteilung an viele Clients
+# ============================================================================
+#
+# CameraHub      - ein Aufnahme-Thread pro Kamera, hält das neueste Frame
+#                  (auch für die Flask-Streams in app.py)
+# ThemeBroadcaster - ein Verarbeitungs-Thread pro aktivem Thema
+# LatestFrameMailbox - ein Platz pro Client, neuestes Frame gewinnt
+#
+# Langsame Clients überspringen dadurch Frames, statt Latenz aufzubauen,
+# und pro Client wird kein eigener Thread benötigt.
+
+
+class LatestFrameMailbox:
+    """
+    Briefkasten mit genau einem Platz für einen asyncio-Client.
+    put() darf aus beliebigen Threads aufgerufen werden, ein noch nicht
+    abgeholtes Frame wird dabei ersetzt (und als verworfen gezählt).
+    """
+
+    def __init__(self, loop):
+        self._loop = loop
+        self._item = None
+        self._event = asyncio.Event()
+        self.delivered = 0
+        self.dropped = 0
+
+    def put(self, item):
+        try:
+            self._loop.call_soon_threadsafe(self._deliver, item)
+        except RuntimeError:
+            # Event-Loop bereits geschlossen, Client ist weg
+            pass
+
+    def _deliver(self, item):
+        if self._item is not None:
+            self.dropped += 1
+        self._item = item
+        self._event.set()
+
+    async def get(self):
+        await self._event.wait()
+        self._event.clear()
+        item, self._item = self._item, None
+        self.delivered += 1
+        return item
+
+
+class CameraHub:
+    """
+    Besitzt genau einen Kamera-Manager und liest ihn in einem eigenen
+    Thread aus. Mehrere Verbraucher warten mit wait_for_newer() auf das
+    jeweils neueste Frame. Die Kamera läuft nur, solange sie benutzt wird;
+    mit linger > 0 bleibt sie nach dem letzten Verbraucher noch so viele
+    Sekunden offen (z.B. für ein Neuladen der Seite).
+
+    Der CaptureSupervisor (supervisor) erkennt Hänger und Fehlerserien und
+    startet denselben Kamera-Manager mit Backoff neu; die Verbraucher
+    behalten ihre Referenz und bekommen danach einfach wieder Frames.
+    """
+
+    def __init__(self, camera_factory, linger=0.0, supervisor=None):
+        self._camera_factory = camera_factory
+        self.linger = linger
+        self.supervisor = supervisor or CaptureSupervisor()
+        self._stop_timer = None
+        self.camera = None
+        self._users = 0
+        self._latest = None
+        self._condition = threading.Condition()
+        self._lifecycle_lock = threading.Lock()
+        self._running = False
+        self._thread = None
+
+    def acquire(self):
+        """Meldet einen Verbraucher an und startet die Kamera bei Bedarf"""
+        with self._lifecycle_lock:
+            self._users += 1
+            if self._stop_timer is not None:
+                self._stop_timer.cancel()
+                self._stop_timer = None
+            if self.camera is not None:
+                return self.camera
+            try:
+                self.camera = self._camera_factory()
+            except Exception:
+                self._users -= 1
+                raise
+            try:
+                self.camera.start()
+                self.supervisor.started()
+            except Exception as e:
+                # Gerät (noch) nicht da: der Aufnahme-Thread verbindet mit Backoff
+                self.supervisor.start_failed(e)
+            self._running = True
+            self._thread = threading.Thread(target=self._capture_loop, daemon=True)
+            self._thread.start()
+            return self.camera
+
+    def release(self):
+        """Meldet einen Verbraucher ab und stoppt die Kamera beim letzten"""
+        with self._lifecycle_lock:
+            self._users -= 1
+            if self._users > 0:
+                return
+            if self.linger > 0:
+                timer = threading.Timer(self.linger, lambda: self._stop_if_unused(timer))
+                timer.daemon = True
+                self._stop_timer = timer
+                timer.start()
+                return
+            self._stop()
+
+    def _stop_if_unused(self, timer):
+        with self._lifecycle_lock:
+            # Ein inzwischen abgebrochener Timer stoppt nichts mehr
+            if self._stop_timer is timer and self._users == 0:
+                self._stop_timer = None
+                self._stop()
+
+    def _stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        self._thread.join()
+        self._thread = None
+        with self._condition:
+            self._set_latest(None)
+        try:
+            self.camera.stop()
+        except Exception as e:
+            print(f"Fehler beim Stoppen der Kamera: {e}")
+        self.camera = None
+        self.supervisor.stopped()
+
+    def _set_latest(self, frame_data):
+        # Der Hub hält selbst eine Reservierung auf dem neuesten Frame
+        if self._latest is not None:
+            self.camera.frame_pool.release(self._latest)
+        if frame_data is not None:
+            self.camera.frame_pool.lease(frame_data)
+        self._latest = frame_data
+
+    def _wait(self, seconds):
+        """Schläft unterbrechbar durch _stop(), Rückgabe: Aufnahme läuft noch"""
+        with self._condition:
+            self._condition.wait_for(lambda: not self._running, seconds)
+            return self._running
+
+    def _capture_loop(self):
+        supervisor = self.supervisor
+        if supervisor.state == "lost":
+            supervisor.reconnect(self.camera, self._wait)
+        while self._running:
+            try:
+                frame_data = self.camera.wait_for_frame(timeout=0.5)
+            except Exception as e:
+                supervisor.read_error(e)
+                if supervisor.should_reconnect():
+                    supervisor.reconnect(self.camera, self._wait)
+                else:
+                    # Kurze Pause, damit ein Dauerfehler keinen Kern auslastet
+                    self._wait(0.1)
+                continue
+            if frame_data is None:
+                supervisor.empty_read()
+                if supervisor.should_reconnect():
+                    supervisor.reconnect(self.camera, self._wait)
+                continue
+            supervisor.frame_ok()
+            with self._condition:
+                self._set_latest(frame_data)
+                self._condition.notify_all()
+
+    def wait_for_newer(self, last_seq, timeout=1.0):
+        """
+        Wartet auf ein Frame mit Sequenznummer > last_seq.
+        Das Frame ist reserviert und muss mit done() freigegeben werden.
+        Rückgabe None bei Timeout oder gestoppter Kamera.
+        """
+        with self._condition:
+            ok = self._condition.wait_for(
+                lambda: not self._running or
+                (self._latest is not None and self._latest["seq"] > last_seq),
+                timeout)
+            if not ok or not self._running:
+                return None
+            self.camera.frame_pool.lease(self._latest)
+            return self._latest
+
+    def done(self, frame_data):
+        """Gibt ein mit wait_for_newer() erhaltenes Frame wieder frei"""
+        with self._condition:
+            self.camera.frame_pool.release(frame_data)
+
+
+class ThemeBroadcaster:
+    """
+    Verarbeitet die Frames des CameraHub mit der process_func eines Themas
+    (einmal pro Frame, egal wie viele Clients) und verteilt das Ergebnis an
+    alle angemeldeten Briefkästen.
+    """
+
+    def __init__(self, theme, camera_hub):
+        self.theme = theme
+        self.camera_hub = camera_hub
+        self._mailboxes = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self, mailbox):
+        with self._lock:
+            self._mailboxes.add(mailbox)
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def unsubscribe(self, mailbox):
+        # Der Thread beendet sich selbst, sobald kein Client mehr da ist
+        with self._lock:
+            self._mailboxes.discard(mailbox)
+
+    @property
+    def client_count(self):
+        with self._lock:
+            return len(self._mailboxes)
+
+    def _run(self):
+        try:
+            camera = self.camera_hub.acquire()
+        except Exception as e:
+            print(f"Kamera konnte nicht gestartet werden: {e}")
+            with self._lock:
+                self._thread = None
+            return
+        last_seq = -1
+        try:
+            while True:
+                with self._lock:
+                    if not self._mailboxes:
+                        self._thread = None
+                        break
+                frame_data = self.camera_hub.wait_for_newer(last_seq)
+                if frame_data is None:
+                    continue
+                last_seq = frame_data["seq"]
+                try:
+                    output = self.theme.process_func(camera, frame_data)
+                    if isinstance(output, bytes):
+                        output = stamp_part(output, self.theme.name, frame_data)
+                except Exception as e:
+                    print(f"Fehler bei Frame-Verarbeitung ({self.theme.name}): {e}")
+                    output = None
+                finally:
+                    self.camera_hub.done(frame_data)
+                if output is None:
+                    continue
+                with self._lock:
+                    mailboxes = list(self._mailboxes)
+                for mailbox in mailboxes:
+                    mailbox.put(output)
+        finally:
+            self.camera_hub.release()
+
+
+class StreamHub:
+    """
+    Verwaltet einen CameraHub und je einen ThemeBroadcaster pro Thema.
+    `themes` ist eine Liste oder ein Dictionary (Schlüssel -> Objekt mit
+    name und process_func), so können auch Nicht-Bild-Kanäle angemeldet werden.
+    """
+
+    def __init__(self, themes, camera_factory):
+        self.themes = themes
+        self.camera_hub = CameraHub(camera_factory)
+        self._broadcasters = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, theme_index, loop):
+        """Meldet einen Client an, Rückgabe: sein LatestFrameMailbox"""
+        mailbox = LatestFrameMailbox(loop)
+        with self._lock:
+            broadcaster = self._broadcasters.get(theme_index)
+            if broadcaster is None:
+                broadcaster = ThemeBroadcaster(self.themes[theme_index], self.camera_hub)
+                self._broadcasters[theme_index] = broadcaster
+        broadcaster.subscribe(mailbox)
+        return mailbox
+
+    def unsubscribe(self, theme_index, mailbox):
+        with self._lock:
+            broadcaster = self._broadcasters.get(theme_index)
+        if broadcaster is not None:
+            broadcaster.unsubscribe(mailbox)
+
+    def stats(self):
+        with self._lock:
+            return {
+                self.themes[index].name: broadcaster.client_count
+                for index, broadcaster in self._broadcasters.items()
+            }
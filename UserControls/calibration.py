@@ -1,6 +1,9 @@
 import cv2
 import numpy as np
 
+# Zuletzt ermittelte Homographie (wird von app.initial_calibration gesetzt)
+current_homography = None
+
 def find_aruco_markers(frame, dictionary=cv2.aruco.DICT_4X4_50):
     # Graustufenbild erzeugen
     gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
@@ -1,12 +1,21 @@
-from flask import Flask, redirect, render_template, Response, session, url_for, jsonify
-
-from DataCalculation import calculate2DVolume, calculateHight, calculateRGB, detectBuildings, grayPicture
-from DataRead import readAsusXtionCamera, readLaptopCamera, readIntelD415Camera
-from DataRead import readKinectCamera
-from DataShow import show2DVolume, showGrayPicture, showHight, showRGB, showObjects, showColorAndDepth
+from flask import Flask, redirect, render_template, request, Response, session, url_for, jsonify
+
+from DataCalculation import calculate2DVolume, detectBuildings, analysisPool
+from DataCalculation import colorClassifier as colorClassifierModule
+from DataCalculation import terrainMesh
+from DataRead import recordSession, layoutLog
+from DataShow import showCameraLost
+from DataShow import encodeFrame
+from DataStream import qualityController as qualityControllerModule
+from DataStream import latencyTracker as latencyTrackerModule
+from DataStream import streamControl, streamHub, captureSupervisor
 from UserControls import calibration
+import processingStages
 import numpy as np
 import cv2
+import os
+import sys
+import time
 
 # Global gespeicherte Homographie
 current_homography = None
@@ -55,6 +64,7 @@ def initial_calibration():
                 H, points = result
                 if H is not None:
                     current_homography = H.tolist()
+                    calibration.current_homography = current_homography
                     print("[SUCCESS] Homographie erfolgreich initialisiert.")
                 else:
                     print("[WARNUNG] Homographie konnte nicht berechnet werden.")
@@ -77,23 +87,146 @@ OPENNI2_INITIALIZED = False
 # Kamera-Konfiguration - HIER ÄNDERN!
 # ============================================================================
 # Wähle die Kamera für ALLE Themen:
-# Optionen: 'laptop', 'asus_xtion', 'intel_d415', 'kinect
+# Optionen: 'laptop', 'asus_xtion', 'intel_d415', 'kinect', 'recording', 'fused', 'synthetic'
 ACTIVE_CAMERA = 'intel_d415'
+
+# Ordner einer aufgezeichneten Session für ACTIVE_CAMERA = 'recording'
+RECORDING_PATH = 'recordings/session'
+
+# Kameras für ACTIVE_CAMERA = 'fused' (großer Tisch mit mehreren Kameras):
+# homography bildet die Farbbild-Pixel jeder Kamera auf das gemeinsame Raster
+# (FUSED_GRID_SIZE, Höhe x Breite) ab, depth_offset gleicht in Metern
+# unterschiedliche Kamerahöhen aus. Für Tests mit Aufnahmen:
+# {"camera": "recording", "path": "recordings/...", "homography": ...}
+FUSED_CAMERAS = [
+    # {"camera": "intel_d415", "serial": "...", "homography": [[1,0,0],[0,1,0],[0,0,1]], "depth_offset": 0.0},
+]
+FUSED_GRID_SIZE = (960, 1280)
+
+# Tiefen-Zweig der Gebäudeerkennung pro Kamera: True = ganzzahlig auf dem
+# uint16-Tiefenbild (Sensor-Einheiten, meist mm), False = float32 in Metern.
+# Kameras, die hier fehlen, rechnen mit float.
+INTEGER_DEPTH = {
+    'intel_d415': False,
+    'asus_xtion': False,
+    'kinect': False,
+    'recording': False,
+    'fused': False,
+    'synthetic': False,
+}
+
+# Straßen- und Park-Masken über die Farb-Lookup-Tabelle statt HSV-Schwellen.
+# Die Tabelle startet mit den HSV-Bereichen aus detectBuildings und kann über
+# /color/sample und /color/rebuild aus Farbproben neu gebaut werden.
+COLOR_CLASSIFIER = False
+
+# Geometrisches Höhenmodell: Intrinsics der Tiefenkamera plus eingemessene
+# Tischebene, Gebäudeerkennung und Höhenfeld rechnen dann mit echter Höhe
+# über dem Tisch statt mit dem Abstand zur Kamera (schräge Kamera!).
+# TABLE_PLANE: (nx, ny, nz, d) aus /height_model/status, None = beim ersten
+# Frame einmessen (Sand vorher glattstreichen), /height_model/fit misst neu.
+# DEPTH_FOV_DEG gilt für Kameras, die keine Intrinsics liefern.
+HEIGHT_MODEL = False
+TABLE_PLANE = None
+DEPTH_FOV_DEG = 58.0
+
+# Anzahl Worker-Prozesse für die Analyse (detect_Buildings, 2D Volumen).
+# 0 = alles im Stream-Thread rechnen
+ANALYSIS_WORKERS = 0
+
+# Ausgabegröße (Breite, Höhe) für Themen, die auf Beamer-Auflösung rendern
+PROJECTOR_SIZE = (1280, 960)
+
+# Breite der Sandkasten-Fläche im Tiefenbild in Metern (für Schatten und
+# Sichtlinien, die echte Längen brauchen)
+TABLE_WIDTH_M = 1.0
+
+# Geländenetz für externe 3D-Viewer (/mesh, /mesh_ws im ASGI-Server):
+# höchstens so viele Eckpunkte, Knoten mit kleinerem Fehler (Meter) werden
+# nicht weiter geteilt, Höhenänderungen unter MESH_CHANGE_TOLERANCE_M lösen
+# kein Delta aus
+MESH_VERTEX_BUDGET = 20000
+MESH_TOLERANCE_M = 0.003
+MESH_CHANGE_TOLERANCE_M = 0.002
+
+# Adaptiver Qualitätsregler: angestrebte Bildrate und Stufen von bester
+# (0) bis schnellster Qualität. Reicht die Zeit pro Frame nicht, wird eine
+# Stufe weiter geschaltet, bei genug Luft wieder zurück.
+TARGET_FPS = 15
+QUALITY_LEVELS = [
+    {"detection_scale": 1.0, "noise_iterations": 20, "jpeg_quality": 95, "output_scale": 1.0, "realsense_filter": 2},
+    {"detection_scale": 1.0, "noise_iterations": 12, "jpeg_quality": 85, "output_scale": 1.0, "realsense_filter": 2},
+    {"detection_scale": 0.75, "noise_iterations": 8, "jpeg_quality": 75, "output_scale": 0.75, "realsense_filter": 1},
+    {"detection_scale": 0.5, "noise_iterations": 5, "jpeg_quality": 65, "output_scale": 0.5, "realsense_filter": 0},
+]
+
+# Layout-Log: Ordner, in dem pro Start ein Log mit den Ereignissen der
+# erkannten Gebäude, Straßen und Parks angelegt wird (None = aus, Start auch
+# über /layout/start). Ausgewertet werden LAYOUT_LOG_FPS Frames pro Sekunde,
+# alle LAYOUT_SNAPSHOT_S Sekunden kommt ein Snapshot zum Springen dazu.
+LAYOUT_LOG_DIR = None
+LAYOUT_LOG_FPS = 2.0
+LAYOUT_SNAPSHOT_S = 300.0
+
+# Wie lange die Kamera nach dem letzten Stream noch offen bleibt (Sekunden),
+# damit ein Neuladen der Seite sie nicht neu startet
+CAMERA_LINGER_S = 10.0
+
+# Überwachung der Kamera: nach CAMERA_STALL_TIMEOUT_S Sekunden ohne Frame
+# oder CAMERA_ERROR_BUDGET Lesefehlern in Folge wird sie neu gestartet,
+# Wartezeit zwischen den Versuchen von CAMERA_BACKOFF_S[0] bis
+# CAMERA_BACKOFF_S[1] Sekunden verdoppelt. Streams zeigen solange ein
+# Ersatzbild, Zähler und letztes gutes Frame unter /camera/health.
+CAMERA_STALL_TIMEOUT_S = 3.0
+CAMERA_ERROR_BUDGET = 10
+CAMERA_BACKOFF_S = (0.5, 30.0)
+
+# Aufnahme-Modus: Ordner, in dem jeder Stream eine neue Session anlegt
+# (None = keine Aufnahme)
+RECORD_SESSION_DIR = None
     
 # ============================================================================
 # Kamera-Factory
 # ============================================================================
 
-def create_camera_manager(camera_type):
+def create_camera_manager(camera_type, serial=None):
     """Erstellt den passenden Kamera-Manager basierend auf dem Typ"""
+    camera = _new_camera_manager(camera_type, serial)
+    camera.integer_depth = INTEGER_DEPTH.get(camera_type, False)
+    return camera
+
+
+def _new_camera_manager(camera_type, serial=None):
+    # Treiber erst hier importieren: primesense, pyrealsense2 und pykinect2
+    # müssen nur für die benutzte Kamera installiert sein
     if camera_type == "laptop":
+        from DataRead import readLaptopCamera
         return readLaptopCamera.LaptopCameraManager()
     elif camera_type == "asus_xtion":
+        from DataRead import readAsusXtionCamera
         return readAsusXtionCamera.AsusXtionCameraManager()
     elif camera_type == "intel_d415":
-        return readIntelD415Camera.IntelD415CameraManager()
+        from DataRead import readIntelD415Camera
+        readIntelD415Camera.filter_strength = qualityController.levels[qualityController.level]["realsense_filter"]
+        return readIntelD415Camera.IntelD415CameraManager(serial)
     elif camera_type == "kinect":
+        from DataRead import readKinectCamera
         return readKinectCamera.KinectCameraManager()
+    elif camera_type == "recording":
+        return recordSession.RecordedCameraManager(RECORDING_PATH)
+    elif camera_type == "synthetic":
+        from DataRead import generateSyntheticScene
+        return generateSyntheticScene.SyntheticCameraManager()
+    elif camera_type == "fused":
+        from DataRead import readFusedCameras
+        cameras = [recordSession.RecordedCameraManager(entry["path"])
+                   if entry["camera"] == "recording"
+                   else create_camera_manager(entry["camera"], entry.get("serial"))
+                   for entry in FUSED_CAMERAS]
+        registrations = [readFusedCameras.CameraRegistration(entry["homography"],
+                                                             entry.get("depth_offset", 0.0))
+                         for entry in FUSED_CAMERAS]
+        return readFusedCameras.FusedCameraManager(cameras, registrations, FUSED_GRID_SIZE)
     else:
         raise ValueError(f"Unbekannter Kamera-Typ: {camera_type}")
 
@@ -102,150 +235,219 @@ def create_camera_manager(camera_type):
 # Video-Verarbeitungsfunktionen
 # ============================================================================
 
-def process_video_stream(processing_function):
+def process_video_stream(theme, client_id=None):
     """
     Generische Video-Stream-Funktion
     
     Args:
-        processing_function: Funktion zur Frame-Verarbeitung
+        theme: VideoTheme, mit dem der Stream startet. Über den Steuerkanal
+            (streamControls, /set_theme?client=<id>) kann es im laufenden
+            Stream gewechselt werden, ab dem nächsten Frame und ohne die
+            Kamera neu zu öffnen.
+        client_id: Zuordnung für Steuerkanal und Latenzmessung
+    
+    Mit ANALYSIS_WORKERS > 0 wird die Analyse des Themas ("objects" oder
+    "volume") im Prozess-Pool vorberechnet und der Verarbeitung unter
+    frame_data["analysis"] übergeben.
     """
-    camera = create_camera_manager(ACTIVE_CAMERA)
+    camera = cameraHub.acquire()
+    control = streamControls.register(theme, client_id)
+    recorder = None
+    pool = None
+    last_seq = -1
+    # Wartezeit nach Verarbeitungsfehlern, wächst bei Fehlerserien
+    error_backoff = captureSupervisor.Backoff(0.1, 2.0)
     
     try:
-        camera.start()
+        if RECORD_SESSION_DIR is not None:
+            session_path = os.path.join(RECORD_SESSION_DIR, time.strftime("session_%Y%m%d_%H%M%S"))
+            recorder = recordSession.SessionRecorder(session_path, camera)
+            recorder.start()
         
         while True:
             try:
-                # Frame von Kamera lesen
-                frame_data = camera.read_frame()
+                # Blockierend auf das nächste Frame der gemeinsamen Kamera warten
+                frame_data = cameraHub.wait_for_newer(last_seq, timeout=1.0)
                 
                 if frame_data is None:
+                    # Kamera weg: Ersatzbild statt eingefrorenem Beamer (höchstens 1/s)
+                    if cameraHub.supervisor.lost:
+                        part = _camera_lost_part(control.theme)
+                        if part is not None:
+                            yield part
                     continue
-                
-                # Verarbeitung durchführen
-                beamer_output = processing_function(camera, frame_data)
+                last_seq = frame_data["seq"]
+
+                if control.take() is not None:
+                    print(f"Stream {client_id}: Thema gewechselt zu {control.theme.name}")
+                    # Noch ausstehende Analysen gehören zum alten Thema
+                    while pool is not None and pool.pending:
+                        result = pool.next_result()
+                        if result is not None:
+                            pool.release(result)
+                theme = control.theme
+
+                try:
+                    if recorder is not None:
+                        recorder.record(frame_data)
+
+                    # Pool schon beim ersten Frame anlegen, auch wenn das Thema ihn
+                    # noch nicht braucht: ein späterer Wechsel startet keine Prozesse
+                    if (ANALYSIS_WORKERS > 0 and frame_data["depth"] is not None and
+                            frame_data["color"] is not None and
+                            (pool is None or not pool.matches(frame_data))):
+                        if pool is not None:
+                            pool.close()
+                        pool = analysisPool.AnalysisPool(
+                            ANALYSIS_WORKERS, frame_data["depth"].shape, frame_data["color"].shape)
+
+                    # Verarbeitung durchführen
+                    if theme.analysis is not None and ANALYSIS_WORKERS > 0:
+                        if pool is None:
+                            continue
+                        pool.submit(frame_data, camera.depth_scale, camera.baseline_distance,
+                                    with_volume=(theme.analysis == "volume"),
+                                    integer_depth=camera.integer_depth,
+                                    scale=detectBuildings.processing_scale,
+                                    noise_iterations=calculate2DVolume.noise_iterations,
+                                    classifier=processingStages.active_color_classifier(),
+                                    height_model=processingStages.current_height_model(camera, frame_data["depth"]))
+                    else:
+                        beamer_output = theme.process_func(camera, frame_data)
+                finally:
+                    cameraHub.done(frame_data)
+
+                if theme.analysis is not None and ANALYSIS_WORKERS > 0:
+                    # Pipeline erst füllen, danach immer das älteste Ergebnis ausgeben
+                    if pool.pending < ANALYSIS_WORKERS:
+                        continue
+                    result = pool.next_result()
+                    if result is None:
+                        continue
+                    try:
+                        beamer_output = theme.process_func(camera, result)
+                    finally:
+                        pool.release(result)
+                    frame_data = result
                 
                 # Ausgabe generieren
                 if beamer_output is not None:
-                    yield beamer_output
+                    part = latencyTrackerModule.stamp_part(beamer_output, theme.name, frame_data)
+                    yield part
+                    # Weiter geht es erst, wenn der Server den Teil geschrieben hat
+                    latencyTracker.record_sent(part, client_id)
+                    error_backoff.reset()
                     
             except Exception as e:
-                print(f"Fehler bei Frame-Verarbeitung: {e}")
+                control.errors += 1
+                control.last_error = f"{type(e).__name__}: {e}"
+                # Nur den ersten Fehler einer Serie melden, danach länger warten,
+                # damit ein dauerhafter Fehler weder Kern noch Konsole auslastet
+                if error_backoff.failures == 0:
+                    print(f"Fehler bei Frame-Verarbeitung: {e}")
+                time.sleep(error_backoff.next())
                 continue
                 
     finally:
-        camera.stop()
+        streamControls.unregister(control)
+        if pool is not None:
+            pool.close()
+        if recorder is not None:
+            recorder.stop()
+        cameraHub.release()
+
+
+def _camera_lost_part(theme):
+    """Ersatzbild mit Zustand der Neuverbindung als Multipart-Teil"""
+    beamer_output = processingStages.encoded(showCameraLost.show_Camera_Lost(cameraHub.supervisor.status()))
+    if beamer_output is None:
+        return None
+    return latencyTrackerModule.stamp_part(beamer_output, theme.name, {})
 
 
 # ============================================================================
-# Spezifische Verarbeitungsfunktionen
+# Verarbeitungsstufen (processingStages.py, ohne Flask und Kamera-Treiber)
 # ============================================================================
 
-def process_gray_video(camera, frame_data):
-    """Verarbeitet Graustufen-Video"""
-    if frame_data["color"] is None:
-        return None
-    calculation_output = grayPicture.picture_In_Gray(frame_data["color"])
-    return showGrayPicture.show_Gray_Picture(calculation_output)
-
-
-def process_color_video(camera, frame_data):
-    """Verarbeitet RGB-Video"""
-    if frame_data["color"] is None:
-        return None
-    calculation_output = calculateRGB.calculate_Colors(frame_data["color"])
-    ret, beamer_output = showRGB.show_Colors(calculation_output)
-    return beamer_output if ret else None
+processingStages.color_classifier_enabled = COLOR_CLASSIFIER
+processingStages.height_model_enabled = HEIGHT_MODEL
+processingStages.table_plane = TABLE_PLANE
+processingStages.depth_fov_deg = DEPTH_FOV_DEG
+processingStages.projector_size = PROJECTOR_SIZE
+processingStages.table_width_m = TABLE_WIDTH_M
+terrainMesh.vertex_budget = MESH_VERTEX_BUDGET
+terrainMesh.tolerance = MESH_TOLERANCE_M
+terrainMesh.change_tolerance = MESH_CHANGE_TOLERANCE_M
 
 
-def process_objects_video(camera, frame_data):
-    """Verarbeitet Objekt-Erkennung"""
-    if frame_data["depth"] is None or frame_data["color"] is None:
-        return None
-    
-    building_mask, road_mask, park_mask = detectBuildings.detect_Buildings(
-        frame_data["depth"], 
-        frame_data["color"], 
-        camera.depth_scale, 
-        camera.baseline_distance
-    )
-    ret, beamer_output = showObjects.show_Objects(building_mask, road_mask, park_mask, frame_data["color"])
-    return beamer_output if ret else None
+# ============================================================================
+# Video-Themen Definition
+# ============================================================================
 
+def apply_quality_level(settings):
+    """Überträgt eine Qualitätsstufe auf die Stellschrauben der Module"""
+    detectBuildings.processing_scale = settings["detection_scale"]
+    calculate2DVolume.noise_iterations = settings["noise_iterations"]
+    encodeFrame.set_Quality(settings["jpeg_quality"], settings["output_scale"])
+    # Der RealSense-Treiber ist nur geladen, wenn die Kamera benutzt wird
+    realsense = sys.modules.get("DataRead.readIntelD415Camera")
+    if realsense is not None:
+        realsense.filter_strength = settings["realsense_filter"]
 
-def process_volume_2d_video(camera, frame_data):
-    """Verarbeitet 2D-Volumen"""
-    if frame_data["depth"] is None or frame_data["color"] is None:
-        return None
-    
-    building_mask, road_mask, park_mask = detectBuildings.detect_Buildings(
-        frame_data["depth"], 
-        frame_data["color"], 
-        camera.depth_scale, 
-        camera.baseline_distance
-    )
-    calculation_output = calculate2DVolume.calculate_2D_Volume(
-        frame_data['depth'], 
-        building_mask, 
-        road_mask, 
-        park_mask
-    )
-    ret, beamer_output = show2DVolume.show_2D_Volume(
-        calculation_output, 
-        building_mask, 
-        road_mask, 
-        park_mask)
-    return beamer_output if ret else None
 
+qualityController = qualityControllerModule.QualityController(
+    QUALITY_LEVELS, apply_quality_level, TARGET_FPS)
 
-def process_heights_video(camera, frame_data):
-    """Verarbeitet Höhen-Video"""
-    if frame_data["depth"] is None:
-        return None
-    
-    calculation_output = calculateHight.calculate_Hight(frame_data["depth"])
-    ret, beamer_output = showHight.show_Hights(calculation_output)
-    return beamer_output if ret else None
+# Eine gemeinsame Kamera für alle Flask-Streams und ihr Steuerkanal
+cameraHub = streamHub.CameraHub(
+    lambda: create_camera_manager(ACTIVE_CAMERA), linger=CAMERA_LINGER_S,
+    supervisor=captureSupervisor.CaptureSupervisor(CAMERA_STALL_TIMEOUT_S, CAMERA_ERROR_BUDGET,
+                                                   *CAMERA_BACKOFF_S))
+streamControls = streamControl.StreamControls()
 
+# Latenz Aufnahme -> Anzeige (Beacon aus dem Browser)
+latencyTracker = latencyTrackerModule.LatencyTracker()
 
-def process_double_video(camera, frame_data):
-    """Verarbeitet rohes Intel RealSense Video"""
-    if frame_data["depth"] is None or frame_data["color"] is None:
-        return None
-    
-    ret, beamer_output = showColorAndDepth.show_Color_And_Depth(
-        np.uint8(frame_data["depth"]), 
-        frame_data["color"]
-    )
-    return beamer_output if ret else None
 
+def _frame_key(camera, frame_data):
+    """Kennung eines Frames für den Qualitätsregler (wie im stageGraph)"""
+    return camera, frame_data.get("device_id"), frame_data.get("seq")
 
-# ============================================================================
-# Video-Themen Definition
-# ============================================================================
 
 class VideoTheme:
-    """Repräsentiert ein Video-Verarbeitungs-Thema"""
+    """Repräsentiert ein Video-Verarbeitungs-Thema (Ausgangsstufe im stageGraph)"""
     
-    def __init__(self, index, name, process_func):
+    def __init__(self, index, name, output_stage, analysis=None):
         self.index = index
         self.name = name
-        self.process_func = process_func
+        self.output_stage = output_stage
+        self.process_func = qualityController.timed(self._process, frame_key=_frame_key)
+        self.analysis = analysis
+
+    def _process(self, camera, frame_data):
+        """Rechnet die Ausgangsstufe und vermerkt Analyse- und Kodierzeitpunkt"""
+        for input_name in processingStages.stageGraph.stages[self.output_stage].inputs:
+            processingStages.stageGraph.run(input_name, camera, frame_data)
+        processed = time.monotonic()
+        output = processingStages.stageGraph.run(self.output_stage, camera, frame_data)
+        frame_data.setdefault("latency", {})[self.name] = (processed, time.monotonic())
+        return output
     
-    def get_stream(self):
+    def warm_up(self, camera, frame_data):
+        """
+        Rechnet alle Stufen des Themas einmal auf einem Frame, ohne Ausgabe.
+        Legt Arbeitsbereiche und Zustände an, bevor der Stream umschaltet;
+        die Ergebnisse landen im Zwischenspeicher des stageGraph.
+        """
+        processingStages.stageGraph.run(self.output_stage, camera, frame_data)
+
+    def get_stream(self, client_id=None):
         """Gibt den Video-Stream für dieses Thema zurück"""
-        return process_video_stream(self.process_func)
+        return process_video_stream(self, client_id)
 
 
 # Liste aller verfügbaren Video-Themen
-videoThemes = [
-    VideoTheme(0, "Graustufen Video", process_gray_video),
-    VideoTheme(1, "Objekte", process_objects_video),
-    VideoTheme(2, "2D Volumen", process_volume_2d_video),
-    VideoTheme(3, "RGB", process_color_video),
-    VideoTheme(4, "Höhe", process_heights_video),
-    VideoTheme(5, "Doppel Bild", process_double_video)
-]
+videoThemes = [VideoTheme(*theme) for theme in processingStages.THEMES]
 
 
 # ============================================================================
@@ -275,31 +477,415 @@ def video_feed():
     """Video-Stream-Endpunkt"""
     theme_index = session.get('activeVideoTheme', 0)
     return Response(
-        videoThemes[theme_index].get_stream(),
+        videoThemes[theme_index].get_stream(request.args.get('client')),
         mimetype='multipart/x-mixed-replace; boundary=frame'
     )
 
 
+def _switch_theme(theme_index):
+    """
+    Thema wechseln: Session merken (für das Neuladen der Seite) und über den
+    Steuerkanal an die laufenden Streams geben - mit ?client=<id> nur an
+    diesen Browser, sonst an alle. Vorher werden die Stufen des neuen
+    Themas auf dem neuesten Frame vorgewärmt.
+    """
+    theme = videoThemes[theme_index]
+    session['activeVideoTheme'] = theme_index
+    client_id = request.args.get('client')
+    streams = streamControls.find(client_id)
+    if streams:
+        frame_data = cameraHub.wait_for_newer(-1, timeout=1.0)
+        if frame_data is not None:
+            try:
+                theme.warm_up(cameraHub.camera, frame_data)
+            except Exception as e:
+                print(f"Vorwärmen von {theme.name} fehlgeschlagen: {e}")
+            finally:
+                cameraHub.done(frame_data)
+        streamControls.request(theme, client_id)
+    print(f"Thema gewechselt zu: {theme.name} ({len(streams)} Streams)")
+    if client_id is not None:
+        return jsonify({'theme': theme.name, 'index': theme_index, 'streams': len(streams)})
+    return redirect(url_for('index'))
+
+
 @app.route('/theme_Switch')
 def theme_Switch():
-    """Wechselt zum nächsten Video-Thema"""
-    current = session.get('activeVideoTheme', 0)
-    session['activeVideoTheme'] = (current + 1) % len(videoThemes)
-    
-    theme_name = videoThemes[session['activeVideoTheme']].name
-    print(f"Thema gewechselt zu: {theme_name}")
-    
-    return redirect(url_for('index'))
+    """Wechselt zum nächsten Video-Thema (?client=<id>: im laufenden Stream, Antwort JSON)"""
+    streams = streamControls.find(request.args.get('client'))
+    if request.args.get('client') is not None and streams:
+        current = streams[0].target.index
+    else:
+        current = session.get('activeVideoTheme', 0)
+    return _switch_theme((current + 1) % len(videoThemes))
 
 
 @app.route('/set_theme/<int:theme_index>')
 def set_theme(theme_index):
-    """Setzt ein bestimmtes Video-Thema"""
-    if 0 <= theme_index < len(videoThemes):
-        session['activeVideoTheme'] = theme_index
-        theme_name = videoThemes[theme_index].name
-        print(f"Thema gesetzt zu: {theme_name}")
-    return redirect(url_for('index'))
+    """Setzt ein bestimmtes Video-Thema (?client=<id> wie bei /theme_Switch)"""
+    if not 0 <= theme_index < len(videoThemes):
+        if request.args.get('client') is not None:
+            return jsonify({'error': 'Unbekanntes Thema'}), 404
+        return redirect(url_for('index'))
+    return _switch_theme(theme_index)
+
+
+@app.route('/streams')
+def streams_status():
+    """Laufende Streams mit Thema und Dauer des letzten Wechsels"""
+    return jsonify(streamControls.status())
+
+
+@app.route('/water/rain')
+def water_rain():
+    """Regen starten: /water/rain?rate=<mm/s>&duration=<s>"""
+    processingStages.waterSimulation.set_rain(request.args.get('rate', 5.0, type=float),
+                             request.args.get('duration', 10.0, type=float))
+    return jsonify(processingStages.waterSimulation.status())
+
+
+@app.route('/water/source')
+def water_source():
+    """Quelle setzen: /water/source?x=<0..1>&y=<0..1>&rate=<mm/s>&radius=<0..1>"""
+    processingStages.waterSimulation.add_source(request.args.get('x', 0.5, type=float),
+                               request.args.get('y', 0.5, type=float),
+                               request.args.get('rate', 20.0, type=float),
+                               request.args.get('radius', 0.03, type=float))
+    return jsonify(processingStages.waterSimulation.status())
+
+
+@app.route('/water/clear')
+def water_clear():
+    """Wasser, Regen und Quellen entfernen"""
+    processingStages.waterSimulation.clear()
+    return jsonify(processingStages.waterSimulation.status())
+
+
+@app.route('/water/status')
+def water_status():
+    return jsonify(processingStages.waterSimulation.status())
+
+
+@app.route('/shadow/sun')
+def shadow_sun():
+    """Sonnenstand setzen: /shadow/sun?azimuth=<Grad, 0 = oben>&elevation=<Grad>"""
+    processingStages.shadowAnalysis.set_sun(request.args.get('azimuth', 135.0, type=float),
+                           request.args.get('elevation', 30.0, type=float))
+    return jsonify(processingStages.shadowAnalysis.status())
+
+
+@app.route('/shadow/viewpoint')
+def shadow_viewpoint():
+    """Beobachter setzen: /shadow/viewpoint?x=<0..1>&y=<0..1>&height=<m>, ohne x = aus"""
+    x = request.args.get('x', None, type=float)
+    processingStages.shadowAnalysis.set_viewpoint(x, request.args.get('y', 0.5, type=float),
+                                 request.args.get('height', 0.02, type=float))
+    return jsonify(processingStages.shadowAnalysis.status())
+
+
+@app.route('/shadow/status')
+def shadow_status():
+    return jsonify(processingStages.shadowAnalysis.status())
+
+
+def _rect_arg(name):
+    """Rechteck aus Query-Parameter 'x0,y0,x1,y1' (normiert 0..1) oder None"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    rect = [float(v) for v in value.split(',')]
+    if len(rect) != 4:
+        raise ValueError(f"{name} braucht vier Werte x0,y0,x1,y1")
+    return rect
+
+
+@app.route('/cutfill')
+def cut_fill_report():
+    """Abtrag/Auftrag in cm³: ganzer Tisch, Regionen, optional ?rect=x0,y0,x1,y1"""
+    try:
+        rect = _rect_arg('rect')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(processingStages.cutFillAnalysis.report(rect))
+
+
+@app.route('/cutfill/reference')
+def cut_fill_reference():
+    """Aktuelle Oberfläche (über mehrere Frames gemittelt) als neue Referenz"""
+    processingStages.cutFillAnalysis.capture_reference()
+    return jsonify(processingStages.cutFillAnalysis.report())
+
+
+@app.route('/cutfill/region')
+def cut_fill_region():
+    """Region setzen: /cutfill/region?name=<n>&rect=x0,y0,x1,y1[&rect=...], ohne rect = löschen"""
+    name = request.args.get('name')
+    if not name:
+        return jsonify({'error': 'name fehlt'}), 400
+    try:
+        rects = [[float(v) for v in value.split(',')] for value in request.args.getlist('rect')]
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if any(len(rect) != 4 for rect in rects):
+        return jsonify({'error': 'rect braucht vier Werte x0,y0,x1,y1'}), 400
+    processingStages.cutFillAnalysis.set_region(name, rects)
+    return jsonify(processingStages.cutFillAnalysis.report())
+
+
+@app.route('/quality')
+def quality_status():
+    """Aktuelle Qualitätsstufe, Einstellungen und gemessene Zeit pro Frame"""
+    return jsonify(qualityController.status())
+
+
+@app.route('/quality/set')
+def quality_set():
+    """/quality/set?fps=<Ziel> und/oder ?level=<Stufe> (fest) bzw. ?level=auto"""
+    fps = request.args.get('fps', None, type=float)
+    if fps is not None:
+        qualityController.set_target_fps(fps)
+    level = request.args.get('level')
+    if level is not None:
+        if level != 'auto' and not level.isdigit():
+            return jsonify({'error': 'level muss eine Zahl oder auto sein'}), 400
+        qualityController.set_level(None if level == 'auto' else int(level))
+    return jsonify(qualityController.status())
+
+
+@app.route('/latency/clock')
+def latency_clock():
+    """Server-Uhrzeit für den Uhrenabgleich im Browser"""
+    return jsonify(latencyTracker.clock())
+
+
+@app.route('/latency/beacon', methods=['POST'])
+def latency_beacon():
+    """Anzeigezeitpunkte aus dem Browser (navigator.sendBeacon)"""
+    report = request.get_json(force=True, silent=True)
+    if not isinstance(report, dict):
+        return jsonify({'error': 'JSON-Objekt erwartet'}), 400
+    return jsonify({'matched': latencyTracker.record_beacon(report)})
+
+
+@app.route('/latency/stats')
+def latency_stats():
+    """Latenz-Perzentile pro Teilstrecke, pro Thema und pro Client"""
+    return jsonify(latencyTracker.stats())
+
+
+def _color_class_arg():
+    """Klassen-Flag aus ?class=road|park|background"""
+    name = request.args.get('class', '')
+    if name not in colorClassifierModule.CLASSES:
+        raise ValueError(f"class muss einer von {', '.join(colorClassifierModule.CLASSES)} sein")
+    return colorClassifierModule.CLASSES[name]
+
+
+@app.route('/color/sample')
+def color_sample():
+    """Farbprobe nehmen: /color/sample?class=road|park|background&x=<0..1>&y=<0..1>&radius=<0..1>"""
+    try:
+        flag = _color_class_arg()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    processingStages.color_classifier().request_sample(flag,
+                                   request.args.get('x', 0.5, type=float),
+                                   request.args.get('y', 0.5, type=float),
+                                   request.args.get('radius', 0.01, type=float))
+    return jsonify(processingStages.color_classifier().status())
+
+
+@app.route('/color/rebuild')
+def color_rebuild():
+    """Tabelle neu bauen: /color/rebuild?source=samples&max_distance=<Lab> oder ?source=ranges"""
+    source = request.args.get('source', 'samples')
+    if source == 'samples':
+        try:
+            processingStages.color_classifier().rebuild_from_samples(request.args.get('max_distance', 20.0, type=float))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    elif source == 'ranges':
+        processingStages.color_classifier().rebuild_from_ranges()
+    else:
+        return jsonify({'error': 'source muss samples oder ranges sein'}), 400
+    return jsonify(processingStages.color_classifier().status())
+
+
+@app.route('/color/ranges')
+def color_ranges():
+    """HSV-Bereich setzen und Tabelle neu bauen: /color/ranges?class=road|park&lower=h,s,v&upper=h,s,v"""
+    try:
+        flag = _color_class_arg()
+        if flag == 0:
+            raise ValueError("Für background gibt es keinen HSV-Bereich")
+        lower, upper = ([int(v) for v in request.args.get(name, '').split(',')] for name in ('lower', 'upper'))
+        if len(lower) != 3 or len(upper) != 3:
+            raise ValueError("lower und upper brauchen drei Werte h,s,v")
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    processingStages.color_classifier().rebuild_from_ranges({flag: (lower, upper)})
+    return jsonify(processingStages.color_classifier().status())
+
+
+@app.route('/color/clear')
+def color_clear():
+    """Gesammelte Farbproben verwerfen (die Tabelle bleibt)"""
+    processingStages.color_classifier().clear_samples()
+    return jsonify(processingStages.color_classifier().status())
+
+
+@app.route('/color/status')
+def color_status():
+    return jsonify(processingStages.color_classifier().status())
+
+
+@app.route('/mesh')
+def mesh_full():
+    """Volles Geländenetz des neuesten Frames als Binärnachricht (Format: DataCalculation/terrainMesh.py)"""
+    camera = cameraHub.acquire()
+    try:
+        frame_data = cameraHub.wait_for_newer(-1, timeout=2.0)
+        if frame_data is None:
+            return jsonify({'error': 'Kein Frame von der Kamera'}), 503
+        try:
+            result = processingStages.stageGraph.run("terrain_mesh", camera, frame_data)
+        finally:
+            cameraHub.done(frame_data)
+    finally:
+        cameraHub.release()
+    if result is None:
+        return jsonify({'error': 'Kamera liefert keine Tiefe'}), 503
+    return Response(terrainMesh.encode_mesh_message(result["mesh"], seq=result["seq"], full=True),
+                    mimetype='application/octet-stream')
+
+
+@app.route('/mesh/status')
+def mesh_status():
+    """Einstellungen und Größe des zuletzt gebauten Netzes"""
+    return jsonify(processingStages.terrainMesher.status())
+
+
+# Laufendes (oder zuletzt gelaufenes) Layout-Log
+layoutRecorder = None
+
+
+def start_layout_log(directory):
+    """Startet ein neues Layout-Log in directory/layout_<Datum>_<Uhrzeit>"""
+    global layoutRecorder
+    if layoutRecorder is not None and layoutRecorder.running:
+        return layoutRecorder
+    path = os.path.join(directory, time.strftime("layout_%Y%m%d_%H%M%S"))
+    layoutRecorder = layoutLog.LayoutRecorder(cameraHub, processingStages.stageGraph.runner("object_list"), path,
+                                              LAYOUT_LOG_FPS, LAYOUT_SNAPSHOT_S)
+    layoutRecorder.start()
+    return layoutRecorder
+
+
+@app.route('/layout/start')
+def layout_start():
+    """Layout-Log starten: /layout/start[?dir=<Ordner>] (Standard LAYOUT_LOG_DIR)"""
+    directory = request.args.get('dir') or LAYOUT_LOG_DIR
+    if not directory:
+        return jsonify({'error': 'dir fehlt (LAYOUT_LOG_DIR ist nicht gesetzt)'}), 400
+    return jsonify(start_layout_log(directory).status())
+
+
+@app.route('/layout/stop')
+def layout_stop():
+    if layoutRecorder is None:
+        return jsonify({'error': 'Kein Layout-Log'}), 404
+    if layoutRecorder.running:
+        layoutRecorder.stop()
+    return jsonify(layoutRecorder.status())
+
+
+@app.route('/layout/status')
+def layout_status():
+    if layoutRecorder is None:
+        return jsonify({'running': False})
+    return jsonify(layoutRecorder.status())
+
+
+def _layout_reader():
+    path = request.args.get('path') or (layoutRecorder.path if layoutRecorder is not None else None)
+    if not path or not os.path.isdir(path):
+        raise ValueError('Kein Layout-Log (path angeben oder /layout/start)')
+    return layoutLog.LayoutLogReader(path)
+
+
+@app.route('/layout/state')
+def layout_state():
+    """Alle Objekte zu einer Uhrzeit: /layout/state?t=<Unix-Sekunden>[&path=<Log-Ordner>]"""
+    try:
+        reader = _layout_reader()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    t = request.args.get('t', time.time(), type=float)
+    return jsonify({'t': t, 'objects': list(reader.state_at(t).values())})
+
+
+@app.route('/layout/events')
+def layout_events():
+    """Ereignisse im Zeitraum: /layout/events?start=<t>&end=<t>&limit=<n>[&path=<Log-Ordner>]"""
+    try:
+        reader = _layout_reader()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    limit = request.args.get('limit', 1000, type=int)
+    events = []
+    for event in reader.events(request.args.get('start', None, type=float),
+                               request.args.get('end', None, type=float)):
+        if len(events) >= limit:
+            break
+        events.append(event)
+    return jsonify(events)
+
+
+@app.route('/height_model/fit')
+def height_model_fit():
+    """Tischebene im neuesten Frame einmessen: /height_model/fit[?rect=x0,y0,x1,y1]"""
+    try:
+        region = _rect_arg('rect')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    camera = cameraHub.acquire()
+    try:
+        frame_data = cameraHub.wait_for_newer(-1, timeout=2.0)
+        if frame_data is None:
+            return jsonify({'error': 'Kein Frame von der Kamera'}), 503
+        try:
+            if frame_data["depth"] is None:
+                return jsonify({'error': 'Kamera liefert keine Tiefe'}), 503
+            model = processingStages.fit_height_model(camera, frame_data["depth"], region)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        finally:
+            cameraHub.done(frame_data)
+    finally:
+        cameraHub.release()
+    return jsonify(model.status())
+
+
+@app.route('/height_model/status')
+def height_model_status():
+    """Intrinsics, Tischebene (TABLE_PLANE-Werte unter table_plane) und Güte der Einmessung"""
+    model = processingStages.heightModel
+    if model is None:
+        return jsonify({'enabled': processingStages.height_model_enabled, 'fitted': False})
+    return jsonify({'enabled': processingStages.height_model_enabled, 'fitted': True,
+                    'table_plane': [*model.normal.tolist(), model.offset], **model.status()})
+
+
+@app.route('/stage_timings')
+def stage_timings():
+    """Laufzeit pro Verarbeitungsstufe (Anzahl, letzte und mittlere Dauer)"""
+    return jsonify(processingStages.stageGraph.timings())
+
+
+@app.route('/camera/health')
+def camera_health():
+    """Zustand der Kamera: Fehlerzähler, Neuverbindungen, letztes gutes Frame"""
+    return jsonify(cameraHub.supervisor.status())
 
 
 @app.route('/camera_info')
@@ -307,7 +893,7 @@ def camera_info():
     """Gibt Informationen über die aktive Kamera zurück"""
     return jsonify({
         'active_camera': ACTIVE_CAMERA,
-        'available_cameras': ['laptop', 'asus_xtion', 'intel_d415'],
+        'available_cameras': ['laptop', 'asus_xtion', 'intel_d415', 'kinect', 'recording', 'fused', 'synthetic'],
         'themes': [theme.name for theme in videoThemes]
     })
 
@@ -329,4 +915,6 @@ if __name__ == '__main__':
     print("=" * 70)
     # Starte automatische Kalibrierung
     initial_calibration()
+    if LAYOUT_LOG_DIR is not None:
+        start_layout_log(LAYOUT_LOG_DIR)
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,349 @@
+import argparse
+import csv
+import glob
+import json
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+# ============================================================================
+# Stapelverarbeitung ohne Flask: ein Thema über eine Aufnahme laufen lassen
+# ============================================================================
+#
+# Beispiele:
+#   python batchProcess.py recordings/session_x --theme Objekte --out out/objekte
+#   python batchProcess.py frames/ --stage masks --out out/masken --workers 8
+#   python batchProcess.py recordings/session_x --layout-log logs/layout_x
+#
+# Eingabe ist eine mit SessionRecorder aufgenommene Session oder ein Ordner
+# mit Unterordnern depth/ (16-Bit-PNG) und color/ (JPEG/PNG), deren Dateien
+# über den Namen zusammengehören. Jeder Worker-Prozess öffnet die Quelle
+# selbst (die Session per mmap), über den Pool gehen nur Frame-Nummern und
+# Zeitmessungen. Ergebnis: Bildfolge bzw. Masken plus timing.csv.
+#
+# Stufen mit Zustand über die Frames laufen in einem einzigen Prozess der
+# Reihe nach (SEQUENTIAL_STAGES): die Wassersimulation rechnet von Frame zu
+# Frame weiter (im Takt der Aufnahmezeiten statt in Echtzeit), der Schatten-
+# Cache und das Geländenetz bauen auf dem vorigen Frame auf. Für Abtrag/
+# Auftrag mittelt der Hauptprozess die Referenz einmal aus den ersten
+# Frames und gibt sie allen Workern mit.
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+SEQUENTIAL_STAGES = ("water", "shadows", "terrain_mesh")
+
+
+class _Camera:
+    """Ersatz für den Kamera-Manager: die Stufen brauchen nur die Parameter"""
+
+    def __init__(self, depth_scale, baseline_distance=None):
+        self.depth_scale = depth_scale
+        self.baseline_distance = baseline_distance
+        self.integer_depth = False
+
+
+class SessionSource:
+    """Frames aus einer aufgenommenen Session"""
+
+    def __init__(self, path):
+        self.path = path
+        self.reader = None
+
+    def open(self):
+        from DataRead import recordSession
+        self.reader = recordSession.SessionReader(self.path)
+        return _Camera(self.reader.depth_scale, self.reader.baseline_distance)
+
+    def __len__(self):
+        if self.reader is None:
+            self.open()
+        return len(self.reader)
+
+    def __getstate__(self):
+        # Worker öffnen die Session selbst, die mmap-Views bleiben hier
+        return {"path": self.path, "reader": None}
+
+    def read(self, i):
+        return self.reader.read(i)
+
+
+class FolderSource:
+    """Frames aus einem Ordner mit depth/ und color/ (gleiche Dateinamen ohne Endung)"""
+
+    def __init__(self, path, depth_scale=0.001):
+        self.path = path
+        self.depth_scale = depth_scale
+        self.names = sorted(set(self._files("depth")) | set(self._files("color")))
+
+    def _files(self, kind):
+        files = {}
+        for file in glob.glob(os.path.join(self.path, kind, "*")):
+            stem, ext = os.path.splitext(os.path.basename(file))
+            if ext.lower() in IMAGE_EXTENSIONS:
+                files[stem] = file
+        return files
+
+    def open(self):
+        self._depth_files = self._files("depth")
+        self._color_files = self._files("color")
+        return _Camera(self.depth_scale)
+
+    def __len__(self):
+        return len(self.names)
+
+    def read(self, i):
+        name = self.names[i]
+        depth_file = self._depth_files.get(name)
+        color_file = self._color_files.get(name)
+        return {
+            "depth": cv2.imread(depth_file, cv2.IMREAD_UNCHANGED) if depth_file else None,
+            "color": cv2.imread(color_file, cv2.IMREAD_COLOR) if color_file else None,
+            "seq": i,
+            "timestamp": float(i),
+        }
+
+
+def open_source(path, depth_scale=0.001):
+    """Session (mit index.bin) oder Bild-Ordner"""
+    if os.path.exists(os.path.join(path, "meta.json")):
+        return SessionSource(path)
+    if os.path.isdir(os.path.join(path, "depth")) or os.path.isdir(os.path.join(path, "color")):
+        return FolderSource(path, depth_scale)
+    raise ValueError(f"Keine Session und kein Bild-Ordner: {path}")
+
+
+# ============================================================================
+# Ausgabe
+# ============================================================================
+
+def _jpeg_payload(beamer_output):
+    """Schneidet den Multipart-Kopf der Encode-Stufen ab"""
+    start = beamer_output.index(b"\r\n\r\n") + 4
+    return beamer_output[start:-2]
+
+
+def write_result(result, out_dir, index):
+    """Schreibt ein Stufenergebnis: JPEG, PNG(s) oder JSON. Rückgabe: Dateinamen"""
+    stem = os.path.join(out_dir, f"{index:06d}")
+    if isinstance(result, bytes):
+        path = stem + ".jpg"
+        with open(path, "wb") as f:
+            f.write(_jpeg_payload(result))
+        return [path]
+    if isinstance(result, np.ndarray):
+        cv2.imwrite(stem + ".png", result)
+        return [stem + ".png"]
+    if isinstance(result, (tuple, list)) and all(isinstance(r, np.ndarray) or r is None for r in result):
+        paths = []
+        for n, part in enumerate(result):
+            if part is not None:
+                cv2.imwrite(f"{stem}_{n}.png", part)
+                paths.append(f"{stem}_{n}.png")
+        return paths
+    path = stem + ".json"
+    with open(path, "w") as f:
+        json.dump(result, f, default=lambda o: o.tolist() if isinstance(o, np.ndarray) else str(o))
+    return [path]
+
+
+# ============================================================================
+# Worker
+# ============================================================================
+
+_worker = {}
+
+
+def _init_worker(source, stage_name, out_dir, integer_depth=False, layout=False, cut_fill_reference=None):
+    # Import hier, damit jeder Prozess seinen eigenen Stufen-Graphen hat
+    import processingStages
+    processingStages.water_realtime = False
+    if cut_fill_reference is not None:
+        processingStages.cutFillAnalysis.set_reference(cut_fill_reference)
+    _worker["graph"] = processingStages.stageGraph
+    _worker["stages"] = processingStages.stageGraph.dependencies(stage_name)
+    _worker["camera"] = source.open()
+    _worker["camera"].integer_depth = integer_depth
+    _worker["source"] = source
+    _worker["stage"] = stage_name
+    _worker["out_dir"] = out_dir
+    _worker["layout"] = layout
+
+
+def _process_frame(index):
+    graph = _worker["graph"]
+    start = time.perf_counter()
+    frame_data = _worker["source"].read(index)
+    read_done = time.perf_counter()
+
+    before = graph.timings()
+    error = ""
+    result = None
+    try:
+        result = graph.run(_worker["stage"], _worker["camera"], frame_data)
+    except Exception as e:
+        error = str(e)
+    process_done = time.perf_counter()
+    after = graph.timings()
+
+    if result is not None and _worker["out_dir"] is not None:
+        write_result(result, _worker["out_dir"], index)
+    write_done = time.perf_counter()
+
+    # Für das Layout-Log nur die kompakte Objektliste zurückgeben
+    objects = None
+    if _worker["layout"] and result is not None:
+        from DataCalculation.extractObjects import objects_to_json
+        objects = objects_to_json(result["objects"])
+
+    # Laufzeit jeder Stufe, die für dieses Frame gerechnet hat
+    stage_ms = {name: after[name]["last_ms"] for name in _worker["stages"]
+                if after[name]["count"] > before[name]["count"]}
+    return {
+        "frame": index,
+        "seq": frame_data.get("seq"),
+        "timestamp": frame_data.get("timestamp"),
+        "pid": os.getpid(),
+        "read_ms": round((read_done - start) * 1000, 2),
+        "process_ms": round((process_done - read_done) * 1000, 2),
+        "write_ms": round((write_done - process_done) * 1000, 2),
+        "ok": result is not None,
+        "error": error,
+        **{f"{name}_ms": ms for name, ms in stage_ms.items()},
+        **({"objects": objects} if _worker["layout"] else {}),
+    }
+
+
+def run_batch(source, stage_name, out_dir, workers=None, start=0, stop=None, step=1, chunksize=4,
+              integer_depth=False, layout_log=None):
+    """
+    Verarbeitet die Frames start:stop:step der Quelle mit `workers` Prozessen.
+    integer_depth: Gebäudeerkennung auf dem ganzzahligen Tiefen-Zweig
+    layout_log: Ordner für ein Layout-Log (stage_name muss object_list sein)
+    Rückgabe: Liste der Zeitmessungen pro Frame (in Frame-Reihenfolge).
+    """
+    if out_dir is not None:
+        os.makedirs(out_dir, exist_ok=True)
+    logger = None
+    if layout_log is not None:
+        from DataRead.layoutLog import LayoutLogger
+        logger = LayoutLogger(layout_log, meta={"source": source.path})
+        clock = _wall_clock(source)
+    indices = list(range(len(source)))[start:stop:step]
+    workers = workers or os.cpu_count() or 1
+
+    import processingStages
+    stages = processingStages.stageGraph.dependencies(stage_name)
+    sequential = [name for name in SEQUENTIAL_STAGES if name in stages]
+    if sequential and workers > 1:
+        print(f"Stufe(n) {', '.join(sequential)} hängen vom vorigen Frame ab: "
+              f"ein Prozess statt {workers}, Frames der Reihe nach")
+        workers = 1
+    cut_fill_reference = capture_cut_fill_reference(source, indices) if "cut_fill" in stages else None
+
+    context = mp.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker,
+                             initargs=(source, stage_name, out_dir, integer_depth,
+                                       logger is not None, cut_fill_reference)) as executor:
+        rows = []
+        started = time.perf_counter()
+        for n, row in enumerate(executor.map(_process_frame, indices, chunksize=chunksize), 1):
+            objects = row.pop("objects", None)
+            if logger is not None and objects is not None:
+                logger.record(objects, clock(row["timestamp"]), row["seq"])
+            rows.append(row)
+            if n % 100 == 0 or n == len(indices):
+                elapsed = time.perf_counter() - started
+                print(f"{n}/{len(indices)} Frames, {n / elapsed:.1f} Frames/s")
+    if logger is not None:
+        logger.close()
+        print(f"Layout-Log: {logger.status()}")
+    return rows
+
+
+def capture_cut_fill_reference(source, indices):
+    """
+    Referenz für Abtrag/Auftrag, einmal im Hauptprozess über die ersten
+    Frames (wie CutFillAnalysis.reference_frames) gemittelt
+    """
+    from DataCalculation.calculateCutFill import CutFillAnalysis
+    camera = source.open()
+    analysis = CutFillAnalysis()
+    analysis.reference_frames = max(1, min(analysis.reference_frames, len(indices)))
+    for index in indices:
+        depth = source.read(index)["depth"]
+        if depth is None:
+            continue
+        analysis.update(depth, camera.depth_scale, 1.0)
+        if analysis.has_reference:
+            return analysis.reference
+    raise ValueError("Keine Tiefenbilder für die Referenz von Abtrag/Auftrag")
+
+
+def _wall_clock(source):
+    """Aufnahmezeit -> Unix-Zeit (Sessions: ab meta["created"], Bild-Ordner: Frame-Nummer)"""
+    if isinstance(source, SessionSource):
+        if source.reader is None:
+            source.open()
+        created = source.reader.meta.get("created")
+        if created is not None and len(source.reader):
+            first = float(source.reader.index[0]["timestamp"])
+            return lambda timestamp: created + (timestamp - first)
+    return lambda timestamp: timestamp
+
+
+def write_timing_csv(rows, path):
+    columns = ["frame", "seq", "timestamp", "pid", "read_ms", "process_ms", "write_ms", "ok", "error"]
+    stage_columns = sorted({key for row in rows for key in row} - set(columns))
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns + stage_columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def _resolve_stage(theme, stage):
+    if stage is not None:
+        return stage
+    import processingStages
+    entry = processingStages.find_theme(theme)
+    if entry is not None:
+        return entry[2]
+    names = ", ".join(f"{index}={name}" for index, name, _, _ in processingStages.THEMES)
+    raise SystemExit(f"Unbekanntes Thema '{theme}'. Verfügbar: {names}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Thema/Stufe über eine Aufnahme rechnen (ohne Flask)")
+    parser.add_argument("source", help="Session-Ordner oder Ordner mit depth/ und color/")
+    parser.add_argument("--theme", default="0", help="Thema (Nummer oder Name)")
+    parser.add_argument("--stage", default=None, help="Stufe statt Thema, z.B. masks oder object_list")
+    parser.add_argument("--out", default=None, help="Ausgabeordner (ohne: nur Zeitmessung)")
+    parser.add_argument("--timing", default=None, help="CSV-Datei (Standard: <out>/timing.csv)")
+    parser.add_argument("--workers", type=int, default=None, help="Anzahl Prozesse (Standard: alle Kerne)")
+    parser.add_argument("--start", type=int, default=0)
+    parser.add_argument("--stop", type=int, default=None)
+    parser.add_argument("--step", type=int, default=1)
+    parser.add_argument("--depth-scale", type=float, default=0.001, help="nur für Bild-Ordner")
+    parser.add_argument("--integer-depth", action="store_true",
+                        help="Gebäudeerkennung ganzzahlig (mm) statt float32-Meter")
+    parser.add_argument("--layout-log", default=None,
+                        help="Ordner: Ereignis-Log des Stadt-Layouts schreiben (Stufe object_list)")
+    args = parser.parse_args()
+
+    source = open_source(args.source, args.depth_scale)
+    stage_name = "object_list" if args.layout_log else _resolve_stage(args.theme, args.stage)
+    print(f"{len(source)} Frames aus {args.source}, Stufe '{stage_name}'")
+
+    rows = run_batch(source, stage_name, args.out, args.workers, args.start, args.stop, args.step,
+                     integer_depth=args.integer_depth, layout_log=args.layout_log)
+    timing_path = args.timing or (os.path.join(args.out, "timing.csv") if args.out else "timing.csv")
+    write_timing_csv(rows, timing_path)
+    failed = sum(1 for row in rows if not row["ok"])
+    print(f"Fertig: {len(rows)} Frames, {failed} ohne Ergebnis, Zeiten in {timing_path}")
+
+
+if __name__ == '__main__':
+    main()
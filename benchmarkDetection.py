@@ -0,0 +1,120 @@
+import argparse
+import csv
+import time
+import tracemalloc
+
+import numpy as np
+
+from DataCalculation import calculate2DVolume, detectBuildings
+from DataRead import generateSyntheticScene
+
+# ============================================================================
+# Benchmark für detect_Buildings auf synthetischen Szenen
+# ============================================================================
+#
+#   python benchmarkDetection.py --scenes 10 --seed 0
+#   python benchmarkDetection.py --sizes 640x480,3840x2160 --csv bench.csv
+#   python benchmarkDetection.py --integer-depth   (ganzzahliger Tiefen-Zweig)
+#
+# Misst pro Auflösung die Laufzeit (Median, p90) und die IoU der drei
+# Masken gegen die Ground Truth des Szenengenerators. Gleicher Seed =
+# gleiche Szenen, die Ergebnisse sind also zwischen Versionen vergleichbar.
+# Dazu der Speicher, den ein Aufruf im eingeschwungenen Zustand zusätzlich
+# anlegt (Spitze laut tracemalloc, ohne die zurückgegebenen Masken).
+
+DEFAULT_SIZES = "640x480,1280x720,1920x1080,3840x2160"
+CLASSES = ("building", "road", "park")
+
+
+def mask_iou(prediction, truth):
+    """Intersection over Union zweier Binärmasken (beide leer = 1.0)"""
+    prediction = prediction > 0
+    truth = truth > 0
+    union = np.count_nonzero(prediction | truth)
+    if union == 0:
+        return 1.0
+    return np.count_nonzero(prediction & truth) / union
+
+
+def steady_state_allocation(func, *args, warmup=2, **kwargs):
+    """
+    Zusätzlicher Speicher (Bytes) eines Aufrufs nach `warmup` Aufrufen,
+    ohne die Größe des Ergebnisses selbst. Gemessen wird die Spitze der
+    von Python/NumPy angelegten Arrays, interne OpenCV-Puffer zählen nicht.
+    """
+    for _ in range(warmup):
+        func(*args, **kwargs)
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = func(*args, **kwargs)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    results = result if isinstance(result, tuple) else (result,)
+    result_bytes = sum(r.nbytes for r in results if isinstance(r, np.ndarray))
+    return max(0, peak - before - result_bytes)
+
+
+def benchmark_resolution(width, height, scenes, seed, repeats=3, parallel=True, integer_depth=False):
+    """Laufzeiten (ms) und IoU pro Klasse für eine Auflösung"""
+    times = []
+    ious = {name: [] for name in CLASSES}
+    for scene in generateSyntheticScene.generate_Scene_Set(scenes, width, height, seed):
+        for _ in range(repeats):
+            start = time.perf_counter()
+            masks = detectBuildings.detect_Buildings(scene["depth"], scene["color"],
+                                                     scene["depth_scale"], None, parallel=parallel,
+                                                     integer_depth=integer_depth)
+            times.append((time.perf_counter() - start) * 1000)
+        for name, mask in zip(CLASSES, masks):
+            ious[name].append(mask_iou(mask, scene[f"{name}_mask"]))
+    result = {
+        "size": f"{width}x{height}",
+        "median_ms": round(float(np.median(times)), 1),
+        "p90_ms": round(float(np.percentile(times, 90)), 1),
+    }
+    for name in CLASSES:
+        result[f"{name}_iou"] = round(float(np.mean(ious[name])), 3)
+    extra = steady_state_allocation(detectBuildings.detect_Buildings, scene["depth"], scene["color"],
+                                    scene["depth_scale"], None, parallel=parallel,
+                                    integer_depth=integer_depth)
+    noise_extra = steady_state_allocation(calculate2DVolume.calculate_2D_Volume, scene["depth"], *masks)
+    result["alloc_kb"] = round(extra / 1024, 1)
+    result["noise_alloc_kb"] = round(noise_extra / 1024, 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Laufzeit und IoU von detect_Buildings")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Liste BxH, kommagetrennt")
+    parser.add_argument("--scenes", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3, help="Zeitmessungen pro Szene")
+    parser.add_argument("--sequential", action="store_true", help="Zweige nicht parallel rechnen")
+    parser.add_argument("--integer-depth", action="store_true",
+                        help="ganzzahliger Tiefen-Zweig (mm) statt float32-Meter")
+    parser.add_argument("--csv", default=None, help="Ergebnisse zusätzlich als CSV")
+    args = parser.parse_args()
+
+    rows = []
+    print(f"{'Größe':>10} {'Median':>9} {'p90':>9} {'IoU Gebäude':>12} {'IoU Straße':>11} {'IoU Park':>9} "
+          f"{'Speicher':>10} {'Lärm':>10}")
+    for size in args.sizes.split(","):
+        width, height = (int(v) for v in size.lower().split("x"))
+        row = benchmark_resolution(width, height, args.scenes, args.seed, args.repeats,
+                                   parallel=not args.sequential, integer_depth=args.integer_depth)
+        rows.append(row)
+        print(f"{row['size']:>10} {row['median_ms']:>7} ms {row['p90_ms']:>6} ms "
+              f"{row['building_iou']:>12} {row['road_iou']:>11} {row['park_iou']:>9} "
+              f"{row['alloc_kb']:>7} KB {row['noise_alloc_kb']:>7} KB")
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+# Paketwurzel für pytest: die Tests importieren DataCalculation, DataRead usw.
@@ -0,0 +1,342 @@
+import threading
+
+import numpy as np
+
+from DataCalculation import calculate2DVolume, calculateHight, calculateRGB, detectBuildings, grayPicture
+from DataCalculation import extractObjects
+from DataCalculation import stageGraph as stageGraphModule
+from DataCalculation import simulateWater, calculateShadows, calculateCutFill
+from DataCalculation import colorClassifier as colorClassifierModule
+from DataCalculation import terrainMesh, tableGeometry
+from DataShow import show2DVolume, showGrayPicture, showHight, showRGB, showObjects, showColorAndDepth
+from DataShow import showWater, showShadows, showCutFill
+
+# ============================================================================
+# Verarbeitungsstufen und Themen (ohne Flask und ohne Kamera-Treiber)
+# ============================================================================
+#
+# Jede Stufe bekommt (camera, frame_data, *Eingänge). Die Themen sind nur
+# Ausgangsstufen im gemeinsamen Graphen, gemeinsame Zwischenergebnisse
+# (z.B. die Masken) werden pro Frame nur einmal berechnet. camera muss nur
+# depth_scale, baseline_distance und integer_depth haben.
+#
+# Benutzt von app.py (Flask, ASGI-Server) und batchProcess.py. Die
+# Stellschrauben unten setzt app.py aus seiner Konfiguration.
+
+color_classifier_enabled = False    # COLOR_CLASSIFIER
+height_model_enabled = False        # HEIGHT_MODEL
+table_plane = None                  # TABLE_PLANE
+depth_fov_deg = tableGeometry.DEFAULT_FOV_DEG
+projector_size = (1280, 960)        # PROJECTOR_SIZE
+table_width_m = 1.0                 # TABLE_WIDTH_M
+# False: die Wassersimulation läuft nicht in Echtzeit, sondern wird pro
+# Frame um den Abstand der Aufnahmezeiten weitergerechnet (Stapelbetrieb)
+water_realtime = True
+
+# Themen: (Nummer, Name, Ausgangsstufe, Analyse im Prozess-Pool)
+THEMES = [
+    (0, "Graustufen Video", "encode_gray", None),
+    (1, "Objekte", "encode_objects", "objects"),
+    (2, "2D Volumen", "encode_volume_2d", "volume"),
+    (3, "RGB", "encode_color", None),
+    (4, "Höhe", "encode_heights", None),
+    (5, "Doppel Bild", "encode_double", None),
+    (6, "Wasser", "encode_water", None),
+    (7, "Schatten", "encode_shadows", None),
+    (8, "Erdbewegung", "encode_cut_fill", None),
+]
+
+
+# ============================================================================
+# Farb-Lookup-Tabelle und Höhenmodell
+# ============================================================================
+
+# Farb-Lookup-Tabelle für Straßen und Parks (aktiv mit color_classifier_enabled),
+# erst bei Bedarf angelegt: das Aufspannen der Tabelle (16 MB) kostet spürbar
+# Zeit, auch in jedem Stapel-Worker
+colorClassifier = None
+colorClassifierLock = threading.Lock()
+
+# Höhenmodell (aktiv mit height_model_enabled), angelegt beim ersten Frame
+heightModel = None
+heightModelLock = threading.Lock()
+
+
+def color_classifier():
+    """Farb-Lookup-Tabelle, beim ersten Aufruf aus den HSV-Bereichen gebaut"""
+    global colorClassifier
+    classifier = colorClassifier
+    if classifier is not None:
+        return classifier
+    with colorClassifierLock:
+        if colorClassifier is None:
+            colorClassifier = colorClassifierModule.ColorClassifier.from_ranges()
+        return colorClassifier
+
+
+def active_color_classifier():
+    """Tabelle für die Erkennung, None ohne color_classifier_enabled"""
+    return color_classifier() if color_classifier_enabled else None
+
+
+def _depth_intrinsics(camera, depth):
+    intrinsics = getattr(camera, "depth_intrinsics", None)
+    if intrinsics is None:
+        intrinsics = tableGeometry.DepthIntrinsics.from_fov(depth.shape[1], depth.shape[0], depth_fov_deg)
+    return intrinsics
+
+
+def _fit_height_model(camera, depth, region=None):
+    model = tableGeometry.HeightModel.fit(depth, camera.depth_scale, _depth_intrinsics(camera, depth), region)
+    print(f"[INFO] Tischebene eingemessen: Neigung {model.tilt_deg:.1f}°, "
+          f"Abstand {model.offset:.3f} m, {model.fit_info['rms_mm']} mm RMS")
+    return model
+
+
+def fit_height_model(camera, depth, region=None):
+    """Tischebene in diesem Tiefenbild einmessen und als Höhenmodell setzen"""
+    global heightModel
+    model = _fit_height_model(camera, depth, region)
+    with heightModelLock:
+        heightModel = model
+    return model
+
+
+def current_height_model(camera, depth):
+    """Höhenmodell für die Stufen (None ohne height_model_enabled), beim ersten Aufruf angelegt"""
+    global heightModel
+    if not height_model_enabled or depth is None:
+        return None
+    model = heightModel
+    if model is not None:
+        return model
+    with heightModelLock:
+        if heightModel is None:
+            if table_plane is not None:
+                heightModel = tableGeometry.HeightModel(_depth_intrinsics(camera, depth),
+                                                        table_plane[:3], table_plane[3])
+            else:
+                heightModel = _fit_height_model(camera, depth)
+        return heightModel
+
+
+# ============================================================================
+# Verarbeitungsstufen
+# ============================================================================
+
+def stage_depth(camera, frame_data):
+    """Tiefenbild (Konditionierung passiert im Kamera-Treiber)"""
+    return frame_data["depth"]
+
+
+def stage_color(camera, frame_data):
+    """Farbbild"""
+    return frame_data["color"]
+
+
+def stage_detection(camera, frame_data, depth, color):
+    """Masken aus dem Analyse-Pool übernehmen oder direkt berechnen"""
+    # Angeforderte Farbproben (/color/sample) aus diesem Frame nehmen
+    if colorClassifier is not None:
+        colorClassifier.collect_samples(color)
+    if "analysis" in frame_data:
+        analysis = frame_data["analysis"]
+        return analysis["building_mask"], analysis["road_mask"], analysis["park_mask"], None
+    return detectBuildings.detect_Buildings(
+        depth,
+        color,
+        camera.depth_scale,
+        camera.baseline_distance,
+        debug=True,
+        integer_depth=camera.integer_depth,
+        classifier=active_color_classifier(),
+        height_model=current_height_model(camera, depth)
+    )
+
+
+def stage_masks(camera, frame_data, detection):
+    """Gebäude-, Straßen- und Park-Maske"""
+    return detection[:3]
+
+
+def stage_height_map(camera, frame_data, depth):
+    """Normierte 8-Bit-Höhenkarte"""
+    return calculateHight.calculate_Hight(depth)
+
+
+def stage_noise_field(camera, frame_data, depth, masks):
+    """Lärmkarte (aus dem Analyse-Pool oder berechnet)"""
+    noise_map = frame_data.get("analysis", {}).get("noise_map")
+    if noise_map is not None:
+        return noise_map
+    building_mask, road_mask, park_mask = masks
+    return calculate2DVolume.calculate_2D_Volume(
+        depth,
+        building_mask,
+        road_mask,
+        park_mask
+    )
+
+
+def stage_gray(camera, frame_data, color):
+    """Graustufenbild"""
+    return grayPicture.picture_In_Gray(color)
+
+
+def stage_object_list(camera, frame_data, detection):
+    """Liefert die erkannten Objekte als Liste (für den WebSocket-Kanal)"""
+    building_mask, road_mask, park_mask, height_map = detection
+    return {
+        "seq": frame_data.get("seq"),
+        "objects": extractObjects.extract_Objects(building_mask, road_mask, park_mask, height_map,
+                                                  # Mit Höhenmodell schon Höhe über dem Tisch
+                                                  camera_distance=not height_model_enabled)
+    }
+
+
+terrainMesher = terrainMesh.TerrainMesher()
+
+
+def stage_terrain_mesh(camera, frame_data, height_field):
+    """Vereinfachtes Geländenetz (für den Mesh-Kanal)"""
+    return {
+        "seq": frame_data.get("seq"),
+        "mesh": terrainMesher.update(height_field, table_width_m, frame_data.get("seq"))
+    }
+
+
+# Die Wassersimulation läuft in eigenem Thread mit festem Zeitschritt,
+# die Stufe liefert nur das Gelände nach und holt den aktuellen Wasserstand
+waterSimulation = simulateWater.WaterSimulation()
+_water_clock = {"timestamp": None}
+
+
+def stage_water(camera, frame_data, depth):
+    """Gelände an die Simulation übergeben, aktuellen Wasserstand liefern"""
+    waterSimulation.update_terrain(depth, camera.depth_scale)
+    if water_realtime:
+        waterSimulation.start()
+    else:
+        timestamp = frame_data.get("timestamp")
+        previous, _water_clock["timestamp"] = _water_clock["timestamp"], timestamp
+        if previous is not None and timestamp is not None:
+            waterSimulation.advance(timestamp - previous)
+    return waterSimulation.water_depth()
+
+
+# Sonnenstand und Beobachterpunkt; Ergebnisse werden gecached, bis sich
+# das Gelände oder die Parameter ändern
+shadowAnalysis = calculateShadows.ShadowAnalysis()
+
+
+def stage_height_field(camera, frame_data, depth):
+    """Höhenfeld in Metern (oben = größer)"""
+    return calculateShadows.height_field_from_depth(depth, camera.depth_scale,
+                                                    current_height_model(camera, depth))
+
+
+def stage_shadows(camera, frame_data, height_field):
+    """Schattenmaske und (falls Beobachter gesetzt) Sichtbarkeitsmaske"""
+    pixel_size = table_width_m / height_field.shape[1]
+    return shadowAnalysis.compute(height_field, pixel_size)
+
+
+# Abtrag/Auftrag gegenüber einer gespeicherten Referenzoberfläche
+# (wird beim ersten Frame bzw. über /cutfill/reference aufgenommen)
+cutFillAnalysis = calculateCutFill.CutFillAnalysis()
+
+
+def stage_cut_fill(camera, frame_data, depth):
+    """Summentabellen für Abtrag/Auftrag (None, bis die Referenz steht)"""
+    pixel_size = table_width_m / depth.shape[1]
+    return cutFillAnalysis.update(depth, camera.depth_scale, pixel_size, frame_data.get("seq"))
+
+
+def encoded(result):
+    """(ret, Bild) der show-Funktionen -> Multipart-Teil oder None"""
+    ret, beamer_output = result
+    return beamer_output if ret else None
+
+
+def encode_gray(camera, frame_data, gray):
+    """Verarbeitet Graustufen-Video"""
+    return showGrayPicture.show_Gray_Picture(gray)
+
+
+def encode_color(camera, frame_data, color):
+    """Verarbeitet RGB-Video"""
+    return encoded(showRGB.show_Colors(calculateRGB.calculate_Colors(color)))
+
+
+def encode_objects(camera, frame_data, masks, color):
+    """Verarbeitet Objekt-Erkennung"""
+    building_mask, road_mask, park_mask = masks
+    return encoded(showObjects.show_Objects(building_mask, road_mask, park_mask, color))
+
+
+def encode_volume_2d(camera, frame_data, noise_field, masks):
+    """Verarbeitet 2D-Volumen"""
+    building_mask, road_mask, park_mask = masks
+    return encoded(show2DVolume.show_2D_Volume(noise_field, building_mask, road_mask, park_mask))
+
+
+def encode_heights(camera, frame_data, height_map):
+    """Verarbeitet Höhen-Video"""
+    return encoded(showHight.show_Hights(height_map))
+
+
+def encode_water(camera, frame_data, height_map, water):
+    """Wasser über den Höhenfarben"""
+    return encoded(showWater.show_Water(height_map, water, projector_size))
+
+
+def encode_shadows(camera, frame_data, height_map, shadows):
+    """Sonnenschatten und Sichtbarkeit über den Höhenfarben"""
+    shadow_mask, visible_mask = shadows
+    return encoded(showShadows.show_Shadows(height_map, shadow_mask, visible_mask,
+                                            shadowAnalysis.viewpoint, projector_size))
+
+
+def encode_cut_fill(camera, frame_data, height_map, cut_fill):
+    """Abtrag/Auftrag als Wärmebild über den Höhenfarben"""
+    return encoded(showCutFill.show_Cut_Fill(height_map, cut_fill.difference,
+                                             cut_fill.volume(), projector_size))
+
+
+def encode_double(camera, frame_data, depth, color):
+    """Verarbeitet rohes Intel RealSense Video"""
+    return encoded(showColorAndDepth.show_Color_And_Depth(np.uint8(depth), color))
+
+
+stageGraph = stageGraphModule.StageGraph([
+    stageGraphModule.Stage("depth", stage_depth),
+    stageGraphModule.Stage("color", stage_color),
+    stageGraphModule.Stage("detection", stage_detection, ["depth", "color"]),
+    stageGraphModule.Stage("masks", stage_masks, ["detection"]),
+    stageGraphModule.Stage("height_map", stage_height_map, ["depth"]),
+    stageGraphModule.Stage("noise_field", stage_noise_field, ["depth", "masks"]),
+    stageGraphModule.Stage("gray", stage_gray, ["color"]),
+    stageGraphModule.Stage("object_list", stage_object_list, ["detection"]),
+    stageGraphModule.Stage("water", stage_water, ["depth"]),
+    stageGraphModule.Stage("height_field", stage_height_field, ["depth"]),
+    stageGraphModule.Stage("shadows", stage_shadows, ["height_field"]),
+    stageGraphModule.Stage("terrain_mesh", stage_terrain_mesh, ["height_field"]),
+    stageGraphModule.Stage("cut_fill", stage_cut_fill, ["depth"]),
+    stageGraphModule.Stage("encode_gray", encode_gray, ["gray"]),
+    stageGraphModule.Stage("encode_color", encode_color, ["color"]),
+    stageGraphModule.Stage("encode_objects", encode_objects, ["masks", "color"]),
+    stageGraphModule.Stage("encode_volume_2d", encode_volume_2d, ["noise_field", "masks"]),
+    stageGraphModule.Stage("encode_heights", encode_heights, ["height_map"]),
+    stageGraphModule.Stage("encode_double", encode_double, ["depth", "color"]),
+    stageGraphModule.Stage("encode_water", encode_water, ["height_map", "water"]),
+    stageGraphModule.Stage("encode_shadows", encode_shadows, ["height_map", "shadows"]),
+    stageGraphModule.Stage("encode_cut_fill", encode_cut_fill, ["height_map", "cut_fill"]),
+])
+
+
+def find_theme(theme):
+    """Thema aus THEMES über Nummer oder Name, None wenn unbekannt"""
+    for entry in THEMES:
+        if theme == entry[0] or theme == str(entry[0]) or theme == entry[1]:
+            return entry
+    return None
@@ -1,23 +1,94 @@
+import time
+
+import numpy as np
+
+from templates.frame_pool import FramePool
+
 # ============================================================================
 # Kamera-Manager-Klasse
 # ============================================================================
 
 class BaseCameraManager:
     """Basis-Klasse für alle Kamera-Manager"""
-    
+
     def __init__(self):
         self.depth_scale = 1
         self.baseline_distance = None
-    
+        self.frame_pool = FramePool()
+        # Kennung der Quelle (z.B. Seriennummer), wird jedem Frame mitgegeben
+        self.device_id = type(self).__name__
+        # Wartezeit zwischen zwei Leseversuchen, wenn der Treiber nicht
+        # selbst blockiert (z.B. Kinect: read_frame liefert sofort None)
+        self.poll_interval = 0.005
+        # Gebäudeerkennung ganzzahlig auf dem uint16-Tiefenbild statt in
+        # float32-Metern (siehe detectBuildings.detect_building_branch_integer)
+        self.integer_depth = False
+        # Intrinsics des Tiefenbilds (tableGeometry.DepthIntrinsics) für das
+        # geometrische Höhenmodell, None = unbekannt (Ersatz über Bildwinkel)
+        self.depth_intrinsics = None
+
     def start(self):
         """Startet die Kamera - muss von Unterklassen implementiert werden"""
         raise NotImplementedError
-    
+
     def read_frame(self):
         """Liest ein Frame - muss von Unterklassen implementiert werden"""
         raise NotImplementedError
-    
+
+    def read_frame_into(self, slot, timeout=None):
+        """
+        Liest ein Frame direkt in die Puffer eines FrameSlot.
+        Gibt True zurück, wenn ein Frame geschrieben wurde, sonst False.
+        timeout: höchstens so viele Sekunden im Treiber warten (None =
+        Standard des Treibers); Treiber, die nicht blockieren, ignorieren ihn.
+
+        Standard-Implementierung: read_frame() + Kopie. Treiber überschreiben
+        diese Methode, um ohne Zwischen-Allokation in den Slot zu schreiben.
+        """
+        frame_data = self.read_frame()
+        if frame_data is None:
+            return False
+        for name in ("depth", "color"):
+            image = frame_data.get(name)
+            if image is not None:
+                np.copyto(slot.buffer(name, image.shape, image.dtype), image)
+        return True
+
+    def read_pooled_frame(self, timeout=None):
+        """
+        Liest ein Frame in den nächsten Slot des Frame-Pools.
+        Rückgabe: Dictionary mit schreibgeschützten Views ("color", "depth")
+        sowie "seq" und "timestamp", oder None wenn kein Frame verfügbar war.
+        timeout wird an read_frame_into weitergegeben.
+        """
+        slot = self.frame_pool.acquire()
+        if not self.read_frame_into(slot, timeout):
+            return None
+        frame_data = self.frame_pool.publish(slot)
+        frame_data["device_id"] = self.device_id
+        return frame_data
+
+    def wait_for_frame(self, timeout=1.0):
+        """
+        Wartet blockierend auf das nächste Frame (wie read_pooled_frame()).
+        Das Frame enthält "seq" (streng steigend), "timestamp"
+        (time.monotonic() bei Ankunft) und "device_id".
+
+        Rückgabe None, wenn innerhalb von `timeout` Sekunden kein Frame kam.
+        Blockierende Treiber bekommen die Restzeit mit, zwischen zwei
+        Versuchen wird poll_interval geschlafen statt einen Kern auszulasten.
+        Fehler des Treibers werden weitergereicht.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            frame_data = self.read_pooled_frame(max(deadline - time.monotonic(), 0.0))
+            if frame_data is not None:
+                return frame_data
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            time.sleep(min(self.poll_interval, remaining))
+
     def stop(self):
         """Stoppt die Kamera - muss von Unterklassen implementiert werden"""
         raise NotImplementedError
-    
\ No newline at end of file
@@ -0,0 +1,124 @@
+import threading
+import time
+
+import numpy as np
+
+# ============================================================================
+# Frame-Pool (vorallokierte Ring-Puffer für Kamera-Frames)
+# ============================================================================
+
+class FrameSlot:
+    """
+    Ein beschreibbarer Platz im Ring. Treiber schreiben Tiefe und Farbe
+    direkt in die Puffer dieses Slots (z.B. über dst= bei OpenCV).
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.seq = -1
+        self.timestamp = 0.0
+        self.buffers = {}
+        self.present = set()
+        self.leases = 0
+
+    def buffer(self, name, shape, dtype):
+        """
+        Gibt den Puffer `name` mit passender Form/Typ zurück.
+        Neu alloziert wird nur beim ersten Aufruf oder bei Auflösungswechsel.
+        """
+        shape = tuple(shape)
+        dtype = np.dtype(dtype)
+        buf = self.buffers.get(name)
+        if buf is None or buf.shape != shape or buf.dtype != dtype:
+            buf = np.empty(shape, dtype=dtype)
+            self.buffers[name] = buf
+        self.present.add(name)
+        return buf
+
+    def adopt(self, name, array):
+        """Übernimmt ein vom Treiber selbst (neu) alloziertes Array als Puffer"""
+        self.buffers[name] = array
+        self.present.add(name)
+        return array
+
+    def get(self, name):
+        """Puffer `name`, falls er in diesem Frame beschrieben wurde, sonst None"""
+        return self.buffers.get(name) if name in self.present else None
+
+    @property
+    def depth(self):
+        return self.get("depth")
+
+    @property
+    def color(self):
+        return self.get("color")
+
+
+def _read_only(array):
+    if array is None:
+        return None
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
+class FramePool:
+    """
+    Ring aus `size` vorallokierten Frame-Slots.
+
+    Der Produzent holt sich mit acquire() den nächsten Slot, schreibt hinein
+    und gibt ihn mit publish() frei. Konsumenten bekommen schreibgeschützte
+    Views plus Sequenznummer. Ein Slot wird erst nach `size` weiteren Frames
+    wieder überschrieben - wer länger festhalten will, muss das Frame mit
+    lease() reservieren und danach mit release() wieder freigeben.
+    Sind alle Slots reserviert, wächst der Ring um einen Slot.
+    """
+
+    def __init__(self, size=4):
+        if size < 2:
+            raise ValueError("FramePool braucht mindestens 2 Slots")
+        self.slots = [FrameSlot(i) for i in range(size)]
+        self._next = 0
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Gibt den nächsten beschreibbaren Slot im Ring zurück"""
+        with self._lock:
+            for _ in range(len(self.slots)):
+                slot = self.slots[self._next]
+                self._next = (self._next + 1) % len(self.slots)
+                if slot.leases == 0:
+                    break
+            else:
+                slot = FrameSlot(len(self.slots))
+                self.slots.append(slot)
+        slot.present.clear()
+        return slot
+
+    def lease(self, frame_data):
+        """Reserviert den Slot eines veröffentlichten Frames gegen Überschreiben"""
+        with self._lock:
+            self.slots[frame_data["slot"]].leases += 1
+
+    def release(self, frame_data):
+        """Gibt eine mit lease() gesetzte Reservierung wieder frei"""
+        with self._lock:
+            self.slots[frame_data["slot"]].leases -= 1
+
+    def publish(self, slot):
+        """
+        Vergibt die Sequenznummer und liefert das Frame im bekannten
+        Dictionary-Format mit schreibgeschützten Views.
+        """
+        with self._lock:
+            slot.seq = self._seq
+            self._seq += 1
+        slot.timestamp = time.monotonic()
+        return {
+            "color": _read_only(slot.color),
+            "depth": _read_only(slot.depth),
+            "seq": slot.seq,
+            "timestamp": slot.timestamp,
+            "slot": slot.index,
+        }
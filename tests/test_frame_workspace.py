@@ -0,0 +1,103 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from DataCalculation import calculate2DVolume, detectBuildings, frameWorkspace
+from DataRead.generateSyntheticScene import generate_Scene
+
+# Die wiederverwendeten Arbeitsbereiche (frameWorkspace) dürfen im
+# eingeschwungenen Zustand keine Bilder mehr anlegen und das Ergebnis nicht
+# verändern. Gemessen wird in 1280x720: ein einziges vergessenes
+# Zwischenbild wäre 0.9 MB (uint8) bzw. 3.7 MB (float32) groß. Die Schranke
+# lässt Platz für die festen Puffer von NumPy beim Umwandeln von Typen
+# (8192 Elemente, unabhängig von der Auflösung).
+
+WIDTH, HEIGHT = 1280, 720
+MAX_STEADY_STATE_BYTES = 64 * 1024
+
+
+@pytest.fixture(scope="module")
+def scenes():
+    return [generate_Scene(WIDTH, HEIGHT, seed=seed) for seed in (1, 2)]
+
+
+def _steady_state_peak(func, warmup=2):
+    """Spitze der neu angelegten Bytes eines Aufrufs nach warmup Aufrufen"""
+    for _ in range(warmup):
+        func()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return peak - before
+
+
+def _mask_outputs(shape):
+    return tuple(np.empty(shape, dtype=np.uint8) for _ in range(3))
+
+
+@pytest.mark.parametrize("parallel", [True, False])
+@pytest.mark.parametrize("integer_depth", [False, True])
+def test_detect_buildings_steady_state_allocation(scenes, parallel, integer_depth):
+    scene = scenes[0]
+    out = _mask_outputs(scene["depth"].shape)
+    peak = _steady_state_peak(lambda: detectBuildings.detect_Buildings(
+        scene["depth"], scene["color"], scene["depth_scale"], None,
+        parallel=parallel, scale=1.0, out=out, integer_depth=integer_depth))
+    assert peak < MAX_STEADY_STATE_BYTES
+
+
+def test_calculate_2d_volume_steady_state_allocation(scenes):
+    scene = scenes[0]
+    masks = detectBuildings.detect_Buildings(scene["depth"], scene["color"], scene["depth_scale"], None,
+                                             scale=1.0)
+    out = np.empty(scene["depth"].shape, dtype=np.uint8)
+    peak = _steady_state_peak(lambda: calculate2DVolume.calculate_2D_Volume(scene["depth"], *masks, out=out))
+    assert peak < MAX_STEADY_STATE_BYTES
+
+
+@pytest.mark.parametrize("parallel", [True, False])
+@pytest.mark.parametrize("integer_depth", [False, True])
+def test_detect_buildings_reused_workspace_is_bit_identical(scenes, parallel, integer_depth):
+    first, second = scenes
+    kwargs = dict(parallel=parallel, scale=1.0, integer_depth=integer_depth, debug=True)
+
+    # Referenz: frischer Arbeitsbereich, neu angelegte Ergebnisse
+    frameWorkspace.clear_workspaces()
+    expected = detectBuildings.detect_Buildings(second["depth"], second["color"], second["depth_scale"],
+                                                None, **kwargs)
+
+    # Wiederverwendet: Puffer stammen noch vom vorigen (anderen) Frame
+    out = _mask_outputs(second["depth"].shape)
+    detectBuildings.detect_Buildings(first["depth"], first["color"], first["depth_scale"], None,
+                                     out=out, **kwargs)
+    result = detectBuildings.detect_Buildings(second["depth"], second["color"], second["depth_scale"],
+                                              None, out=out, **kwargs)
+
+    for name, actual, reference in zip(("building", "road", "park", "height"), result, expected):
+        assert actual.dtype == reference.dtype, name
+        assert np.array_equal(actual, reference), name
+    for actual, target in zip(result[:3], out):
+        assert actual is target
+
+
+def test_calculate_2d_volume_reused_workspace_is_bit_identical(scenes):
+    first, second = scenes
+    first_masks = detectBuildings.detect_Buildings(first["depth"], first["color"], first["depth_scale"],
+                                                   None, scale=1.0)
+    second_masks = detectBuildings.detect_Buildings(second["depth"], second["color"], second["depth_scale"],
+                                                    None, scale=1.0)
+
+    frameWorkspace.clear_workspaces()
+    expected = calculate2DVolume.calculate_2D_Volume(second["depth"], *second_masks)
+
+    out = np.empty(second["depth"].shape, dtype=np.uint8)
+    calculate2DVolume.calculate_2D_Volume(first["depth"], *first_masks, out=out)
+    result = calculate2DVolume.calculate_2D_Volume(second["depth"], *second_masks, out=out)
+
+    assert result is out
+    assert np.array_equal(result, expected)
@@ -0,0 +1,15 @@
+import numpy as np
+
+from DataCalculation.simulateWater import WaterSimulation
+
+# Ein trocken fallender Rand hat so kleinen Ausfluss, dass outflow * dt zu 0
+# wird; früher ergab das 0/0 = NaN, das sich über das ganze Feld ausbreitete.
+
+
+def test_water_block_on_flat_terrain_stays_finite():
+    simulation = WaterSimulation(evaporation=0)
+    simulation.water[50:70, 70:90] = 0.01
+    for _ in range(200):
+        simulation.step()
+    assert np.all(np.isfinite(simulation.water))
+    assert np.isfinite(simulation.status()["water_volume_ml"])